@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# benchmark of the generation pipeline on generated svg profiles
+# every stage is timed on its own for several profile sizes and steps, with throughput, peak memory and the scaling
+# of the time with the size of the profile. the results are written as json, so runs can be compared with each other
+#
+#   python3 benchmark.py --json results.json
+#   python3 benchmark.py --kinds naca --sizes 1000,10000,100000 --steps 0.5,0.1
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from svgpathtools import svg2paths
+
+from hotwireGcodeGenerator import mergePath, slicePath, slicePathAnchorPoints, calcToolPointClouds, translateToGcode, sliceCache, arcLengthTables, lazyPaths
+
+#machine geometry and feedrate that the tool points and the gcode are computed with
+benchmarkGeometry = (1000, 500, 25)
+benchmarkFeedrate = 5.0
+#number of anchor points (evenly spread over the profile) the anchor slicing gets
+benchmarkAnchorCount = 4
+
+def svgDocument(paths):
+    body = "".join('  <path d="%s" fill="none" stroke="black"/>\n' % d for d in paths)
+    return '<svg xmlns="http://www.w3.org/2000/svg">\n' + body + '</svg>\n'
+
+#NACA 4 digit airfoil as a closed polyline with the given number of points, chord length 200
+def nacaProfile(size, thickness = 0.12, chord = 200.0):
+    x = (1 - np.cos(np.linspace(0, np.pi, size // 2 + 1))) / 2 #denser at the leading and trailing edge
+    y = 5 * thickness * (0.2969*np.sqrt(x) - 0.1260*x - 0.3516*x**2 + 0.2843*x**3 - 0.1036*x**4)
+    upper = np.column_stack((x[::-1], y[::-1]))
+    lower = np.column_stack((x[1:-1], -y[1:-1]))
+    points = np.vstack((upper, lower)) * chord
+    d = "M %r,%r " % (float(points[0, 0]), float(points[0, 1]))
+    d += " ".join("L %r,%r" % (float(px), float(py)) for (px, py) in points[1:])
+    return [d + " Z"]
+
+#a scalloped circle of size arcs with a cubic bezier between every two of them
+def arcProfile(size, radius = 100.0):
+    angles = np.linspace(0, 2*np.pi, size + 1)
+    points = radius * np.exp(1j * angles)
+    points[-1] = points[0]
+    d = "M %r,%r" % (float(points[0].real), float(points[0].imag))
+    for i in range(size):
+        (start, end) = (points[i], points[i + 1])
+        if i % 2 == 0:
+            bulge = float(abs(end - start)) * 0.6
+            d += " A %r,%r 0 0 1 %r,%r" % (bulge, bulge, float(end.real), float(end.imag))
+        else:
+            (c1, c2) = (start + (end - start)/3 * 1.1j, end - (end - start)/3 * 1.1j)
+            d += " C %r,%r %r,%r %r,%r" % (float(c1.real), float(c1.imag), float(c2.real), float(c2.imag), float(end.real), float(end.imag))
+    return [d]
+
+#a traced outline like the ones from dxf exports: size tiny lines, every one its own svg element, shuffled and partly reversed
+def tracedProfile(size, radius = 100.0, seed = 1):
+    rng = np.random.default_rng(seed)
+    angles = np.linspace(0, 2*np.pi, size + 1)
+    radii = radius * (1 + 0.05*np.sin(7*angles) + 0.002*rng.standard_normal(size + 1))
+    radii[-1] = radii[0]
+    points = radii * np.exp(1j * angles)
+    points[-1] = points[0]
+    lines = []
+    for i in rng.permutation(size):
+        (start, end) = (points[i], points[i + 1])
+        if rng.random() < 0.5:
+            (start, end) = (end, start)
+        lines.append("M %r,%r L %r,%r" % (float(start.real), float(start.imag), float(end.real), float(end.imag)))
+    return lines
+
+profileKinds = {"naca": nacaProfile, "arcs": arcProfile, "traced": tracedProfile}
+
+#the caches would turn every run after the first one into a lookup, so they are emptied before each run
+def clearCaches():
+    sliceCache.clear()
+    arcLengthTables.clear()
+    lazyPaths.clear()
+
+#best wall time of repeat runs of function, the peak memory of an extra run with tracemalloc and its result
+def measure(function, repeat):
+    times = []
+    for i in range(repeat):
+        clearCaches()
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    clearCaches()
+    tracemalloc.start()
+    function()
+    (current, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (min(times), peak, result)
+
+def stageResult(stage, seconds, peak, items):
+    return {"stage": stage, "seconds": seconds, "items": int(items), "itemsPerSecond": items / seconds if seconds > 0 else None, "peakBytes": peak}
+
+#run all stages on one svg file, each stage gets the output of the one before as input
+def benchmarkProfile(svgFile, step, repeat):
+    results = []
+    def parse():
+        (paths, attributes) = svg2paths(svgFile)
+        return mergePath(paths)
+    (seconds, peak, path) = measure(parse, repeat)
+    results.append(stageResult("svg2paths+mergePath", seconds, peak, len(path)))
+
+    (seconds, peak, (pointCloud, anchorPoints)) = measure(lambda: slicePath(path, step), repeat)
+    results.append(stageResult("slicePath", seconds, peak, len(pointCloud)))
+
+    anchors = anchorPoints[np.linspace(0, len(anchorPoints), benchmarkAnchorCount, endpoint = False).astype(int)]
+    (seconds, peak, (slicedXY, slicedUV)) = measure(lambda: slicePathAnchorPoints(path, anchors, path, anchors, step), repeat)
+    results.append(stageResult("slicePathAnchorPoints", seconds, peak, len(slicedXY)))
+
+    (seconds, peak, (xyTool, uvTool)) = measure(lambda: calcToolPointClouds(slicedXY, slicedUV, *benchmarkGeometry), repeat)
+    results.append(stageResult("calcToolPointClouds", seconds, peak, len(xyTool)))
+
+    (seconds, peak, gcode) = measure(lambda: translateToGcode(xyTool, uvTool, benchmarkFeedrate), repeat)
+    results.append(stageResult("translateToGcode", seconds, peak, len(xyTool)))
+    return results
+
+#exponent of time ~ size^exponent for every stage, fitted over all sizes of a kind and step
+def scalingExponents(runs):
+    groups = {}
+    for run in runs:
+        for stage in run["stages"]:
+            groups.setdefault((run["kind"], run["step"], stage["stage"]), []).append((run["size"], stage["seconds"]))
+    exponents = []
+    for ((kind, step, stage), samples) in groups.items():
+        if len(samples) < 2:
+            continue
+        (sizes, seconds) = np.log(np.array(samples, float)).T
+        exponents.append({"kind": kind, "step": step, "stage": stage, "exponent": float(np.polyfit(sizes, seconds, 1)[0])})
+    return exponents
+
+def runBenchmark(kinds, sizes, steps, repeat, workDir):
+    runs = []
+    for kind in kinds:
+        for size in sizes:
+            svgFile = os.path.join(workDir, "%s_%d.svg" % (kind, size))
+            with open(svgFile, "w") as f:
+                f.write(svgDocument(profileKinds[kind](size)))
+            for step in steps:
+                stages = benchmarkProfile(svgFile, step, repeat)
+                runs.append({"kind": kind, "size": size, "step": step, "stages": stages})
+                print(formatRun(runs[-1]), file = sys.stderr)
+    return {"repeat": repeat, "numpy": np.__version__, "python": sys.version.split()[0], "runs": runs, "scaling": scalingExponents(runs)}
+
+def formatRun(run):
+    lines = ["%s, %d elements, step %g" % (run["kind"], run["size"], run["step"])]
+    for stage in run["stages"]:
+        lines.append("  %-22s %9.4f s %10d items %12.0f items/s %9.1f MB peak" % (stage["stage"], stage["seconds"], stage["items"], stage["itemsPerSecond"] or 0, stage["peakBytes"] / 1e6))
+    return "\n".join(lines)
+
+def parseList(text, convert):
+    return [convert(entry) for entry in text.split(",") if entry.strip()]
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "time every stage of the gcode generation on generated svg profiles")
+    parser.add_argument("--kinds", default = ",".join(profileKinds), help = "comma separated profile kinds: " + ", ".join(profileKinds))
+    parser.add_argument("--sizes", default = "100,1000,10000", help = "comma separated numbers of svg elements per profile")
+    parser.add_argument("--steps", default = "0.5,0.1", help = "comma separated slicing steps")
+    parser.add_argument("--repeat", type = int, default = 3, help = "runs per stage, the best time is reported")
+    parser.add_argument("--json", dest = "jsonFile", help = "write the results as json to this file, - for stdout")
+    args = parser.parse_args(argv)
+
+    kinds = parseList(args.kinds, str)
+    unknown = [kind for kind in kinds if kind not in profileKinds]
+    if unknown:
+        parser.error("unknown profile kinds: " + ", ".join(unknown))
+    #the benchmark measures the computation, not the cache directory
+    sliceCache.directory = None
+    with tempfile.TemporaryDirectory() as workDir:
+        results = runBenchmark(kinds, parseList(args.sizes, int), parseList(args.steps, float), max(args.repeat, 1), workDir)
+
+    for entry in results["scaling"]:
+        print("%-7s step %-5g %-22s time ~ size^%.2f" % (entry["kind"], entry["step"], entry["stage"], entry["exponent"]), file = sys.stderr)
+    if args.jsonFile == "-":
+        json.dump(results, sys.stdout, indent = 2)
+    elif args.jsonFile:
+        with open(args.jsonFile, "w") as f:
+            json.dump(results, f, indent = 2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
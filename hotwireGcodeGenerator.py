@@ -3,70 +3,326 @@
 
 # converts a list of path elements of a SVG file to simple line drawing commands
 from svgpathtools import svg2paths
-from svgpathtools import Path, Line, Arc, CubicBezier, QuadraticBezier
-from xml.dom import minidom
-
-#imports for using matplotlib with tkinter
-import matplotlib
-matplotlib.use("TkAgg")
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.backend_bases import MouseEvent
-from matplotlib.figure import Figure
-
-import tkinter as tk
-from tkinter import filedialog
-from tkinter import messagebox
-from tkinter import ttk
-
-from math import sqrt, floor, ceil
+from svgpathtools import Path, Line, Arc, CubicBezier, QuadraticBezier, parse_path
+
+#the user interface (tkinter and matplotlib) lives in hotwireGcodeGeneratorGui.py and is only imported when the window is opened,
+#so the generation itself also runs headless from the command line
+
+from math import sqrt
 import numpy as np
+try:
+    from scipy.spatial import cKDTree
+except ImportError: #scipy comes with svgpathtools, without it PointIndex falls back to a plain search
+    cKDTree = None
 
+import argparse
+import cProfile
+import hashlib
+import itertools
+import json
+import os
+import signal
+import sys
+import tempfile
+import threading
 import time
+import traceback
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
 
-def slicePath(path, step): 
-    anchorPoints = np.empty((0,2), float)
-    pointCloud = np.empty((0,2), float)
-    
-    for e in path:
-        x0 = e.start.real
-        y0 = e.start.imag
-        x1 = e.end.real
-        y1 = e.end.imag
-        #print("start&end: (%.2f, %.2f) - (%.2f, %.2f)" % (x0, y0, x1, y1))
-        
-        #create a finely granulated point cloud for each element (line, arc, etc)
-        length = e.length()
-        noPoints = length / step
-        
-        #print("noPoints: " + str(noPoints))
-        #print("element length: " + str(e.length()))
-        
-        #extract anchor points
-        startPoint = [e.start.real, e.start.imag]
-        if not any(np.equal(anchorPoints, startPoint).all(1)) :
-            anchorPoints = np.append(anchorPoints, [startPoint], axis = 0)
-            
-        endPoint = [e.end.real, e.end.imag]
-        if not any(np.equal(anchorPoints, endPoint).all(1)) :
-            anchorPoints = np.append(anchorPoints, [endPoint], axis = 0)
-        
-        #add points in steps of displayStep
-        for i in range(int(noPoints)) :
-            #add next point
-            pointCloud=np.append(pointCloud, [[e.point(i * step / length).real, e.point(i * step / length).imag]], axis = 0)
-
-        i = int(noPoints)
-        if (i * step < length) : #if the pointClound isn't "full"
-            #add the last point of the line
-            pointCloud=np.append(pointCloud, [[e.point(i * step / length).real, e.point(i * step / length).imag]], axis = 0)
-            
-        #print(pointCloud)
+#step of the fine point clouds that the anchor interpolation works on. they are sampled at uniform arc length, so this can be fairly coarse
+fineSliceStep = 0.2
+#endpoints of svg elements closer than this are treated as the same point when merging them into closed figures
+mergeTolerance = 1e-6
+#number of intervals in the table of curve parameter vs. arc length that is kept per path element
+arcLengthTableSize = 256
+
+#small least recently used cache for results that are expensive to compute and get asked for over and over
+class LRUCache:
+    def __init__(self, maxSize = 1024):
+        self.maxSize = maxSize
+        self.entries = OrderedDict()
+
+    def get(self, key, default = None):
+        if key not in self.entries:
+            return default
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxSize:
+            self.entries.popitem(last = False)
+
+    def clear(self):
+        self.entries.clear()
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+arcLengthTables = LRUCache(4096)
+
+#format of the entries stored on disk, part of every file name. change it whenever what an entry holds changes,
+#the entries of older versions are then never read but computed again
+sliceCacheFormat = 2
+
+#cache for the closed contours of svg files (readContours) and their coarse slicing for the anchor points and the display (slicePath at
+#the display step), keyed by their content (sha256 of the svg file or of the path) and the slicing parameters. the fine points the
+#toolpath is calculated from are sampled span by span in memory (see LazyPath) and never cached
+#recently used entries are kept in memory. with a directory set, every entry is also stored there as .npz, so it survives the session
+class SliceCache:
+    def __init__(self, directory = None, maxEntries = 64):
+        self.directory = directory
+        self.memory = LRUCache(maxEntries)
+
+    def fileName(self, key):
+        return os.path.join(self.directory, hashlib.sha256(repr((sliceCacheFormat, key)).encode()).hexdigest() + ".npz")
+
+    #the cached value for key. if there is none, it is computed and stored. encode turns the value into a dict of numpy arrays for the disk, decode turns that back
+    def lookup(self, key, compute, encode, decode):
+        if key in self.memory:
+            return self.memory.get(key)
+        value = None
+        if self.directory:
+            try:
+                with np.load(self.fileName(key), allow_pickle = False) as arrays:
+                    value = decode(arrays)
+            except (OSError, ValueError, KeyError): #not stored yet or unreadable, compute it again
+                value = None
+        if value is None:
+            value = compute()
+            if self.directory:
+                self.store(key, encode(value))
+        self.memory.put(key, value)
+        return value
+
+    def store(self, key, arrays):
+        try:
+            os.makedirs(self.directory, exist_ok = True)
+            #write to a temporary file first, so parallel jobs never read a half written entry
+            (handle, tmpName) = tempfile.mkstemp(dir = self.directory, suffix = ".tmp")
+            with os.fdopen(handle, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmpName, self.fileName(key))
+        except OSError as error:
+            print("could not write to the cache: " + str(error), file = sys.stderr)
+
+    def clear(self):
+        self.memory.clear()
+
+#where the user interface keeps its cache between sessions. on the command line the cache directory is given with --cache-dir or HOTWIRE_CACHE_DIR
+defaultCacheDirectory = os.path.join(os.path.expanduser("~"), ".cache", "hotwireGcodeGenerator")
+sliceCache = SliceCache(os.environ.get("HOTWIRE_CACHE_DIR"))
+
+#content hash of a path, for caching things computed from it. the path data string holds the coordinates at full precision
+def pathKey(path):
+    return hashlib.sha256(path.d().encode()).hexdigest()
+
+#cached arrays are shared between everyone asking for them, so they are made read only
+def readOnly(array):
+    array = np.asarray(array)
+    array.setflags(write = False)
+    return array
+
+#one timed stage of a generation: wall time, the number of points it produced and the memory of the arrays it produced
+class StageRecord:
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        self.points = 0
+        self.bytes = 0
+
+    #note the arrays the stage produced, the points are counted in the first one
+    def output(self, *arrays):
+        self.points = len(arrays[0])
+        self.bytes = sum(np.asarray(array).nbytes for array in arrays)
+
+    def asDict(self):
+        return {"stage": self.name, "seconds": self.seconds, "points": self.points, "bytes": self.bytes}
+
+#collects the stages that run on a thread inside "with recording(recorder)". stages that are skipped
+#(memoized, found in the cache or with nothing to do for the settings) don't show up, so the recorder shows where the time of one run went
+class StageRecorder:
+    def __init__(self):
+        self.stages = []
+
+    def total(self):
+        return sum(record.seconds for record in self.stages)
+
+    #the stages added up by name, in the order they first ran
+    def summary(self):
+        summary = OrderedDict()
+        for record in self.stages:
+            entry = summary.setdefault(record.name, {"stage": record.name, "runs": 0, "seconds": 0.0, "points": 0, "bytes": 0})
+            entry["runs"] += 1
+            entry["seconds"] += record.seconds
+            entry["points"] += record.points
+            entry["bytes"] += record.bytes
+        return list(summary.values())
+
+    def trace(self):
+        return {"seconds": self.total(), "stages": [record.asDict() for record in self.stages], "summary": self.summary()}
+
+    #one line per stage, for the command line
+    def format(self):
+        lines = ["%-22s %9.4f s %10d points %9.1f MB" % (entry["stage"], entry["seconds"], entry["points"], entry["bytes"] / 1e6) for entry in self.summary()]
+        lines.append("%-22s %9.4f s" % ("total", self.total()))
+        return "\n".join(lines) + "\n"
+
+    #everything in one line, for a status bar
+    def formatStatus(self):
+        stages = ["%s %.3f s (%d pts)" % (entry["stage"], entry["seconds"], entry["points"]) for entry in self.summary()]
+        return ", ".join(stages + ["total %.3f s" % self.total()])
+
+#the recorder of every thread, the gui calculates on a worker thread while the Tk thread renders
+activeRecorder = threading.local()
+
+#record the stages run by this thread into recorder (a new one if none is given)
+@contextmanager
+def recording(recorder = None):
+    if recorder is None:
+        recorder = StageRecorder()
+    previous = getattr(activeRecorder, "recorder", None)
+    activeRecorder.recorder = recorder
+    try:
+        yield recorder
+    finally:
+        activeRecorder.recorder = previous
+
+#time the block as a stage of the generation. without an active recorder nothing is measured.
+#stages don't nest, the total of a recorder is the sum of its stages
+@contextmanager
+def stage(name):
+    record = StageRecord(name)
+    recorder = getattr(activeRecorder, "recorder", None)
+    if recorder is None:
+        yield record
+        return
+    startTime = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.seconds = time.perf_counter() - startTime
+        recorder.stages.append(record)
+
+#number of points slicePath puts on an element of the given length: one every step, plus the remainder if the element isn't "full"
+def segmentSampleCount(length, step):
+    noPoints = int(length / step)
+    if (noPoints * step < length) :
+        noPoints += 1
+    return noPoints
+
+#evaluates a path element (line, arc, etc) at a whole array of curve parameters t at once, returns complex points
+def segmentPoints(e, t):
+    if isinstance(e, Line):
+        return e.start + (e.end - e.start) * t
+    if isinstance(e, QuadraticBezier):
+        tc = 1 - t
+        return tc * tc * e.start + 2 * tc * t * e.control + t * t * e.end
+    if isinstance(e, CubicBezier):
+        #horner's rule, same as svgpathtools does it for a single point
+        return e.start + t * (3 * (e.control1 - e.start) + t * (3 * (e.start + e.control2) - 6 * e.control1 + t * (-e.start + 3 * (e.control1 - e.control2) + e.end)))
+    if isinstance(e, Arc):
+        angle = (e.theta + t * e.delta) * np.pi / 180
+        cosphi = e.rot_matrix.real
+        sinphi = e.rot_matrix.imag
+        rx = e.radius.real
+        ry = e.radius.imag
+        x = rx * cosphi * np.cos(angle) - ry * sinphi * np.sin(angle) + e.center.real
+        y = rx * sinphi * np.cos(angle) + ry * cosphi * np.sin(angle) + e.center.imag
+        return x + y * 1j
+    #unknown element type: fall back to evaluating point by point
+    return np.array([e.point(ti) for ti in t], complex)
+
+#hashable description of a path element, for caching things computed from it
+def segmentKey(e):
+    if isinstance(e, Arc):
+        return ("Arc", e.start, e.radius, e.rotation, e.large_arc, e.sweep, e.end)
+    return (type(e).__name__,) + tuple(e.bpoints())
+
+#table of curve parameter t vs. arc length s of a path element. the table is cached per element, so reslicing the same path doesn't rebuild it
+def arcLengthTable(e, length):
+    key = segmentKey(e)
+    table = arcLengthTables.get(key)
+    if table is None:
+        t = np.linspace(0, 1, arcLengthTableSize + 1)
+        s = np.empty(len(t), float)
+        s[0] = 0
+        np.cumsum(np.abs(np.diff(segmentPoints(e, t))), out = s[1:])
+        #the polygon through the table points is slightly shorter than the element, stretch it to the real length
+        if (s[-1] > 0) :
+            s *= length / s[-1]
+        table = (t, s)
+        arcLengthTables.put(key, table)
+    return table
+
+#curve parameters of the points at the distances s along a path element
+def segmentParameters(e, s, length, uniform = False):
+    if (not uniform) or isinstance(e, Line): #a line's parameter is already proportional to its length
+        return s / length
+    (tTable, sTable) = arcLengthTable(e, length)
+    return np.interp(s, sTable, tTable)
+
+#slice the path into points every step along each element
+#with uniform = False the curve parameter is stepped evenly, which only gives even distances on lines
+#with uniform = True the points are placed at true uniform arc length on arcs and beziers as well
+def slicePath(path, step, uniform = False):
+    (pointCloud, anchorPoints, offsets, lengths) = slicePathSegments(path, step, uniform)
     return (pointCloud, anchorPoints)
 
-#gets the parameters needed for putting an arrow at a specific point of a pointcloud in matplotlib
-def getArrowAtPoint(pointCloud, point, length):
-    index = np.where(np.all(pointCloud==point,axis=1))[0][0]
-    
+#slicePath, additionally returning the index of the first point of every element in the point cloud and the length of every element
+#the result is cached by the content of the path, so slicing the same path again costs nothing
+def slicePathSegments(path, step, uniform = False):
+    if len(path) == 0:
+        return computePathSlices(path, step, uniform)
+    key = ("slice", pathKey(path), float(step), bool(uniform))
+    names = ("pointCloud", "anchorPoints", "offsets", "lengths")
+    def compute():
+        with stage("fine slice" if uniform else "slice") as record:
+            slices = tuple(readOnly(array) for array in computePathSlices(path, step, uniform))
+            record.output(slices[0])
+        return slices
+    def encode(value):
+        return dict(zip(names, value))
+    def decode(arrays):
+        return tuple(readOnly(arrays[name]) for name in names)
+    return sliceCache.lookup(key, compute, encode, decode)
+
+def computePathSlices(path, step, uniform = False):
+    #create a finely granulated point cloud for each element (line, arc, etc)
+    #the number of points per element is known up front, so the whole cloud is allocated once and filled element by element
+    lengths = lazyPath(path).lengths
+    counts = [segmentSampleCount(length, step) for length in lengths]
+    pointCloud = np.empty((sum(counts), 2), float)
+
+    anchorPoints = []
+    seenAnchorPoints = set()
+
+    offsets = np.cumsum([0] + counts)[:-1]
+    for (e, length, count, offset) in zip(path, lengths, counts, offsets):
+        #extract anchor points
+        for point in ((e.start.real, e.start.imag), (e.end.real, e.end.imag)):
+            if point not in seenAnchorPoints:
+                seenAnchorPoints.add(point)
+                anchorPoints.append(point)
+
+        if (count == 0) :
+            continue
+
+        #add points in steps of step
+        points = segmentPoints(e, segmentParameters(e, np.arange(count) * step, length, uniform))
+        pointCloud[offset:offset + count, 0] = points.real
+        pointCloud[offset:offset + count, 1] = points.imag
+
+    return (pointCloud, np.array(anchorPoints, float).reshape((-1, 2)), offsets, lengths)
+
+#gets the parameters needed for putting an arrow at the point with the given index of a pointcloud in matplotlib
+def getArrowAtIndex(pointCloud, index, length):
     incIndex = index + 1
     if (incIndex > len(pointCloud) - 1): #wrap around
         incIndex = 0
@@ -81,636 +337,2216 @@ def getArrowAtPoint(pointCloud, point, length):
     
     return (x, y, dx, dy)
 
-#get the length of the curve between two anchor points
-def getLengthBetweenAnchors(path, anchorPoint1, anchorPoint2) : 
-    startIndex = -1
-    stopIndex = -1
+#a path with what is expensive to get about its elements computed once: their lengths (svgpathtools integrates them numerically)
+#and the cumulative lengths along the path. the fine points of an element are sampled when a span containing it is needed and not kept,
+#so a cached LazyPath stays as small as its elements
+class LazyPath:
+    def __init__(self, path):
+        self.path = path
+        self.lengths = np.array([e.length() for e in path], float)
+        self.cumLengths = np.concatenate(([0.0], np.cumsum(self.lengths)))
+        self.elementIndices = {}
+        for (i, e) in enumerate(path):
+            self.elementIndices.setdefault((e.start.real, e.start.imag), i)
 
-    for (i,e) in enumerate(path):
-        if (e.start.real == anchorPoint1[0]) and (e.start.imag == anchorPoint1[1]) :
-            startIndex = i
-        if (e.end.real == anchorPoint2[0]) and (e.end.imag == anchorPoint2[1]) :
-            stopIndex = i
-    
-    
-    if (startIndex < 0) or (stopIndex <0):
-        print("problem with finding Anchor points in the path")
-        return
-     
-    #calculate length
-    length = 0  
-    
-    if (startIndex > stopIndex) : #the two anchor points wrap around the list
-        noElements = len(path)
-        for j in range(startIndex, noElements):
-            length = length + path[j].length()
-        for j in range(0, stopIndex+1):
-            length = length + path[j].length()
-        
-    else:
-        for j in range(startIndex, stopIndex + 1):
-            length = length + path[j].length()
-           
-    return length
-
-
-#interpolates a point between a point in the point cloud
-def interpolate(pointCloud, index) :
-    cIndex = ceil(index)
-    fIndex = floor(index)
-    if (cIndex == len(pointCloud)) : # wraparound case
-        x = (pointCloud[0, 0] + pointCloud[fIndex, 0]) / 2
-        y = (pointCloud[0, 1] + pointCloud[fIndex, 1]) / 2
-    else :
-        x = (pointCloud[cIndex, 0] + pointCloud[fIndex, 0]) / 2
-        y = (pointCloud[cIndex, 1] + pointCloud[fIndex, 1]) / 2
-    
-    return np.array([x,y])
+    def length(self):
+        return self.cumLengths[-1]
 
-#interpolates the point clouds along the longer axis for each segment between two anchor points
-def interpolateBetweenAnchors(xyPath, xyPointCloud, xyAnchorPoint1, xyAnchorPoint2, uvPath, uvPointCloud, uvAnchorPoint1, uvAnchorPoint2, step):
-    
-    def getAnchorIndex(pointCloud, anchor):
-        return np.where(np.all(pointCloud == anchor, axis = 1))[0][0]       
-
-    def interpolateOnLongest(longPointCloud, longAnchorPoint1, longAnchorPoint2, longLength, shortPointCloud, shortAnchorPoint1, shortAnchorPoint2, shortLength, step):
-        longAnchor1index = getAnchorIndex(longPointCloud, longAnchorPoint1)
-        longAnchor2index = getAnchorIndex(longPointCloud, longAnchorPoint2)
-        shortAnchor1index = getAnchorIndex(shortPointCloud, shortAnchorPoint1)
-        shortAnchor2index = getAnchorIndex(shortPointCloud, shortAnchorPoint2)
-        
-        #rotate point clouds for more conveinient interpolation
-        longPointCloud = np.roll(longPointCloud, -longAnchor1index, axis = 0)
-        shortPointCloud = np.roll(shortPointCloud, -shortAnchor1index, axis = 0)
-        #get the new top values
-        longLast = longAnchor2index - longAnchor1index
-        shortLast = shortAnchor2index - shortAnchor2index
-        while (longLast < 0):
-            longLast += len(longPointCloud)
-        while (shortLast <0):
-            shortLast += len(shortPointCloud)
-        
-        #steps on the index of the array
-        longStep = step * longLast / longLength
-        shortStep = longStep * shortLength / longLength
-        
-        #the new empty arrays
-        longInterpolated = np.empty((0,2), float)
-        shortInterpolated = np.empty((0,2), float)
-        
-        longIndex = 0
-        shortIndex = 0
-
-        while (longIndex < longLast):
-            longInterpolated = np.append(longInterpolated, [interpolate(longPointCloud, longIndex)], axis = 0)
-            shortInterpolated = np.append(shortInterpolated, [interpolate(shortPointCloud, shortIndex)], axis = 0)
-            #increment indices
-            longIndex += longStep
-            shortIndex += shortStep
-
-        return (longInterpolated, shortInterpolated)
-        
-    xyLength = getLengthBetweenAnchors(xyPath, xyAnchorPoint1, xyAnchorPoint2)
-    uvLength = getLengthBetweenAnchors(uvPath, uvAnchorPoint1, uvAnchorPoint2)
-    
-    if (xyLength > uvLength):
-        (xyInterpolated, uvInterpolated) = interpolateOnLongest(xyPointCloud, xyAnchorPoint1, xyAnchorPoint2, xyLength, uvPointCloud, uvAnchorPoint1, uvAnchorPoint2, uvLength, step)
-    else:
-        (uvInterpolated, xyInterpolated) = interpolateOnLongest(uvPointCloud, uvAnchorPoint1, uvAnchorPoint2, uvLength, xyPointCloud, xyAnchorPoint1, xyAnchorPoint2, xyLength, step)
-        
-    return (xyInterpolated, uvInterpolated)
+    #index of the element starting at every anchor point
+    def anchorElements(self, anchorPoints):
+        indices = []
+        for anchorPoint in anchorPoints:
+            i = self.elementIndices.get((anchorPoint[0], anchorPoint[1]))
+            if i is None:
+                raise ValueError("anchor point (%.2f, %.2f) is not on the path" % (anchorPoint[0], anchorPoint[1]))
+            indices.append(i)
+        return np.array(indices, int)
+
+    #length along the path from the start of element first to the start of element last, wrapping around the end of the path
+    def spanLength(self, first, last):
+        return np.mod(self.cumLengths[last] - self.cumLengths[first], self.length())
+
+    #points of an element every fineSliceStep along its length, without its end point
+    def elementPoints(self, i):
+        e = self.path[i]
+        count = segmentSampleCount(self.lengths[i], fineSliceStep)
+        points = segmentPoints(e, segmentParameters(e, np.arange(count) * fineSliceStep, self.lengths[i], uniform = True))
+        return np.column_stack((points.real, points.imag))
 
-#reslice the path between the anchor points
+    #polyline through the fine points of the elements first..last-1 (wrapping around), ending at the start of element last
+    def spanPoints(self, first, last):
+        elements = range(first, last) if first < last else list(range(first, len(self.path))) + list(range(0, last))
+        end = self.path[last].start
+        return np.vstack([self.elementPoints(i) for i in elements] + [[[end.real, end.imag]]])
+
+#the LazyPath of a path, kept for the paths that were used recently
+lazyPaths = LRUCache(64)
+
+def lazyPath(path):
+    key = pathKey(path)
+    if key not in lazyPaths:
+        lazyPaths.put(key, LazyPath(path))
+    return lazyPaths.get(key)
+
+#cumulative length along a polyline: cumLength[i] is the distance from the first point to point i
+def cumulativeLength(points):
+    cumLength = np.zeros(len(points))
+    np.cumsum(np.hypot(*np.diff(points, axis = 0).T), out = cumLength[1:])
+    return cumLength
+
+#points at the given distances along a polyline, linearly interpolated between its points
+def pointsAlongPolyline(points, cumLength, positions):
+    index = np.clip(np.searchsorted(cumLength, positions, side = "right") - 1, 0, max(len(points) - 2, 0))
+    following = np.minimum(index + 1, len(points) - 1)
+    gap = cumLength[following] - cumLength[index]
+    weight = np.divide(positions - cumLength[index], gap, out = np.zeros(len(positions)), where = gap > 0)
+    return points[index] + weight[:, np.newaxis] * (points[following] - points[index])
+
+#the resliced paths span by span, as (slicedXY, slicedUV) for every span from one anchor point to the next (wrapping around from the last to the first)
+#each span is sliced in steps of step along the longer of the two planes, the shorter plane gets the same number of points spread evenly over its span.
+#the elements of a span are only finely sampled when the span is reached, so the first spans come out before the rest of the paths is looked at
+def iterAnchorSpans(xyPath, xyAnchorPoints, uvPath, uvAnchorPoints, step):
+    (xyLazy, uvLazy) = (lazyPath(xyPath), lazyPath(uvPath))
+    xyElements = xyLazy.anchorElements(xyAnchorPoints)
+    uvElements = uvLazy.anchorElements(uvAnchorPoints)
+    xyNext = np.roll(xyElements, -1)
+    uvNext = np.roll(uvElements, -1)
+    #number of points in each span, given by the true length of the longer plane
+    longest = np.maximum(xyLazy.spanLength(xyElements, xyNext), uvLazy.spanLength(uvElements, uvNext))
+    for k in range(len(xyElements)):
+        with stage("fine slice") as record:
+            xyPoints = xyLazy.spanPoints(xyElements[k], xyNext[k])
+            uvPoints = uvLazy.spanPoints(uvElements[k], uvNext[k])
+            record.output(xyPoints, uvPoints)
+        with stage("anchor interpolation") as record:
+            fraction = np.arange(segmentSampleCount(longest[k], step)) * step / longest[k] if longest[k] > 0 else np.empty(0)
+            #the same fraction of the fine polylines of both spans, which are slightly shorter than the true spans
+            (xyCumLength, uvCumLength) = (cumulativeLength(xyPoints), cumulativeLength(uvPoints))
+            slicedXY = pointsAlongPolyline(xyPoints, xyCumLength, fraction * xyCumLength[-1])
+            slicedUV = pointsAlongPolyline(uvPoints, uvCumLength, fraction * uvCumLength[-1])
+            record.output(slicedXY, slicedUV)
+        yield (slicedXY, slicedUV)
+
+#reslice the paths between the anchor points, see iterAnchorSpans
 def slicePathAnchorPoints(xyPath, xyAnchorPoints, uvPath, uvAnchorPoints, step) :
-    granularXY = slicePath(xyPath, 0.05) #slice the path in a very fine way to be interpolated later
-    granularUV = slicePath(uvPath, 0.05)
-    
-    slicedXY = np.empty((0,2), float)
-    slicedUV = np.empty((0,2), float)
-    
-    #go through the anchor points with slicing
-    for i in range(len(xyAnchorPoints)-1):
-        (appendXY, appendUV) = interpolateBetweenAnchors(xyPath, granularXY[0], xyAnchorPoints[i], xyAnchorPoints[i+1], uvPath, granularUV[0], uvAnchorPoints[i], uvAnchorPoints[i+1], step)
-        slicedXY = np.append(slicedXY, appendXY, axis = 0)
-        slicedUV = np.append(slicedUV, appendUV, axis = 0)
-        
-    #wrap around
-    (appendXY, appendUV) = interpolateBetweenAnchors(xyPath, granularXY[0], xyAnchorPoints[-1], xyAnchorPoints[0], uvPath, granularUV[0], uvAnchorPoints[-1], uvAnchorPoints[0], step)
-    slicedXY = np.append(slicedXY, appendXY, axis = 0)
-    slicedUV = np.append(slicedUV, appendUV, axis = 0)
-    
+    spans = list(iterAnchorSpans(xyPath, xyAnchorPoints, uvPath, uvAnchorPoints, step))
+    slicedXY = np.concatenate([span[0] for span in spans]) if spans else np.empty((0, 2))
+    slicedUV = np.concatenate([span[1] for span in spans]) if spans else np.empty((0, 2))
     return (slicedXY, slicedUV)
 
+#number of moves the gcode writer formats at once
+gcodeChunkSize = 4096
+
+#straight moves to the points first..end-1, formatting a whole chunk of points in one go
+#with feeds (see scheduleFeeds) every move gets its own feed feeds[i] instead of the one in moveFormat
+def iterLinearMoves(slicedXY, slicedUV, first, end, moveFormat, chunkSize, feeds = None):
+    columns = 4 if feeds is None else 5
+    if feeds is not None:
+        moveFormat = scheduledMoveFormat
+    for start in range(first, end, chunkSize):
+        stop = min(start + chunkSize, end)
+        chunk = np.empty((stop - start, columns), float)
+        chunk[:, 0:2] = slicedXY[start:stop]
+        chunk[:, 2:4] = slicedUV[start:stop]
+        if feeds is not None:
+            chunk[:, 4] = feeds[start:stop]
+        yield (moveFormat * (stop - start)) % tuple(chunk.ravel().tolist())
+
 #convert the pointsclouds slicedXY and slicedUV into gcode with a feedrate
-def translateToGcode(slicedXY, slicedUV, feedrate):
-    gcode = ""
-    gcode += "G28\n" #home
-    gcode += "M3\n"   #turn on hotwire
-    gcode += "G04 P2\n" #2 seconds pause for the hotwire to heat up
-    gcode += "G90\n"  #absolute mode
+#the gcode is generated chunk by chunk, so it can be written out while it is generated without ever holding all of it
+#arcs (see fitToolpathArcs) replace the straight moves through the points they span by one G02/G03
+def iterGcode(slicedXY, slicedUV, feedrate, chunkSize = gcodeChunkSize, arcs = ()):
+    return iterContoursGcode([(slicedXY, slicedUV, arcs)], feedrate, chunkSize)
+
+#straight move and arc format with a feed of their own, for scheduled feeds
+scheduledMoveFormat = "G01 X%.4f Y%.4f U%.4f V%.4f F%.4f\n"
+scheduledArcFormat = " X%.4f Y%.4f U%.4f V%.4f I%.4f J%.4f F%.4f\n"
+
+#feed, straight move and arc format of the gcode
+def gcodeFormats(feedrate):
+    feed = " F" + str(feedrate) + "\n"
     #all numeric values are rounded to 4 digits, not to overthrow the machine
-    gcode += "G01" + " X00" + " Y" + str(round(slicedXY[0][1], 4)) + " U00" + " V" + str(round(slicedUV[0][1], 4)) + " F" + str(feedrate) + "\n" #move to start position vertically first
-    
-    for i in range(len(slicedXY)):
-        gcode += "G01" + " X" + str(round(slicedXY[i][0], 4)) + " Y" + str(round(slicedXY[i][1], 4)) + " U" + str(round(slicedUV[i][0], 4)) + " V" + str(round(slicedUV[i][1], 4)) + " F" + str(feedrate) + "\n" #move to next point
-        
-    gcode += "G01" + " X" + str(round(slicedXY[0][0], 4)) + " Y" + str(round(slicedXY[0][1], 4)) + " U" + str(round(slicedUV[0][0], 4)) + " V" + str(round(slicedUV[0][1], 4)) + " F" + str(feedrate) + "\n" #close the path
-    
-    gcode += "G01" + " X00" + " Y" + str(round(slicedXY[0][1], 4)) + " U00" + " V" + str(round(slicedUV[0][1], 4)) + " F" + str(feedrate) + "\n" #pull wire back out     
-    gcode += "G04 P5\n" #5 seconds pause to finish any lagging in the wire
-    gcode += "M5\n"   #turn off hotwire
-    
+    moveFormat = "G01 X%.4f Y%.4f U%.4f V%.4f" + feed
+    arcFormat = " X%.4f Y%.4f U%.4f V%.4f I%.4f J%.4f" + feed
+    return (feed, moveFormat, arcFormat)
+
+#start of the gcode, the cut begins at firstXY, firstUV
+def gcodeHeader(feed, firstXY, firstUV):
+    header = "G28\n" #home
+    header += "M3\n"   #turn on hotwire
+    header += "G04 P2\n" #2 seconds pause for the hotwire to heat up
+    header += "G90\n"  #absolute mode
+    header += "G01 X00 Y%.4f U00 V%.4f" % (firstXY[1], firstUV[1]) + feed #move to start position vertically first
+    return header
+
+#end of the gcode, after the last contour was closed at lastXY, lastUV
+def gcodeFooter(feed, lastXY, lastUV):
+    footer = "G01 X00 Y%.4f U00 V%.4f" % (lastXY[1], lastUV[1]) + feed #pull wire back out
+    footer += "G04 P5\n" #5 seconds pause to finish any lagging in the wire
+    footer += "M5\n"   #turn off hotwire
+    return footer
+
+#gcode for several closed contours (slicedXY, slicedUV, arcs) cut one after the other in the given order.
+#the wire moves straight from the end of one contour to the start of the next one
+#feeds holds the feeds of every move of every contour (see scheduleContourFeeds), otherwise every move runs at feedrate.
+#with inverseTime the feeds are G93 inverse time feeds, the contours are cut in G93 and the moves to and from the foam in G94
+def iterContoursGcode(contours, feedrate, chunkSize = gcodeChunkSize, feeds = None, inverseTime = False):
+    (feed, moveFormat, arcFormat) = gcodeFormats(feedrate)
+    (firstXY, firstUV, firstArcs) = contours[0]
+    yield gcodeHeader(feed, firstXY[0], firstUV[0])
+    if inverseTime:
+        yield "G93\n"
+
+    for (index, (slicedXY, slicedUV, arcs)) in enumerate(contours):
+        contourFeeds = None if feeds is None else feeds[index]
+        #move to the next point, up to the start of the next arc and then along the arc
+        position = 0
+        for (first, last, clockwise, centerX, centerY) in arcs:
+            yield from iterLinearMoves(slicedXY, slicedUV, position, first + 1, moveFormat, chunkSize, contourFeeds)
+            command = "G02" if clockwise else "G03"
+            arc = (slicedXY[last][0], slicedXY[last][1], slicedUV[last][0], slicedUV[last][1], centerX - slicedXY[first][0], centerY - slicedXY[first][1])
+            if contourFeeds is None:
+                yield command + arcFormat % arc
+            else:
+                yield command + scheduledArcFormat % (arc + (contourFeeds[last],))
+            position = last + 1
+        yield from iterLinearMoves(slicedXY, slicedUV, position, len(slicedXY), moveFormat, chunkSize, contourFeeds)
+        #close the path
+        if contourFeeds is None:
+            yield moveFormat % (slicedXY[0][0], slicedXY[0][1], slicedUV[0][0], slicedUV[0][1])
+        else:
+            yield scheduledMoveFormat % (slicedXY[0][0], slicedXY[0][1], slicedUV[0][0], slicedUV[0][1], contourFeeds[-1])
+
+    if inverseTime:
+        yield "G94\n"
+    (lastXY, lastUV, lastArcs) = contours[-1]
+    yield gcodeFooter(feed, lastXY[0], lastUV[0])
+
+#iterContoursGcode for contours that come as iterators of (slicedXY, slicedUV) spans (see iterToolSpans), without arcs.
+#every span is turned into gcode as soon as it comes in, so the first lines are out before the later spans are even sliced
+def iterStreamedGcode(contours, feedrate, chunkSize = gcodeChunkSize):
+    (feed, moveFormat, arcFormat) = gcodeFormats(feedrate)
+    lastStart = None
+    for spans in contours:
+        start = None
+        for (slicedXY, slicedUV) in spans:
+            if len(slicedXY) == 0:
+                continue
+            if start is None:
+                start = (slicedXY[0], slicedUV[0])
+                if lastStart is None:
+                    yield gcodeHeader(feed, *start)
+            #the spans are calculated in between, outside of the stage
+            with stage("gcode") as record:
+                for chunk in iterLinearMoves(slicedXY, slicedUV, 0, len(slicedXY), moveFormat, chunkSize):
+                    record.bytes += len(chunk)
+                    yield chunk
+                record.points = len(slicedXY)
+        if start is not None:
+            yield moveFormat % (start[0][0], start[0][1], start[1][0], start[1][1]) #close the path
+            lastStart = start
+    if lastStart is not None:
+        yield gcodeFooter(feed, *lastStart)
+
+def translateToGcode(slicedXY, slicedUV, feedrate, arcs = ()):
+    with stage("gcode") as record:
+        gcode = "".join(iterGcode(slicedXY, slicedUV, feedrate, arcs = arcs))
+        record.points = len(slicedXY)
+        record.bytes = len(gcode)
     return gcode
 
+#write the gcode of the contours (see iterContoursGcode) chunk by chunk to a file, or to a socket. memory use doesn't grow with the number
+#of points, returns the number of lines written
+def writeContoursGcode(f, contours, feedrate, feeds = None, inverseTime = False):
+    with stage("gcode") as record:
+        (noLines, record.bytes) = writeChunks(f, iterContoursGcode(contours, feedrate, feeds = feeds, inverseTime = inverseTime))
+        record.points = sum(len(slicedXY) for (slicedXY, slicedUV, arcs) in contours)
+    return noLines
+
+#write gcode chunks to a file or a socket, returns the number of lines and characters written
+def writeChunks(f, chunks):
+    write = f.write if hasattr(f, "write") else (lambda chunk: f.sendall(chunk.encode()))
+    (noLines, noCharacters) = (0, 0)
+    for chunk in chunks:
+        write(chunk)
+        noLines += chunk.count("\n")
+        noCharacters += len(chunk)
+    return (noLines, noCharacters)
+
+#binary toolpath file: magic and version, length of the json header, the json header (settings with machine geometry and feedrate,
+#anchor indices, index of the first point of every contour, dtype and number of points), padding up to toolpathAlignment and then the XYUV points as one contiguous
+#little endian N x 4 array. the points can be memory mapped, so even huge toolpaths are previewed or converted without loading them
+toolpathMagic = b"HWTP"
+toolpathVersion = 1
+toolpathAlignment = 64
+toolpathPrefix = np.dtype([("magic", "S4"), ("version", "<u4"), ("headerLength", "<u4")])
+#number of points written at once
+toolpathChunkSize = 65536
+
+#the points are the tool points before simplifying, the simplification and arc fitting of the settings is done when converting to gcode
+def writeToolpath(toolpathFile, xyToolPoints, uvToolPoints, settings, anchorIndices, dtype = np.float64, contourStarts = (0,)):
+    dtype = np.dtype(dtype).newbyteorder("<")
+    if dtype.kind != "f":
+        raise ValueError("toolpath points have to be floats, not " + str(dtype))
+    header = {
+        "dtype": dtype.str,
+        "points": len(xyToolPoints),
+        "settings": completeSettings(settings),
+        "anchorIndices": [int(index) for index in anchorIndices],
+        "contours": [int(start) for start in contourStarts],
+    }
+    headerBytes = json.dumps(header).encode()
+    #pad the header with spaces, so the points start aligned
+    dataOffset = -(-(toolpathPrefix.itemsize + len(headerBytes)) // toolpathAlignment) * toolpathAlignment
+    headerBytes += b" " * (dataOffset - toolpathPrefix.itemsize - len(headerBytes))
+    with stage("toolpath") as record, open(toolpathFile, "wb") as f:
+        f.write(np.array((toolpathMagic, toolpathVersion, len(headerBytes)), toolpathPrefix).tobytes())
+        f.write(headerBytes)
+        for start in range(0, len(xyToolPoints), toolpathChunkSize):
+            stop = min(start + toolpathChunkSize, len(xyToolPoints))
+            chunk = np.empty((stop - start, 4), dtype)
+            chunk[:, 0:2] = xyToolPoints[start:stop]
+            chunk[:, 2:4] = uvToolPoints[start:stop]
+            f.write(chunk.tobytes())
+        record.points = len(xyToolPoints)
+        record.bytes = dataOffset + len(xyToolPoints) * 4 * dtype.itemsize
+
+#writeToolpath for the (xyToolPoints, uvToolPoints, anchorIndices) of several contours, stored one after the other
+def writeContoursToolpath(toolpathFile, toolpaths, settings, dtype = np.float64):
+    lengths = [len(xyToolPoints) for (xyToolPoints, uvToolPoints, anchorIndices) in toolpaths]
+    contourStarts = np.cumsum([0] + lengths)[:-1]
+    xyToolPoints = np.concatenate([toolpath[0] for toolpath in toolpaths])
+    uvToolPoints = np.concatenate([toolpath[1] for toolpath in toolpaths])
+    anchorIndices = np.concatenate([np.asarray(toolpath[2], int) + start for (toolpath, start) in zip(toolpaths, contourStarts)])
+    writeToolpath(toolpathFile, xyToolPoints, uvToolPoints, settings, anchorIndices, dtype, contourStarts)
+
+#a binary toolpath file, the points are memory mapped read only and only read from disk where they are used
+class Toolpath:
+    def __init__(self, toolpathFile):
+        with open(toolpathFile, "rb") as f:
+            prefix = np.frombuffer(f.read(toolpathPrefix.itemsize), toolpathPrefix)
+            if (len(prefix) != 1) or (prefix["magic"][0] != toolpathMagic):
+                raise ValueError(toolpathFile + ": not a toolpath file")
+            if prefix["version"][0] != toolpathVersion:
+                raise ValueError(toolpathFile + ": unsupported toolpath version %d" % prefix["version"][0])
+            headerLength = int(prefix["headerLength"][0])
+            self.header = json.loads(f.read(headerLength).decode())
+        dataOffset = toolpathPrefix.itemsize + headerLength
+        count = self.header["points"]
+        dtype = np.dtype(self.header["dtype"])
+        if os.path.getsize(toolpathFile) < dataOffset + count * 4 * dtype.itemsize:
+            raise ValueError(toolpathFile + ": truncated, %d points expected" % count)
+        if count > 0:
+            self.points = np.memmap(toolpathFile, dtype = dtype, mode = "r", offset = dataOffset, shape = (count, 4))
+        else:
+            self.points = np.empty((0, 4), dtype)
+        self.settings = completeSettings(self.header["settings"])
+        self.anchorIndices = np.array(self.header["anchorIndices"], int)
+        self.contourStarts = np.array(self.header.get("contours", [0]), int)
+
+    def __len__(self):
+        return len(self.points)
+
+    #the XY and UV tool points, views into the memory map
+    @property
+    def xyToolPoints(self):
+        return self.points[:, 0:2]
+
+    @property
+    def uvToolPoints(self):
+        return self.points[:, 2:4]
+
+    #(xyToolPoints, uvToolPoints, anchorIndices) of every contour, the points are views into the memory map
+    def contours(self):
+        ends = np.append(self.contourStarts[1:], len(self.points))
+        return [(self.points[start:end, 0:2], self.points[start:end, 2:4], self.anchorIndices[(self.anchorIndices >= start) & (self.anchorIndices < end)] - start) for (start, end) in zip(self.contourStarts, ends)]
+
+    def geometry(self):
+        return MachineGeometry(self.settings["gantryLength"], self.settings["foamWidth"], self.settings["distanceToXYaxis"])
+
+    #the contours for writeContoursGcode, with the simplification and arc fitting of the settings. without those, the gcode
+    #is streamed from the memory map chunk by chunk
+    def gcodeContours(self):
+        toolpaths = self.contours()
+        if (self.settings["tolerance"] > 0) or (self.settings["arcTolerance"] > 0) :
+            (contours, stats) = prepareGcodeContours(toolpaths, self.settings)
+            return contours
+        return [(xyToolPoints, uvToolPoints, []) for (xyToolPoints, uvToolPoints, anchorIndices) in toolpaths]
+
+    def iterGcode(self):
+        contours = self.gcodeContours()
+        return iterContoursGcode(contours, self.settings["feedrate"], **scheduleContourFeeds(contours, self.settings))
+
+    def writeGcode(self, f):
+        contours = self.gcodeContours()
+        return writeContoursGcode(f, contours, self.settings["feedrate"], **scheduleContourFeeds(contours, self.settings))
+
+    #check the tool points against the machine limits of the settings (or the given ones instead), see checkToolpaths.
+    #the contours are checked chunk by chunk from the file (see ToolpathVerifier), so a large toolpath is never all in memory
+    def verify(self, limits = {}, strict = False):
+        settings = dict(self.settings)
+        settings.update(limits)
+        contours = self.contours()
+        with stage("verification") as record:
+            issues = []
+            for (contour, (xyToolPoints, uvToolPoints, anchorIndices)) in enumerate(contours):
+                verifier = ToolpathVerifier(settings, contour)
+                for start in range(0, len(xyToolPoints), toolpathChunkSize):
+                    verifier.add(xyToolPoints[start:start + toolpathChunkSize], uvToolPoints[start:start + toolpathChunkSize])
+                issues.extend(verifier.finish())
+            record.points = sum(len(contour[0]) for contour in contours)
+        return rejectIssues(issues, len(contours), strict)
+
 def extractSvg(svgToParse, displayStep = 0.5):
 
     # read the SVG file
-    (path,dstring) = svg2paths(svgToParse)
+    path = readMergedPath(svgToParse)
     
     #slice the path. this is implemented for svg with only one path - svg2paths extracts the 1 layer svg into a whole path. elements can be unarranged
     if(path):
-        path = mergePath(path)
-        #path = parse_path(path_strings[0])
         (pointCloud, anchorPoints) = slicePath(path, displayStep)            
             
         return (pointCloud, anchorPoints, path)
     return "NO APPROPRIATE SVG PROVIDED"
 
-#sort path in a way that connects all elements/subpaths in a closed figure
-def mergePath(path):
-    sortedPath = Path()
-    sortedPath.append(path.pop(0)[0])
+#parse an svg file and merge its elements into one path. cached by the content of the file, an empty path if the svg has none
+#several closed contours follow each other in the path, see readContours for keeping them apart
+def readMergedPath(svgFile):
+    merged = Path()
+    for contour in readContours(svgFile):
+        merged.extend(contour)
+    return merged
+
+#parse an svg file into its closed contours (outlines, holes, several parts), one path per contour.
+#cached by the content of the file, an empty list if the svg has no elements
+def readContours(svgFile):
+    with open(svgFile, "rb") as f:
+        key = ("contours", mergeTolerance, hashlib.sha256(f.read()).hexdigest())
+    def compute():
+        with stage("extract") as record:
+            (path,dstring) = svg2paths(svgFile)
+            record.points = len(path)
+        with stage("merge") as record:
+            contours = mergePaths(path) if path else []
+            record.points = sum(len(contour) for contour in contours)
+        return contours
+    def encode(contours):
+        return {"d": np.array([contour.d() for contour in contours], str)}
+    def decode(arrays):
+        return [parse_path(str(d)) for d in arrays["d"]]
+    return sliceCache.lookup(key, compute, encode, decode)
+
+#move the end points of a path element, the shape in between stays as it is
+def snapSegment(segment, start, end):
+    if (segment.start == start) and (segment.end == end):
+        return segment
+    if isinstance(segment, Line):
+        return Line(start, end)
+    if isinstance(segment, CubicBezier):
+        return CubicBezier(start, segment.control1, segment.control2, end)
+    if isinstance(segment, QuadraticBezier):
+        return QuadraticBezier(start, segment.control, end)
+    if isinstance(segment, Arc):
+        return Arc(start, segment.radius, segment.rotation, segment.large_arc, segment.sweep, end)
+    raise ValueError("unsupported path element: " + type(segment).__name__)
+
+#index of the end points of path elements. points closer than tolerance end up on the same node, looking up
+#a point only checks the grid cells around it, so building the index is linear in the number of elements
+class EndpointIndex:
+    def __init__(self, tolerance):
+        self.tolerance = tolerance
+        self.cells = {}
+        self.points = []
+
+    #the node of a point, a new one if there is none within tolerance
+    def node(self, point):
+        (cx, cy) = (int(np.floor(point.real / self.tolerance)), int(np.floor(point.imag / self.tolerance)))
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for node in self.cells.get((cx + dx, cy + dy), ()):
+                    if abs(self.points[node] - point) <= self.tolerance:
+                        return node
+        node = len(self.points)
+        self.points.append(point)
+        self.cells.setdefault((cx, cy), []).append(node)
+        return node
+
+#connect all elements of the paths (in any order and direction) into closed figures, one path per loop.
+#end points within tolerance are snapped together. raises ValueError if the elements don't form closed loops
+def mergePaths(paths, tolerance = mergeTolerance):
+    segments = [segment for path in paths for segment in path]
+    index = EndpointIndex(tolerance)
+    ends = []
+    elementsAtNode = {}
+    for (i, segment) in enumerate(segments):
+        (startNode, endNode) = (index.node(segment.start), index.node(segment.end))
+        if startNode == endNode:
+            continue #degenerate element, shorter than the tolerance
+        ends.append((i, startNode, endNode))
+        elementsAtNode.setdefault(startNode, []).append(len(ends) - 1)
+        elementsAtNode.setdefault(endNode, []).append(len(ends) - 1)
     
-    while (len(path) != 0):
-        noneFound = True
-        for (i, element) in enumerate(path):
-            if (sortedPath[-1].end == element[0].start):
-                sortedPath.append(path.pop(i)[0])
-                noneFound = False
-                break
-            
-            if (sortedPath[-1].end == element[0].end):
-                sortedPath.append(path.pop(i)[0].reversed())
-                noneFound = False
-                break
-        
-        if noneFound:
-            print("error in svg: not a closed figure")
+    #every node of a closed figure is entered as often as it is left
+    for (node, elements) in elementsAtNode.items():
+        if len(elements) % 2 != 0:
+            point = index.points[node]
+            raise ValueError("error in svg: not a closed figure, open end at (%g, %g)" % (point.real, point.imag))
     
+    used = [False] * len(ends)
+    loops = []
+    for first in range(len(ends)):
+        if used[first]:
+            continue
+        (i, startNode, node) = ends[first]
+        used[first] = True
+        loop = Path(snapSegment(segments[i], index.points[startNode], index.points[node]))
+        while node != startNode:
+            element = next(e for e in elementsAtNode[node] if not used[e])
+            used[element] = True
+            (i, elementStart, elementEnd) = ends[element]
+            segment = segments[i]
+            if elementStart != node:
+                (segment, elementStart, elementEnd) = (segment.reversed(), elementEnd, elementStart)
+            loop.append(snapSegment(segment, index.points[elementStart], index.points[elementEnd]))
+            node = elementEnd
+        loops.append(loop)
+    return loops
+
+#sort path in a way that connects all elements/subpaths in a closed figure.
+#several closed figures (e.g. inner cutouts) follow each other in the returned path
+def mergePath(path, tolerance = mergeTolerance):
+    sortedPath = Path()
+    for loop in mergePaths(path, tolerance):
+        sortedPath.extend(loop)
     return sortedPath
     
+#centre of every contour relative to the bounding box of all of them, 0..1 in x and y
+def normalizedCenters(contours):
+    boxes = np.array([contour.bbox() for contour in contours]) #xmin, xmax, ymin, ymax
+    centers = np.column_stack(((boxes[:, 0] + boxes[:, 1]) / 2, (boxes[:, 2] + boxes[:, 3]) / 2))
+    minimum = np.array([boxes[:, 0].min(), boxes[:, 2].min()])
+    maximum = np.array([boxes[:, 1].max(), boxes[:, 3].max()])
+    return (centers - minimum) / np.maximum(maximum - minimum, 1e-9)
+
+#whether a point lies inside a closed polygon (even-odd rule, a ray to the right crosses its edges an odd number of times)
+def pointInPolygon(point, polygon):
+    (x, y) = point
+    (x1, y1) = (polygon[:, 0], polygon[:, 1])
+    (x2, y2) = (np.roll(x1, -1), np.roll(y1, -1))
+    crossing = (y1 > y) != (y2 > y)
+    with np.errstate(divide = "ignore", invalid = "ignore"):
+        crossingX = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    return bool(np.count_nonzero(crossing & (x < crossingX)) % 2)
+
+#which of the contours (point clouds) are holes: the ones inside an odd number of the other contours
+def contourHoles(pointClouds):
+    return [sum(pointInPolygon(pointCloud[0], other) for (j, other) in enumerate(pointClouds) if j != i) % 2 == 1 for (i, pointCloud) in enumerate(pointClouds)]
+
+#which UV contour belongs to which XY contour. the contours are matched by where they are within their plane, so a UV plane
+#that is scaled or moved against the XY plane (tapered wings) still pairs up. returns the index of the UV contour for every XY contour
+def pairContours(xyContours, uvContours):
+    if len(xyContours) != len(uvContours):
+        raise ValueError("the XY svg has %d contours, the UV svg %d" % (len(xyContours), len(uvContours)))
+    if len(xyContours) == 1:
+        return [0]
+    (xyCenters, uvCenters) = (normalizedCenters(xyContours), normalizedCenters(uvContours))
+    distance = np.hypot(*(xyCenters[:, np.newaxis, :] - uvCenters[np.newaxis, :, :]).transpose(2, 0, 1))
+    #closest pairs first
+    pairing = [None] * len(xyContours)
+    usedUV = set()
+    for flatIndex in np.argsort(distance, axis = None):
+        (i, j) = divmod(int(flatIndex), len(uvContours))
+        if (pairing[i] is None) and (j not in usedUV):
+            pairing[i] = j
+            usedUV.add(j)
+    return pairing
+
+#order in which to cut contours entered at entryPoints (one XYUV row per contour), so the wire travels as little as possible
+#between them: a nearest neighbour tour from start, improved with 2-opt moves until none of them shortens it. returns the contour indices in cutting order
+def orderCuts(entryPoints, start = (0.0, 0.0, 0.0, 0.0)):
+    entryPoints = np.asarray(entryPoints, float)
+    remaining = list(range(len(entryPoints)))
+    order = []
+    position = np.asarray(start, float)
+    while remaining:
+        nearest = int(np.argmin(np.linalg.norm(entryPoints[remaining] - position, axis = 1)))
+        order.append(remaining.pop(nearest))
+        position = entryPoints[order[-1]]
+
+    #2-opt on the open tour start -> order[0] -> ... -> order[-1]: reversing route[i+1..j] replaces the edges (i, i+1) and (j, j+1) by (i, j) and (i+1, j+1)
+    route = np.vstack((np.asarray(start, float), entryPoints[order]))
+    order = np.array(order)
+    n = len(route) - 1
+    improved = True
+    while improved:
+        improved = False
+        for i in range(n - 1):
+            j = np.arange(i + 2, n + 1)
+            removed = np.linalg.norm(route[i + 1] - route[i]) + np.linalg.norm(route[np.minimum(j + 1, n)] - route[j], axis = 1) * (j < n)
+            added = np.linalg.norm(route[j] - route[i], axis = 1) + np.linalg.norm(route[np.minimum(j + 1, n)] - route[i + 1], axis = 1) * (j < n)
+            gain = removed - added
+            best = int(np.argmax(gain))
+            if gain[best] > 1e-9:
+                route[i + 1:j[best] + 1] = route[i + 1:j[best] + 1][::-1].copy()
+                order[i:j[best]] = order[i:j[best]][::-1].copy()
+                improved = True
+    return [int(index) for index in order]
+
 #find the closest point to startPoint in pointCloud
+#for repeated lookups in the same point cloud, build a PointIndex once instead
 def findClosestPoint(startPoint, pointCloud):
-    closestDistance = -1 # set closest distance negative to indicate it hasnt been set
-    index = -1 # same with the index of the point
-    for i, point in enumerate(pointCloud):
-        distance = sqrt((point[0] - startPoint[0])**2 + (point[1] - startPoint[1])**2)
-        if (distance < closestDistance) or (closestDistance < 0) :
-            closestPoint = point
-            index = i
-            closestDistance = distance
-        
-    return closestPoint, index
+    pointCloud = np.asarray(pointCloud, float)
+    index = int(np.argmin((pointCloud[:, 0] - startPoint[0])**2 + (pointCloud[:, 1] - startPoint[1])**2))
+    return pointCloud[index], index
+
+#spatial index of a point cloud for nearest point lookups. the kd-tree is built once, every lookup after that is O(log n)
+class PointIndex:
+    def __init__(self, pointCloud):
+        self.pointCloud = np.asarray(pointCloud, float).reshape((-1, 2))
+        self.tree = None
+        if (cKDTree is not None) and (len(self.pointCloud) > 0) :
+            self.tree = cKDTree(self.pointCloud)
+
+    #the closest point to point and its index, like findClosestPoint
+    def closest(self, point):
+        if self.tree is None:
+            return findClosestPoint(point, self.pointCloud)
+        (distance, index) = self.tree.query(point)
+        return self.pointCloud[index], int(index)
+
+    #indices of the closest points to a whole array of points at once
+    def closestIndices(self, points):
+        points = np.asarray(points, float).reshape((-1, 2))
+        if self.tree is None:
+            return [findClosestPoint(point, self.pointCloud)[1] for point in points]
+        (distances, indices) = self.tree.query(points)
+        return [int(i) for i in indices]
     
+#the geometry of the machine and the placement of the foam in it, as a transform between the contours on the two sides of the foam and the points for the tools
+#the wire runs through the XY and UV contour on the sides of the foam (foamWidth apart), the XY tool is distanceToXYaxis before the XY side and the UV tool gantryLength after the XY tool
+#(usage of similar triangles). the transform is the same for X/U and Y/V and works on whole point clouds at once
+class MachineGeometry:
+    def __init__(self, gantryLength, foamWidth, distanceToXYaxis):
+        if np.any(np.asarray(foamWidth) <= 0) :
+            raise ValueError("the foam width has to be positive")
+        self.gantryLength = gantryLength
+        self.foamWidth = foamWidth
+        self.distanceToXYaxis = distanceToXYaxis
+
+    #foam -> tool: the points for the machine's axes for the contours on the foam
+    def toTool(self, xyPointCloud, uvPointCloud):
+        xyPointCloud = np.asarray(xyPointCloud, float)
+        slope = np.asarray(uvPointCloud, float) - xyPointCloud #how the wire runs through the foam
+        xyToolPointCloud = xyPointCloud - slope * (self.distanceToXYaxis / self.foamWidth)
+        uvToolPointCloud = xyToolPointCloud + slope * (self.gantryLength / self.foamWidth)
+        return (xyToolPointCloud, uvToolPointCloud)
+
+    #tool -> foam: the contours the wire cuts on the sides of the foam for the points of the machine's axes, for verifying a toolpath
+    def toFoam(self, xyToolPointCloud, uvToolPointCloud):
+        if (self.gantryLength == 0) :
+            raise ValueError("the gantry length has to be nonzero to map tool points back onto the foam")
+        xyToolPointCloud = np.asarray(xyToolPointCloud, float)
+        slope = (np.asarray(uvToolPointCloud, float) - xyToolPointCloud) * (self.foamWidth / self.gantryLength)
+        xyPointCloud = xyToolPointCloud + slope * (self.distanceToXYaxis / self.foamWidth)
+        return (xyPointCloud, xyPointCloud + slope)
+
 #calculate actual points for the machine's axes considering a gantry length and placement of the foam in it
 def calcToolPointClouds(xyPointCloud, uvPointCloud, gantryLength, foamWidth, distanceToXYaxis):
-    xyToolPointCloud = np.empty((0,2), float)
-    uvToolPointCloud = np.empty((0,2), float)
-    for i in range(len(xyPointCloud)):
-        #extract coordinates
-        x = xyPointCloud[i][0]
-        y = xyPointCloud[i][1]
-        u = uvPointCloud[i][0]
-        v = uvPointCloud[i][1]
-        
-        #calculate the coordinates on the tool axes (usage of similar triangles)
-        xt = x - (u-x) * distanceToXYaxis / foamWidth
-        ut = xt + (u-x) * gantryLength / foamWidth
-        yt = y - (v-y) * distanceToXYaxis / foamWidth
-        vt = yt + (v-y) * gantryLength / foamWidth
-        
-        #append to point cloud
-        xyToolPointCloud = np.append(xyToolPointCloud, [[xt, yt]], axis = 0)
-        uvToolPointCloud = np.append(uvToolPointCloud, [[ut, vt]], axis = 0)
-    
-    return (xyToolPointCloud, uvToolPointCloud)
-
-class gcodeGeneratorApp(tk.Tk):
-
-    def __init__(self, *args, **kwargs):
-        
-        tk.Tk.__init__(self, *args, **kwargs)
-
-        #iconpath = str(os.path.dirname(os.path.realpath(__file__)))+os.path.sep+'stonetronicsLogo.png'
-        #tk.Tk.iconphoto(True, tk.PhotoImage(file=iconpath))
-        tk.Tk.wm_title(self, "XYUV profile gcode generator")
-
-        container = tk.Frame(self)
-        container.pack(side="top", fill="both", expand = True)
-        container.grid_rowconfigure(0, weight=1)
-        container.grid_columnconfigure(0, weight=1)
-        
-        #svg file chooser
-        svgChooser = tk.Frame(container)
-        svgChooser.pack()
-        fileChooserFrame = tk.Frame(svgChooser)
-        fileChooserFrame.pack(side = tk.LEFT)
-        xyFileChooser = FileChooser(fileChooserFrame, "XY svg File:")
-        xyFileChooser.pack(side = tk.TOP)
-        uvFileChooser = FileChooser(fileChooserFrame, "UV svg File:")
-        uvFileChooser.pack(side = tk.BOTTOM)
-        def loadFiles():
-            (xyPc, self.xyAp, self.xyPath) = extractSvg(xyFileChooser.getFilePath())
-            (uvPc, self.uvAp, self.uvPath) = extractSvg(uvFileChooser.getFilePath()) 
-            self.anchorPointWidget.resetSelectedAnchorPoints()
-            #print (xyPc)
-            #print (uvPc)
-            self.anchorPointWidget.updateData(xyPc, self.xyAp, uvPc, self.uvAp)
-        loadButton = tk.Button(svgChooser, text = "load", command = loadFiles)
-        loadButton.pack(side = tk.RIGHT)
-        
-        #anchor points definement
-        self.anchorPointWidget = AnchorPointWidget(container)
-        self.anchorPointWidget.pack(side="top",fill='both',expand=True)
-
-        # "go" button
-        def openGeneration():
-            if (not hasattr(self, 'xyPath')) or (not hasattr(self, 'uvPath')) :
-                messagebox.showerror("load files first!", "Please load files and select anchor points before moving on to the generation")
-                return
-            (self.xySelAp, self.uvSelAp) = self.anchorPointWidget.getSelectedAnchorPoints()
-            noXySelAp = len(self.xySelAp)
-            noUvSelAp = len(self.uvSelAp)
-            if (noXySelAp != noUvSelAp) or (noXySelAp < 2) or (noUvSelAp < 2):
-                messagebox.showerror("improper anchor points!", "-Please select an equal number of anchor points on both planes\n-There need to be at least 2 anchor points on each axis")
-                return
-            data = (self.xyPath, self.xyAp, self.xySelAp, self.uvPath, self.uvAp, self.uvSelAp)
-            generationWindow = GenerationWindow(data)
-        goButton = tk.Button(container, text = "generate!", command = openGeneration)
-        goButton.pack()
-
-class FileChooser(tk.Frame):
-           
-    def __init__(self, parent, labeltext = "File:", types = (("svg files","*.svg"), ("all files","*.*")) ):
-        tk.Frame.__init__(self, parent)
-        self.types = types
-        
-        self.filepathLabel = tk.Label(self, text = labeltext)
-        self.filepathLabel.grid(row = 0, column = 0)
-        
-        self.filepathEntry = tk.Entry(self)
-        self.filepathEntry.grid(row = 0, column = 1)
-        
-        self.browseButton = tk.Button(self, text = "browse...", command = self.browseFile)
-        self.browseButton.grid(row = 0, column = 2)
-
-    def browseFile(self):
-        tmp = filedialog.askopenfilename(initialdir = "./", title = "select svg file", filetypes = self.types)
-        self.filepathEntry.delete(0, tk.END) #delete and overwrite the set filename
-        self.filepathEntry.insert(tk.INSERT, tmp)     
-        self.filepathEntry.xview("end") #scroll to the back so the filename can be read better      
-    
-    def getFilePath(self):
-        return self.filepathEntry.get()
-
-        
-        
-class AnchorPointWidget(tk.Frame):
-
-    def __init__(self, parent):
-        tk.Frame.__init__(self, parent)
-        
-        self.clickMode = "none"
-                
-        self.selectedXYAnchorPoints = np.empty((0,2), float)
-        self.selectedUVAnchorPoints = np.empty((0,2), float)
-             
-        self.header = tk.Frame(self)
-        self.header.pack(side = tk.TOP)
-        
-        def setClickMode(mode):
-            self.clickMode = mode
-
-        self.clickModeXYButton = tk.Button(self.header, text = "select XY anchor points", command = lambda: setClickMode("XY"))
-        self.clickModeXYButton.pack(side = tk.LEFT)
-        self.clickModeUVButton = tk.Button(self.header, text = "select UV anchor points", command = lambda: setClickMode("UV"))
-        self.clickModeUVButton.pack(side = tk.RIGHT)
-
-        self.f = Figure(figsize=(8,8), dpi=100)
-        self.a = self.f.add_subplot(111)
-        self.a.plot([[0]], [[0]], 'r') #plot only origin point at first
-        self.a.plot([[0]], [[0]], 'g')  
-        self.a.axis("equal")    
-        self.a.grid(color='grey', linestyle='-', linewidth=0.5)
-        self.a.legend(["XY", "UV"])  
-
-        self.canvas = FigureCanvasTkAgg(self.f, self)
-        self.canvas.draw()
-        self.canvas.get_tk_widget().pack(side=tk.BOTTOM, fill=tk.BOTH, expand=True)
-        
-        def mouseClickCallback(event):
-            if (not event.xdata) or (not event.ydata):
-                #click outside of the diagram => reset the click mode 
-                self.clickMode = "none"
-                return
-            clickPoint = np.array([event.xdata, event.ydata])
-            
-            if (self.clickMode == "XY"):
-                (closestPoint,index) = findClosestPoint(clickPoint, self.xyAnchorPoints)
-                if not any(np.equal(self.selectedXYAnchorPoints,[closestPoint]).all(1)) :
-                    self.selectedXYAnchorPoints = np.append(self.selectedXYAnchorPoints, [closestPoint], axis = 0)
-                else:
-                    index = np.where(np.all(self.selectedXYAnchorPoints == closestPoint, axis = 1))[0][0]
-                    self.selectedXYAnchorPoints = np.delete(self.selectedXYAnchorPoints, index, axis = 0)
-                self.updateDisplay()
-            elif (self.clickMode == "UV") :
-                (closestPoint,index) = findClosestPoint(clickPoint, self.uvAnchorPoints)
-                if not any(np.equal(self.selectedUVAnchorPoints,[closestPoint]).all(1)) :
-                    self.selectedUVAnchorPoints = np.append(self.selectedUVAnchorPoints, [closestPoint], axis = 0)
-                else:
-                    index = np.where(np.all(self.selectedUVAnchorPoints == closestPoint, axis = 1))[0][0]
-                    self.selectedUVAnchorPoints = np.delete(self.selectedUVAnchorPoints, index, axis = 0)
-                self.updateDisplay()
-            #else :
-            
-        self.canvas.mpl_connect ('button_press_event', mouseClickCallback)
-        
-        #toolbar = NavigationToolbar2TkAgg(self.canvas, self)
-        #toolbar.update()
-        self.canvas._tkcanvas.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
-        
-    def updateData(self, xyPointCloud, xyAnchorPoints, uvPointCloud, uvAnchorPoints):
-        self.xyPointCloud = xyPointCloud
-        self.xyAnchorPoints = xyAnchorPoints
-        self.uvPointCloud = uvPointCloud
-        self.uvAnchorPoints = uvAnchorPoints
-        self.updateDisplay()
-        
-    def updateDisplay(self):
-        #clear
-        self.a.clear()
-        #plot point clouds
-        self.a.plot(self.xyPointCloud[:,0], self.xyPointCloud[:,1], 'r')
-        self.a.plot(self.uvPointCloud[:,0], self.uvPointCloud[:,1], 'g') 
-        #plot anchor points
-        self.a.scatter(self.selectedXYAnchorPoints[:,0], self.selectedXYAnchorPoints[:,1], c = 'r')
-        for i, point in enumerate(self.selectedXYAnchorPoints):
-            self.a.annotate(i+1, point)   
-        self.a.scatter(self.selectedUVAnchorPoints[:,0], self.selectedUVAnchorPoints[:,1], c = 'g')
-        for i, point in enumerate(self.selectedUVAnchorPoints):
-            self.a.annotate(i+1, point)  
-        #plot lines between anchorpoints (only if there has been at np.empty((0,2), float)least one tuple of anchor points selected)
-        if ( (len(self.selectedUVAnchorPoints) > 0) and (len(self.selectedXYAnchorPoints) > 0) ):
-            if ( len(self.selectedXYAnchorPoints) < len(self.selectedUVAnchorPoints) ):
-                minNoSelectedAnchorPoints = len(self.selectedXYAnchorPoints)
+    return MachineGeometry(gantryLength, foamWidth, distanceToXYaxis).toTool(xyPointCloud, uvPointCloud)
+
+#how the feed of the gcode is set: "constant" runs every move at the feedrate along the XYUV move of the tools (F in G94),
+#"inverseTime" and "adjusted" time every move so the wire runs at the feedrate through the side of the foam where it moves farther
+#and slower through the other side, as a G93 inverse time feed or as the G94 feed along the XYUV move that takes the same time
+feedModes = ("constant", "inverseTime", "adjusted")
+#shortest time of a move [min], so moves without length don't get an infinite inverse time feed
+minimumMoveTime = 1e-6
+
+#lengths of the moves between the rows of points (any number of columns)
+def moveLengths(points):
+    return np.linalg.norm(np.diff(points, axis = 0), axis = 1)
+
+#time of every move [min] from its lengths on the XY and UV side of the foam and along the XYUV move of the tools, see feedModes
+def moveTimes(xyLengths, uvLengths, toolLengths, feedrate, feedMode):
+    if feedMode not in feedModes:
+        raise ValueError("unknown feed mode %r, one of %s" % (feedMode, ", ".join(feedModes)))
+    if (feedrate <= 0) :
+        raise ValueError("the feedrate has to be positive")
+    if (feedMode == "constant") :
+        times = toolLengths / feedrate
+    else:
+        times = np.maximum(xyLengths, uvLengths) / feedrate
+    return np.maximum(times, minimumMoveTime)
+
+#the speeds of the wire through the XY and UV side of the foam for the moves of a closed contour on the foam, move i goes from point i to i + 1
+def foamSpeeds(xyPoints, uvPoints, geometry, feedrate, feedMode):
+    closedXY = np.vstack((xyPoints, xyPoints[:1]))
+    closedUV = np.vstack((uvPoints, uvPoints[:1]))
+    (xyLengths, uvLengths) = (moveLengths(closedXY), moveLengths(closedUV))
+    toolLengths = moveLengths(np.hstack(geometry.toTool(closedXY, closedUV)))
+    times = moveTimes(xyLengths, uvLengths, toolLengths, feedrate, feedMode)
+    return (xyLengths / times, uvLengths / times)
+
+#width of the kerf the wire burns at the given speeds: kerfWidth at the feedrate, growing linearly to slowKerfWidth as the wire comes to a stop
+#(never less than kerfWidth, so slowKerfWidth = 0 is a kerf that doesn't depend on the speed)
+def kerfAtSpeeds(speeds, feedrate, kerfWidth, slowKerfWidth):
+    slowKerfWidth = max(slowKerfWidth, kerfWidth)
+    return slowKerfWidth + (kerfWidth - slowKerfWidth) * np.clip(speeds / feedrate, 0, 1)
+
+#longest offset of a corner point in units of the distance, sharper corners are cut off (a miter limit)
+offsetMiterLimit = 4.0
+
+#move a closed contour away from its inside by distances (one per point), negative distances move it inwards. every point moves
+#along the bisector of the normals of the edges before and after it, as far as it takes to be the distance away from both (a miter),
+#so straight edges keep their distance right into the corners
+def offsetOutwards(points, distances):
+    edges = np.roll(points, -1, axis = 0) - points #edge i runs from point i to i + 1
+    lengths = np.linalg.norm(edges, axis = 1)
+    edgeNormals = np.column_stack((edges[:, 1], -edges[:, 0])) / np.where(lengths == 0, 1, lengths)[:, np.newaxis]
+    #the normals point to the right of the direction of the contour, that is outwards if it runs counterclockwise
+    signedArea = np.sum(points[:, 0] * np.roll(points[:, 1], -1) - np.roll(points[:, 0], -1) * points[:, 1])
+    if (signedArea < 0) :
+        edgeNormals = -edgeNormals
+    #an edge without length takes the normal of the edge on the other side of the point
+    (before, after) = (np.roll(edgeNormals, 1, axis = 0), edgeNormals)
+    before = np.where((np.roll(lengths, 1) == 0)[:, np.newaxis], after, before)
+    after = np.where((lengths == 0)[:, np.newaxis], before, after)
+    #(n1 + n2) / (1 + n1.n2) is one along both unit normals
+    cosine = np.sum(before * after, axis = 1)
+    miters = (before + after) / np.maximum(1 + cosine, 2 / offsetMiterLimit**2)[:, np.newaxis]
+    return points + miters * distances[:, np.newaxis]
+
+#kerf compensation: the contours on the foam are moved away from the part by half the kerf the wire burns at every point, so the part comes out at its size.
+#the kerf depends on how fast the wire runs through each side of the foam (see kerfAtSpeeds and feedModes), the speed at a point is the mean of
+#the moves before and after it. the kerf goes to the outside of the outline of a part, and to the inside of a hole in it
+def compensateKerf(xyPoints, uvPoints, gantryLength, foamWidth, distanceToXYaxis, feedrate, feedMode, kerfWidth, slowKerfWidth, hole = False):
+    if (max(kerfWidth, slowKerfWidth) <= 0) or (len(xyPoints) < 3) :
+        return (xyPoints, uvPoints)
+    with stage("kerf") as record:
+        feedrate = float(feedrate)
+        geometry = MachineGeometry(gantryLength, foamWidth, distanceToXYaxis)
+        compensated = []
+        for (points, speeds) in zip((xyPoints, uvPoints), foamSpeeds(xyPoints, uvPoints, geometry, feedrate, feedMode)):
+            pointSpeeds = (speeds + np.roll(speeds, 1)) / 2
+            halfKerf = kerfAtSpeeds(pointSpeeds, feedrate, kerfWidth, slowKerfWidth) / 2
+            compensated.append(offsetOutwards(points, -halfKerf if hole else halfKerf))
+        record.output(*compensated)
+    return tuple(compensated)
+
+#feed of every move of a closed contour of tool points for the gcode (see feedModes): move i < n goes to point i, the first one from entry
+#(the XYUV position the wire comes from), and move n closes the contour back to point 0. an arc (first, last, ...) of the contour
+#gets the feed for the time of all moves it replaces at feeds[last], the feeds of the moves in between aren't used
+def scheduleFeeds(xyToolPoints, uvToolPoints, arcs, entry, geometry, feedrate, feedMode):
+    noPoints = len(xyToolPoints)
+    points = np.empty((noPoints + 2, 4), float)
+    points[0] = entry
+    points[1:noPoints + 1, 0:2] = xyToolPoints
+    points[1:noPoints + 1, 2:4] = uvToolPoints
+    points[noPoints + 1] = points[1]
+    (xyFoam, uvFoam) = geometry.toFoam(points[:, 0:2], points[:, 2:4])
+    toolLengths = moveLengths(points)
+    times = moveTimes(moveLengths(xyFoam), moveLengths(uvFoam), toolLengths, feedrate, feedMode)
+    if (feedMode == "inverseTime") :
+        feeds = 1 / times
+    else:
+        feeds = np.where(toolLengths > 0, toolLengths / times, feedrate)
+    if arcs:
+        cumulativeTimes = np.concatenate(([0.0], np.cumsum(times)))
+        cumulativeLengths = np.concatenate(([0.0], np.cumsum(toolLengths)))
+        for (first, last) in (arc[:2] for arc in arcs):
+            arcTime = cumulativeTimes[last + 1] - cumulativeTimes[first + 1]
+            arcLength = cumulativeLengths[last + 1] - cumulativeLengths[first + 1]
+            feeds[last] = 1 / arcTime if (feedMode == "inverseTime") else arcLength / arcTime
+    return feeds
+
+#the feeds for iterContoursGcode/writeContoursGcode of contours (xyToolPoints, uvToolPoints, arcs) cut one after the other, with the feed mode of the settings.
+#returns them as keyword arguments, without any for the constant feed
+def scheduleContourFeeds(contours, settings):
+    settings = completeSettings(settings)
+    if (settings["feedMode"] == "constant") or not contours:
+        return {}
+    with stage("feeds") as record:
+        geometry = MachineGeometry(settings["gantryLength"], settings["foamWidth"], settings["distanceToXYaxis"])
+        feedrate = float(settings["feedrate"])
+        #the header moves the wire to X0 U0 at the height of the first point
+        (firstXY, firstUV, firstArcs) = contours[0]
+        entry = (0.0, firstXY[0][1], 0.0, firstUV[0][1])
+        feeds = []
+        for (xyToolPoints, uvToolPoints, arcs) in contours:
+            feeds.append(scheduleFeeds(xyToolPoints, uvToolPoints, arcs, entry, geometry, feedrate, settings["feedMode"]))
+            entry = np.concatenate((xyToolPoints[0], uvToolPoints[0]))
+        record.output(*feeds)
+    return {"feeds": feeds, "inverseTime": settings["feedMode"] == "inverseTime"}
+
+#whether the gcode needs the whole toolpath of a contour at once, or can be written span by span while it is sliced
+def needsWholeToolpath(settings):
+    return (settings["tolerance"] > 0) or (settings["arcTolerance"] > 0) or (max(settings["kerfWidth"], settings["slowKerfWidth"]) > 0) or (settings["feedMode"] != "constant")
+
+#verification of the tool points against the machine: soft limits of the axes, length of the moves, sharp direction changes, acceleration and jerk
+#and self intersections of the contours. the checks work on whole arrays or on the runs of a streamed contour (see ToolpathVerifier),
+#the limits come from the settings (0 = not checked)
+#at most this many places of every problem are listed
+verificationExamples = 5
+#room for rounding errors when checking the limits [mm]
+verificationTolerance = 1e-6
+
+class ToolpathError(ValueError):
+    pass
+
+#one problem found by the verification: which check found it, in which contour, at which tool points and how bad it is at the worst of them
+def verificationIssue(check, contour, indices, worst, message):
+    indices = np.asarray(indices, int)
+    return {"check": check, "contour": contour, "count": len(indices), "indices": indices[:verificationExamples].tolist(), "worst": float(worst), "message": message}
+
+#the sorted distinct values of an integer array
+def sortedUnique(values):
+    values = np.sort(values)
+    return values[np.concatenate(([True], values[1:] != values[:-1]))] if len(values) else values
+
+#pairs of segments of a closed polyline (segment i goes from point i to i + 1) that cross each other, with the crossing points.
+#the segments are cut into pieces no longer than a cell of a uniform grid and registered in the (at most 4) cells their pieces touch,
+#only segments sharing a cell are compared, so this is about linear in the number of points instead of quadratic
+def selfIntersections(points):
+    points = np.asarray(points, float)
+    noPoints = len(points)
+    if (noPoints < 4) :
+        return (np.empty(0, int), np.empty(0, int), np.empty((0, 2)))
+    starts = points
+    moves = np.roll(points, -1, axis = 0) - points
+    lengths = np.hypot(moves[:, 0], moves[:, 1])
+    extent = float(np.max(points.max(axis = 0) - points.min(axis = 0)))
+    cellSize = max(2 * float(np.median(lengths)), extent / 4096, 1e-9)
+    pieceCounts = np.maximum(1, np.ceil(lengths / cellSize)).astype(int)
+    if (pieceCounts.sum() > 16 * noPoints) : #a few very long moves, use bigger cells rather than very many pieces
+        cellSize *= pieceCounts.sum() / (16 * noPoints)
+        pieceCounts = np.maximum(1, np.ceil(lengths / cellSize)).astype(int)
+
+    #the pieces of all segments and the cells of their corners
+    segments = np.repeat(np.arange(noPoints), pieceCounts)
+    piece = np.arange(len(segments)) - np.repeat(np.cumsum(pieceCounts) - pieceCounts, pieceCounts)
+    t = np.stack((piece, piece + 1)) / pieceCounts[segments]
+    corners = starts[segments] + t[..., np.newaxis] * moves[segments] #(2, pieces, 2)
+    low = np.floor((corners.min(axis = 0) - points.min(axis = 0)) / cellSize).astype(np.int64)
+    high = np.floor((corners.max(axis = 0) - points.min(axis = 0)) / cellSize).astype(np.int64)
+    rows = int(max(high[:, 1].max(), 0)) + 1
+    cells = np.concatenate([x * rows + y for x in (low[:, 0], high[:, 0]) for y in (low[:, 1], high[:, 1])])
+    entries = sortedUnique(cells * noPoints + np.tile(segments, 4))
+    (cells, segments) = (entries // noPoints, entries % noPoints)
+
+    #all pairs of segments within a cell: the entries are sorted by cell, so the pairs are the entries d apart in the same cell
+    (firsts, seconds) = ([], [])
+    groupStarts = np.flatnonzero(np.concatenate(([True], cells[1:] != cells[:-1], [True])))
+    for distance in range(1, int(np.diff(groupStarts).max())):
+        same = cells[distance:] == cells[:-distance]
+        firsts.append(segments[:-distance][same])
+        seconds.append(segments[distance:][same])
+    if not firsts:
+        return (np.empty(0, int), np.empty(0, int), np.empty((0, 2)))
+    (first, second) = (np.concatenate(firsts), np.concatenate(seconds))
+    #neighbouring segments share a point, that is no crossing
+    apart = (second - first > 1) & ~((first == 0) & (second == noPoints - 1))
+    pairs = sortedUnique(first[apart] * noPoints + second[apart])
+    (first, second) = (pairs // noPoints, pairs % noPoints)
+
+    #proper crossings: the ends of each segment lie on different sides of the other one
+    def cross(u, v):
+        return u[:, 0] * v[:, 1] - u[:, 1] * v[:, 0]
+    (a, b, c, d) = (starts[first], starts[first] + moves[first], starts[second], starts[second] + moves[second])
+    (side1, side2) = (cross(b - a, c - a), cross(b - a, d - a))
+    (side3, side4) = (cross(d - c, a - c), cross(d - c, b - c))
+    crossing = (side1 * side2 < 0) & (side3 * side4 < 0)
+    t = side3[crossing] / (side3[crossing] - side4[crossing])
+    return (first[crossing], second[crossing], a[crossing] + t[:, np.newaxis] * (b[crossing] - a[crossing]))
+
+#the checks that look at the points around every point, in the order they are reported, with their messages
+verificationMessages = {
+    "soft limits": "%(count)d points beyond the %(label)s travel of 0..%(limit)g mm, up to %(worst).3f mm",
+    "move length": "%(count)d XYUV moves longer than %(limit)g mm, up to %(worst).3f mm",
+    "direction change": "%(count)d XYUV direction changes sharper than %(limit)g degrees, up to %(worst).1f degrees",
+    "acceleration": "%(count)d points with acceleration above %(limit)g mm/s^2 at the feedrate, up to %(worst).3g mm/s^2",
+    "jerk": "%(count)d points with jerk above %(limit)g mm/s^3 at the feedrate, up to %(worst).3g mm/s^3",
+}
+#a streamed contour is checked with this many of the points before each run and after its end (for the wrap around to the first points)
+verificationContext = 16
+#the self intersections of a streamed contour are checked on every n-th point, n doubles whenever more than this many are kept
+verificationSamplePoints = 1 << 18
+
+#the checks of verificationMessages on a run of XYUV points that doesn't wrap around. a check at point i needs the points around it,
+#so every check looks at the points low..high of the run only: (check, label, limit, low, high, indices, values) with the points that
+#fail it and how bad they are. soft limits: X and U within 0..xTravel, Y and V within 0..yTravel, move i goes from point i to i + 1,
+#direction changes are between the moves that go somewhere, at the point between them. acceleration and jerk at the feedrate
+#(F in mm/min) from the second and third differences of the points over the length of the moves
+def pointFindings(points, settings):
+    findings = []
+    noPoints = len(points)
+    for (label, travel, columns) in (("X/U", settings["xTravel"], [0, 2]), ("Y/V", settings["yTravel"], [1, 3])):
+        if (travel > 0) :
+            overshoot = np.maximum(-points[:, columns], points[:, columns] - travel).max(axis = 1)
+            outside = np.flatnonzero(overshoot > verificationTolerance)
+            findings.append(("soft limits", label, travel, 0, noPoints - 1, outside, overshoot[outside]))
+
+    moves = np.diff(points, axis = 0)
+    lengths = np.linalg.norm(moves, axis = 1)
+    if (settings["maxMoveLength"] > 0) :
+        tooLong = np.flatnonzero(lengths > settings["maxMoveLength"] + verificationTolerance)
+        findings.append(("move length", None, settings["maxMoveLength"], 0, noPoints - 2, tooLong, lengths[tooLong]))
+
+    if (settings["maxDirectionChange"] > 0) :
+        moving = np.flatnonzero(lengths > verificationTolerance)
+        directions = moves[moving] / lengths[moving, np.newaxis]
+        angles = np.degrees(np.arccos(np.clip(np.einsum("ij,ij->i", directions[:-1], directions[1:]), -1, 1)))
+        sharp = np.flatnonzero(angles > settings["maxDirectionChange"])
+        #only the points after the first move that goes somewhere have a direction to change from
+        low = (moving[0] + 1) if (len(moving) > 1) else noPoints
+        findings.append(("direction change", None, settings["maxDirectionChange"], low, noPoints - 2, moving[1:][sharp], angles[sharp]))
+
+    if (settings["maxAcceleration"] > 0) or (settings["maxJerk"] > 0) :
+        speed = float(settings["feedrate"]) / 60
+        step = (lengths[:-1] + lengths[1:]) / 2 #around the points 1..n - 2
+        step[step == 0] = np.inf
+        secondDifference = np.linalg.norm(points[2:] - 2 * points[1:-1] + points[:-2], axis = 1)
+        thirdDifference = np.linalg.norm(points[3:] - 3 * points[2:-1] + 3 * points[1:-2] - points[:-3], axis = 1)
+        for (check, limit, values) in (("acceleration", settings["maxAcceleration"], speed**2 * secondDifference / step**2),
+                                       ("jerk", settings["maxJerk"], speed**3 * thirdDifference / step[:len(thirdDifference)]**3)):
+            if (limit > 0) :
+                high = np.flatnonzero(values > limit)
+                findings.append((check, None, limit, 1, len(values), high + 1, values[high]))
+    return findings
+
+#verifyToolpath for a closed contour whose tool points come in runs (the spans of iterToolSpans, the chunks of a toolpath file) and are never
+#all in memory: add every run, then finish gives the issues. each run is checked together with the last points of the one before, so every
+#point is checked once with all the points around it. the self intersections are checked on the contour thinned to at most
+#verificationSamplePoints points, so they can miss a crossing of moves shorter than the sampling
+class ToolpathVerifier:
+    def __init__(self, settings, contour = 0):
+        self.settings = completeSettings(settings)
+        self.contour = contour
+        self.noPoints = 0
+        self.head = np.empty((0, 4))
+        self.tail = np.empty((0, 4))
+        self.checked = {} #(check, label) -> the last point checked
+        self.firstChecked = {} #(check, label) -> the first point checked, the ones before are checked with the wrap around
+        self.found = {} #(check, label) -> the limit, the count, the first indices and the worst value
+        self.sampleStep = 1
+        self.samples = []
+        self.sampleIndices = []
+
+    def add(self, xyToolPoints, uvToolPoints):
+        run = np.empty((len(xyToolPoints), 4), float)
+        run[:, 0:2] = xyToolPoints
+        run[:, 2:4] = uvToolPoints
+        if (len(run) == 0) :
+            return
+        points = np.concatenate((self.tail, run))
+        self.check(points, self.noPoints - len(self.tail))
+        indices = np.arange(self.noPoints, self.noPoints + len(run))
+        kept = (indices % self.sampleStep) == 0
+        self.samples.append(run[kept])
+        self.sampleIndices.append(indices[kept])
+        if (sum(len(samples) for samples in self.samples) > verificationSamplePoints) :
+            self.sampleStep *= 2
+            (samples, indices) = (np.concatenate(self.samples), np.concatenate(self.sampleIndices))
+            kept = (indices % self.sampleStep) == 0
+            (self.samples, self.sampleIndices) = ([samples[kept]], [indices[kept]])
+        self.noPoints += len(run)
+        if (len(self.head) < verificationContext) :
+            self.head = np.concatenate((self.head, run[:verificationContext - len(self.head)]))
+        #the next run needs the last 3 points, and for the direction the last move that goes somewhere
+        context = points[-verificationContext:]
+        moving = np.flatnonzero(np.linalg.norm(np.diff(context, axis = 0), axis = 1) > verificationTolerance)
+        self.tail = context[max(min(len(context) - 3, moving[-1] if len(moving) else 0), 0):]
+
+    #the checks on points (the point offset + i of the contour at i), every point only by the first run that can check it. with wrap
+    #the points continue with the first ones of the contour again, up to the ones the first run couldn't check
+    def check(self, points, offset, wrap = False):
+        for (check, label, limit, low, high, indices, values) in pointFindings(points, self.settings):
+            key = (check, label)
+            if (high < low) :
+                continue
+            last = offset + high
+            if wrap:
+                last = min(last, self.noPoints + self.firstChecked.get(key, 0) - 1)
             else:
-                minNoSelectedAnchorPoints = len(self.selectedUVAnchorPoints)
-            for i in range(minNoSelectedAnchorPoints):
-                xCoordinates = [ self.selectedXYAnchorPoints[i][0], self.selectedUVAnchorPoints[i][0] ]
-                yCoordinates = [ self.selectedXYAnchorPoints[i][1], self.selectedUVAnchorPoints[i][1] ]
-                self.a.plot(xCoordinates, yCoordinates, 'grey')
-                
-        #visual settings
-        self.a.axis("equal")    
-        self.a.grid(color='grey', linestyle='-', linewidth=0.5)
-        self.a.legend(["XY", "UV"])  
-        self.canvas.draw()
-        
-    def getSelectedAnchorPoints(self):
-        return (self.selectedXYAnchorPoints, self.selectedUVAnchorPoints)
-        
-    def resetSelectedAnchorPoints(self):
-        self.selectedXYAnchorPoints = np.empty((0,2), float)
-        self.selectedUVAnchorPoints = np.empty((0,2), float)
-        
-class MachineGeometryDisplayWindow(tk.Toplevel):
-    def __init__(self):
-        tk.Toplevel.__init__(self)
-        self.image = tk.PhotoImage(file = "machineGeometry.png").subsample(3,3)
-        self.disp = tk.Label(self, image = self.image)
-        self.disp.pack()
-        
-class GenerationWindow(tk.Toplevel):
-    def __init__(self, data):
-        tk.Toplevel.__init__(self)
-        
-        self.generationWidget = GenerationWidget(self, data)
-        self.generationWidget.pack()
-        
-        self.outputFileFrame = tk.Frame(self)
-        self.outputFileFrame.pack()
-        self.outputfileChooser = FileSaveChooser(self.outputFileFrame, labeltext = "output file:")
-        self.outputfileChooser.pack(side = tk.LEFT)
-        def saveGcode():
-            f = open(self.outputfileChooser.getFilePath(), "w")
-            feedrate = self.generationWidget.FeedrateSpinbox.get()
-            f.write(translateToGcode(*self.generationWidget.getToolPoints(), feedrate))
-            f.close()
-        self.outputfileSaveButton = tk.Button(self.outputFileFrame, text = "save", command = saveGcode)
-        self.outputfileSaveButton.pack(side = tk.RIGHT)
-        
-        self.closeButton = tk.Button(self, text = "close", command = self.destroy)
-        self.closeButton.pack()
-        
-class FileSaveChooser(tk.Frame):
-           
-    def __init__(self, parent, labeltext = "File:", types = (("gcode files","*.gcode"), ("all files","*.*")) ):
-        tk.Frame.__init__(self, parent)
-        self.types = types
-        
-        self.filepathLabel = tk.Label(self, text = labeltext)
-        self.filepathLabel.grid(row = 0, column = 0)
-        
-        self.filepathEntry = tk.Entry(self)
-        self.filepathEntry.grid(row = 0, column = 1)
-        
-        self.browseButton = tk.Button(self, text = "browse...", command = self.browseFile)
-        self.browseButton.grid(row = 0, column = 2)
-               
-    def browseFile(self):
-        f = filedialog.asksaveasfile(parent = self.winfo_toplevel(), initialdir = "./", title = "select output file", filetypes = self.types)
-        tmp = f.name 
-        f.close()
-        self.filepathEntry.delete(0, tk.END) #delete and overwrite the set filename
-        self.filepathEntry.insert(tk.INSERT, tmp)     
-        self.filepathEntry.xview("end") #scroll to the back so the filename can be read better      
-    
-    def getFilePath(self):
-        return self.filepathEntry.get()
-        
-        
-class GenerationWidget(tk.Frame):
-    def __init__(self, parent, data):
-        tk.Frame.__init__(self, parent)
-        self.data = data
-               
-        #settings box
-        self.settingsFrame = tk.Frame(self)
-        self.settingsFrame.pack(side = tk.RIGHT)
-        
-        #gantry length spinbox
-        self.gantryLengthSpinboxLabel = tk.Label(self.settingsFrame, text = "Gantry length:")
-        self.gantryLengthSpinboxLabel.pack()
-        self.gantryLengthSpinbox = tk.Spinbox(self.settingsFrame, from_ = 0, to = 10000, increment=1) # arbitrarily large from/to values for using spinbox as number input
-        self.gantryLengthSpinbox.delete(0, "end")
-        self.gantryLengthSpinbox.insert(0, '1000') #default val
-        self.gantryLengthSpinbox.pack()
-        
-        #foam width spinbox
-        self.foamWidthSpinboxLabel = tk.Label(self.settingsFrame, text = "Foam width:")
-        self.foamWidthSpinboxLabel.pack()
-        self.foamWidthSpinbox = tk.Spinbox(self.settingsFrame, from_ = 0, to = 10000, increment=1) # arbitrarily large from/to values for using spinbox as number input
-        self.foamWidthSpinbox.delete(0, "end")
-        self.foamWidthSpinbox.insert(0, '500') #default val
-        self.foamWidthSpinbox.pack()
-        
-        #distance from foam to xy axes spinbox
-        self.distanceToXYSpinboxLabel = tk.Label(self.settingsFrame, text = "distance Foam - XY axes:")
-        self.distanceToXYSpinboxLabel.pack()
-        self.distanceToXYSpinbox = tk.Spinbox(self.settingsFrame, from_ = 0, to = 10000, increment=1) # arbitrarily large from/to values for using spinbox as number input
-        self.distanceToXYSpinbox.delete(0, "end")
-        self.distanceToXYSpinbox.insert(0, '25') #default val
-        self.distanceToXYSpinbox.pack()
-        
-        #button for showing the machine geometry
-        self.recalcBtn = tk.Button(self.settingsFrame, text = "machine geometry", command = lambda: MachineGeometryDisplayWindow())
-        self.recalcBtn.pack() 
-        
-        #granularity slider
-        self.granularityLabel = tk.Label(self.settingsFrame, text = "granularity [mm] :")
-        self.granularityLabel.pack()
-        self.granularitySlider = tk.Scale(self.settingsFrame, from_ = 0.1, to=3, orient=tk.HORIZONTAL, resolution = 0.1)
-        self.granularitySlider.set(0.5)
-        self.granularitySlider.pack()
-        
-        #spinboxes for y and v offset
-        self.YSpinboxLabel = tk.Label(self.settingsFrame, text = "Y Offset:")
-        self.YSpinboxLabel.pack()
-        self.YSpinbox = tk.Spinbox(self.settingsFrame, from_ = -10000, to = 10000, increment=1) # arbitrarily large from/to values for using spinbox as number input
-        self.YSpinbox.delete(0, "end")
-        self.YSpinbox.insert(0, '0') #default val
-        self.YSpinbox.pack()
-        self.VSpinboxLabel = tk.Label(self.settingsFrame, text = "V Offset:")
-        self.VSpinboxLabel.pack()
-        self.VSpinbox = tk.Spinbox(self.settingsFrame, from_ = -10000, to = 10000, increment=1)
-        self.VSpinbox.delete(0, "end")
-        self.VSpinbox.insert(0, '0') #default val
-        self.VSpinbox.pack()  
-        
-        #spinboxes for x and u offset
-        self.XSpinboxLabel = tk.Label(self.settingsFrame, text = "X Offset:")
-        self.XSpinboxLabel.pack()
-        self.XSpinbox = tk.Spinbox(self.settingsFrame, from_ = -10000, to = 10000, increment=1) # arbitrarily large from/to values for using spinbox as number input
-        self.XSpinbox.delete(0, "end")
-        self.XSpinbox.insert(0, '0') #default val
-        self.XSpinbox.pack()
-        self.USpinboxLabel = tk.Label(self.settingsFrame, text = "U Offset:")
-        self.USpinboxLabel.pack()
-        self.USpinbox = tk.Spinbox(self.settingsFrame, from_ = -10000, to = 10000, increment=1)
-        self.USpinbox.delete(0, "end")
-        self.USpinbox.insert(0, '0') #default val
-        self.USpinbox.pack()
-        
-        #checkboxes for inverting the direction of the points
-        self.reverseXY = ttk.Checkbutton(self.settingsFrame, text = "reverse XY direction")
-        self.reverseXY.state(['!disabled','!alternate'])
-        self.reverseXY.pack()
-        self.reverseUV = ttk.Checkbutton(self.settingsFrame, text = "reverse UV direction")
-        self.reverseUV.state(['!disabled','!alternate'])
-        self.reverseUV.pack()
-        
-        #spinbox for the feedrate
-        self.FeedrateSpinboxLabel = tk.Label(self.settingsFrame, text = "Feedrate:")
-        self.FeedrateSpinboxLabel.pack()
-        self.FeedrateSpinbox = tk.Spinbox(self.settingsFrame, from_ = 0, to = 200, increment=0.1)
-        self.FeedrateSpinbox.delete(0, "end")
-        self.FeedrateSpinbox.insert(0, '5') #default val
-        self.FeedrateSpinbox.pack()
-        
-        #button for triggering recalculation
-        self.recalcBtn = tk.Button(self.settingsFrame, text = "recalculate!", command = self.updateDisplay)
-        self.recalcBtn.pack()      
-        
-        #the figure itself
-        self.f = Figure(figsize=(8,8), dpi=100)
-        self.a = self.f.add_subplot(111)
-        self.a.plot([[0]], [[0]], 'r') #plot only origin point at first
-        self.a.plot([[0]], [[0]], 'g')  
-        self.a.axis("equal")    
-        self.a.grid(color='grey', linestyle='-', linewidth=0.5)
-        self.a.legend(["XY", "UV"])  
-
-        self.canvas = FigureCanvasTkAgg(self.f, self)
-        self.canvas.draw()
-        self.canvas.get_tk_widget().pack(side = tk.LEFT, expand=True)
-        
-    def calculate(self):
-        #reverse the paths if necessary
-        if (self.reverseXY.instate(['selected']) ):
-            self.xyUsedPath = self.data[0].reversed()
+                self.firstChecked.setdefault(key, offset + low)
+            indices = indices + offset
+            new = (indices > self.checked.get(key, -1)) & (indices <= last)
+            self.checked[key] = max(self.checked.get(key, -1), last)
+            if new.any():
+                (indices, values) = (indices[new] % self.noPoints if wrap else indices[new], values[new])
+                found = self.found.setdefault(key, {"limit": limit, "count": 0, "indices": [], "worst": -np.inf})
+                found["count"] += len(indices)
+                found["indices"].extend(indices[:verificationExamples - len(found["indices"])].tolist())
+                found["worst"] = max(found["worst"], float(values.max()))
+
+    #the issues of the contour (see verificationIssue), empty if everything is fine. planes are the whole XY and UV points of the contour
+    #if they are at hand, the self intersections are then checked on them instead of the samples
+    def finish(self, planes = None):
+        if (self.noPoints == 0) :
+            return []
+        self.check(np.concatenate((self.tail, self.head)), self.noPoints - len(self.tail), wrap = True)
+        issues = []
+        order = list(verificationMessages)
+        for key in sorted(self.found, key = lambda key: (order.index(key[0]), key[1] or "")):
+            found = self.found[key]
+            message = verificationMessages[key[0]] % {"label": key[1], **found}
+            issue = verificationIssue(key[0], self.contour, found["indices"], found["worst"], message)
+            issue["count"] = found["count"]
+            issues.append(issue)
+
+        if planes is None:
+            (samples, indices) = (np.concatenate(self.samples), np.concatenate(self.sampleIndices))
+            planes = (samples[:, 0:2], samples[:, 2:4])
         else:
-            self.xyUsedPath = self.data[0]
-        if (self.reverseUV.instate(['selected']) ):
-            self.uvUsedPath = self.data[3].reversed()
+            indices = np.arange(self.noPoints)
+        for (name, planePoints) in zip(("XY", "UV"), planes):
+            (first, second, crossings) = selfIntersections(planePoints)
+            if len(first):
+                issues.append(verificationIssue("self intersection", self.contour, indices[first], len(first),
+                    "the %s contour crosses itself %d times, first at %.2f, %.2f" % (name, len(first), crossings[0, 0], crossings[0, 1])))
+        return issues
+
+#check the tool points of one closed contour, returns a list of issues (see verificationIssue), empty if everything is fine
+def verifyToolpath(xyToolPoints, uvToolPoints, settings, contour = 0):
+    verifier = ToolpathVerifier(settings, contour)
+    verifier.add(xyToolPoints, uvToolPoints)
+    return verifier.finish((np.asarray(xyToolPoints, float), np.asarray(uvToolPoints, float)))
+
+#the spans of a contour passed through while the verifier checks them, its issues are added to issues at the end
+def verifiedSpans(spans, verifier, issues):
+    for (xyToolPoints, uvToolPoints) in spans:
+        with stage("verification") as record:
+            verifier.add(xyToolPoints, uvToolPoints)
+            record.points = len(xyToolPoints)
+        yield (xyToolPoints, uvToolPoints)
+    with stage("verification"):
+        issues.extend(verifier.finish())
+
+#verifyToolpath for the (xyToolPoints, uvToolPoints, anchorIndices) of every contour
+def verifyContours(toolpaths, settings):
+    with stage("verification") as record:
+        issues = []
+        for (contour, (xyToolPoints, uvToolPoints, anchorIndices)) in enumerate(toolpaths):
+            issues.extend(verifyToolpath(xyToolPoints, uvToolPoints, settings, contour))
+        record.points = sum(len(toolpath[0]) for toolpath in toolpaths)
+    return issues
+
+def formatIssues(issues, contours = 1):
+    lines = []
+    for issue in issues:
+        where = ("contour %d: " % issue["contour"]) if (contours > 1) else ""
+        lines.append("%s%s: %s (at points %s)" % (where, issue["check"], issue["message"], ", ".join(str(i) for i in issue["indices"])))
+    return "\n".join(lines)
+
+#verify the toolpaths before they are written: with strict any problem stops the generation with a ToolpathError,
+#otherwise the problems are returned to warn about them
+def checkToolpaths(toolpaths, settings, strict = False):
+    return rejectIssues(verifyContours(toolpaths, settings), len(toolpaths), strict)
+
+#the issues of a verification of that many contours, a ToolpathError with strict if there are any
+def rejectIssues(issues, contours, strict = False):
+    if issues and strict:
+        raise ToolpathError("the toolpath fails the verification:\n" + formatIssues(issues, contours))
+    return issues
+
+def printIssues(issues, contours = 1):
+    for line in formatIssues(issues, contours).splitlines():
+        print("warning: " + line, file = sys.stderr)
+
+#drop the points of the toolpath that are within tolerance of the straight XYUV move that replaces them (ramer-douglas-peucker in 4 dimensions)
+#the anchor points are never dropped. returns the simplified tool points, the anchor indices in them and the indices of the kept points
+def simplifyToolpath(xyToolPoints, uvToolPoints, anchorIndices, tolerance):
+    noPoints = len(xyToolPoints)
+    #the closed toolpath as XYUV points, the first point repeated at the end like the gcode closes the path
+    points = np.empty((noPoints + 1, 4), float)
+    points[:noPoints, 0:2] = xyToolPoints
+    points[:noPoints, 2:4] = uvToolPoints
+    points[noPoints] = points[0]
+
+    keep = np.zeros(noPoints + 1, bool)
+    breaks = sorted(set(int(i) for i in anchorIndices) | {0, noPoints})
+    keep[breaks] = True
+
+    #simplify every span between two anchor points on its own
+    stack = [(breaks[k], breaks[k + 1]) for k in range(len(breaks) - 1)]
+    while stack:
+        (first, last) = stack.pop()
+        if (last - first < 2) :
+            continue
+        #distance of all points in between to the move from first to last
+        move = points[last] - points[first]
+        offsets = points[first + 1:last] - points[first]
+        moveLength = np.dot(move, move)
+        if (moveLength > 0) :
+            t = np.clip(offsets @ move / moveLength, 0, 1)
         else:
-            self.uvUsedPath = self.data[3]
-        #get the step for slicing from the slider
-        step = self.granularitySlider.get()   
+            t = np.zeros(len(offsets))
+        distances = np.linalg.norm(offsets - t[:, np.newaxis] * move, axis = 1)
+        farthest = int(np.argmax(distances))
+        if (distances[farthest] > tolerance) :
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+
+    kept = np.flatnonzero(keep[:noPoints])
+    simplifiedAnchorIndices = [int(i) for i in np.searchsorted(kept, anchorIndices)]
+    return (xyToolPoints[kept], uvToolPoints[kept], simplifiedAnchorIndices, kept)
+
+#center and radius of the circle through three points, None if they are on a line
+def circleThroughPoints(a, b, c):
+    d = 2 * (a[0] * (b[1] - c[1]) + b[0] * (c[1] - a[1]) + c[0] * (a[1] - b[1]))
+    if (abs(d) < 1e-12) :
+        return None
+    aa = a[0]**2 + a[1]**2
+    bb = b[0]**2 + b[1]**2
+    cc = c[0]**2 + c[1]**2
+    centerX = (aa * (b[1] - c[1]) + bb * (c[1] - a[1]) + cc * (a[1] - b[1])) / d
+    centerY = (aa * (c[0] - b[0]) + bb * (a[0] - c[0]) + cc * (b[0] - a[0])) / d
+    return (centerX, centerY, sqrt((a[0] - centerX)**2 + (a[1] - centerY)**2))
+
+#checks if the tool points first..last can be cut as one arc, returns (clockwise, centerX, centerY) or None
+#that is the case if the XY points lie on a circle within tolerance, going around it in one direction, and the UV points follow them at a constant offset,
+#so the same arc describes both planes
+def fitArc(xyToolPoints, uvToolPoints, first, last, tolerance):
+    xy = xyToolPoints[first:last + 1]
+    uv = uvToolPoints[first:last + 1]
+    #the UV plane has to be the XY plane shifted
+    shift = uv - xy
+    if np.any(np.abs(shift - shift[0]) > tolerance):
+        return None
+    circle = circleThroughPoints(xy[0], xy[len(xy) // 2], xy[-1])
+    if circle is None:
+        return None
+    (centerX, centerY, radius) = circle
+    relative = xy - (centerX, centerY)
+    if np.any(np.abs(np.hypot(relative[:, 0], relative[:, 1]) - radius) > tolerance):
+        return None
+    #all points have to go around the center the same way, and less than once
+    cross = relative[:-1, 0] * relative[1:, 1] - relative[:-1, 1] * relative[1:, 0]
+    dot = np.einsum("ij,ij->i", relative[:-1], relative[1:])
+    if not (np.all(cross > 0) or np.all(cross < 0)):
+        return None
+    if (np.sum(np.abs(np.arctan2(cross, dot))) >= 2 * np.pi - 1e-6) :
+        return None
+    #if a straight line would do just as well, leave it to the straight moves
+    chord = xy[-1] - xy[0]
+    chordLength = np.hypot(*chord)
+    if (chordLength > 0) :
+        sagitta = np.abs(chord[0] * (xy[:, 1] - xy[0, 1]) - chord[1] * (xy[:, 0] - xy[0, 0])).max() / chordLength
+        if (sagitta <= tolerance) :
+            return None
+    return (bool(cross[0] < 0), centerX, centerY)
+
+#find the runs of the toolpath that can be cut as single G02/G03 arcs (see fitArc), never across an anchor point
+#returns a list of (first, last, clockwise, centerX, centerY), sorted along the toolpath
+#the arc moves need a controller that runs the arc in the XY and the UV plane together, with the same I and J
+def fitToolpathArcs(xyToolPoints, uvToolPoints, anchorIndices, tolerance, minPoints = 5):
+    noPoints = len(xyToolPoints)
+    breaks = sorted(set(int(i) for i in anchorIndices) | {0, noPoints - 1})
+    arcs = []
+    for (spanStart, spanEnd) in zip(breaks[:-1], breaks[1:]):
+        first = spanStart
+        while (spanEnd - first + 1 >= minPoints) :
+            #grow the arc as far as it fits: double the length first, then narrow down the end
+            last = first + minPoints - 1
+            fit = fitArc(xyToolPoints, uvToolPoints, first, last, tolerance)
+            if fit is None:
+                first += 1
+                continue
+            tooLong = None
+            while (last < spanEnd) :
+                candidate = min(first + 2 * (last - first), spanEnd)
+                candidateFit = fitArc(xyToolPoints, uvToolPoints, first, candidate, tolerance)
+                if candidateFit is None:
+                    tooLong = candidate
+                    break
+                (last, fit) = (candidate, candidateFit)
+            if tooLong is not None:
+                while (tooLong - last > 1) :
+                    candidate = (last + tooLong) // 2
+                    candidateFit = fitArc(xyToolPoints, uvToolPoints, first, candidate, tolerance)
+                    if candidateFit is None:
+                        tooLong = candidate
+                    else:
+                        (last, fit) = (candidate, candidateFit)
+            arcs.append((first, last) + fit)
+            first = last
+    return arcs
+
+#the steps between the tool points and the gcode: fitting arcs and simplifying the rest, depending on the settings
+#returns the tool points for the gcode, the arcs in them, the numbers of points before and after and the number of moves through them
+#(an arc is one move for all the points it spans)
+def prepareGcodeToolpath(xyToolPoints, uvToolPoints, anchorIndices, settings):
+    settings = completeSettings(settings)
+    stats = {"points": len(xyToolPoints)}
+    arcs = []
+    if (settings["arcTolerance"] > 0) :
+        with stage("arc fitting") as record:
+            arcs = fitToolpathArcs(xyToolPoints, uvToolPoints, anchorIndices, settings["arcTolerance"])
+            record.points = len(arcs)
+    if (settings["tolerance"] > 0) :
+        with stage("simplify") as record:
+            #the ends of the arcs have to survive the simplification like the anchor points
+            breaks = list(anchorIndices) + [arc[0] for arc in arcs] + [arc[1] for arc in arcs]
+            (xyToolPoints, uvToolPoints, simplifiedBreaks, kept) = simplifyToolpath(xyToolPoints, uvToolPoints, breaks, settings["tolerance"])
+            arcs = [(int(np.searchsorted(kept, arc[0])), int(np.searchsorted(kept, arc[1]))) + arc[2:] for arc in arcs]
+            record.output(xyToolPoints, uvToolPoints)
+    stats["simplifiedPoints"] = len(xyToolPoints)
+    stats["arcs"] = len(arcs)
+    stats["moves"] = len(xyToolPoints) - sum(arc[1] - arc[0] - 1 for arc in arcs)
+    return (xyToolPoints, uvToolPoints, arcs, stats)
+
+#the settings of a generation, with the values the generation window starts with
+defaultSettings = {
+    "gantryLength": 1000.0,
+    "foamWidth": 500.0,
+    "distanceToXYaxis": 25.0,
+    "granularity": 0.5,
+    "xOffset": 0.0,
+    "yOffset": 0.0,
+    "uOffset": 0.0,
+    "vOffset": 0.0,
+    "reverseXY": False,
+    "reverseUV": False,
+    "feedrate": 5.0,
+    "tolerance": 0.0,
+    "arcTolerance": 0.0,
+    "optimizeCutOrder": True,
+    "feedMode": "constant",
+    "kerfWidth": 0.0,
+    "slowKerfWidth": 0.0,
+    "xTravel": 0.0,
+    "yTravel": 0.0,
+    "maxMoveLength": 0.0,
+    "maxDirectionChange": 175.0,
+    "maxAcceleration": 0.0,
+    "maxJerk": 0.0,
+}
+
+#fill in the default for every setting that isn't given. raises a ValueError for unknown settings and for a granularity
+#or feedrate that isn't positive, nothing could be sliced or cut with those
+def completeSettings(settings):
+    unknown = set(settings) - set(defaultSettings)
+    if unknown:
+        raise ValueError("unknown settings: " + ", ".join(sorted(unknown)))
+    completed = dict(defaultSettings)
+    completed.update(settings)
+    for name in ("granularity", "feedrate"):
+        if not (float(completed[name]) > 0) :
+            raise ValueError("%s has to be greater than 0, not %s" % (name, completed[name]))
+    return completed
+
+#one stage of a calculation that remembers its last inputs and result, and only runs again when one of its inputs changed
+#numpy arrays and paths (usually the results of other stages) are compared by identity, settings by value
+class MemoizedStage:
+    def __init__(self, function):
+        self.function = function
+        self.lastInputs = None
+        self.result = None
+        self.runs = 0
+
+    def __call__(self, *inputs):
+        if (self.lastInputs is None) or not all(sameInput(a, b) for (a, b) in zip(inputs, self.lastInputs)):
+            self.result = self.function(*inputs)
+            self.lastInputs = inputs
+            self.runs += 1
+        return self.result
+
+def sameInput(a, b):
+    if a is b:
+        return True
+    if isinstance(a, (np.ndarray, Path)) or isinstance(b, (np.ndarray, Path)):
+        return False
+    return (type(a) == type(b)) and (a == b)
+
+def orientPath(path, reverse):
+    return path.reversed() if reverse else path
+
+def findAnchorIndices(xyPoints, xyAnchorPoints):
+    with stage("anchor indices") as record:
+        anchorIndices = PointIndex(xyPoints).closestIndices(xyAnchorPoints)
+        record.output(anchorIndices)
+    return anchorIndices
+
+def offsetPoints(xyPoints, uvPoints, xOffset, yOffset, uOffset, vOffset):
+    with stage("offsets") as record:
+        offset = (xyPoints + (xOffset, yOffset), uvPoints + (uOffset, vOffset))
+        record.output(*offset)
+    return offset
+
+def projectToTool(xyPoints, uvPoints, gantryLength, foamWidth, distanceToXYaxis):
+    with stage("projection") as record:
+        toolPoints = MachineGeometry(gantryLength, foamWidth, distanceToXYaxis).toTool(xyPoints, uvPoints)
+        record.output(*toolPoints)
+    return toolPoints
+
+#raised by ToolpathCalculation.calculate when checkCancelled says the result isn't wanted anymore
+class CalculationCancelled(Exception):
+    pass
+
+#the calculation from the loaded paths and the selected anchor points to the points for the tools, as a chain of memoized stages:
+#reverse -> reslice between the anchor points -> anchor indices -> offsets -> kerf compensation -> projection to the tools
+#keeping one instance around makes recalculating cheap: changing offsets or the machine geometry only reruns the projection, changing the granularity only reslices
+class ToolpathCalculation:
+    def __init__(self):
+        self.xyPath = MemoizedStage(orientPath)
+        self.uvPath = MemoizedStage(orientPath)
+        self.slice = MemoizedStage(slicePathAnchorPoints)
+        self.anchorIndices = MemoizedStage(findAnchorIndices)
+        self.offset = MemoizedStage(offsetPoints)
+        self.kerf = MemoizedStage(compensateKerf)
+        self.project = MemoizedStage(projectToTool)
+
+    #returns the points on the foam (the path of the wire, with the kerf compensation), the indices of the anchor points in them and the points for the tools
+    #checkCancelled is asked between the stages, if it returns True the calculation stops with CalculationCancelled. hole: the contours are a hole in the part (see compensateKerf)
+    def calculate(self, xyPath, xyAnchorPoints, uvPath, uvAnchorPoints, settings, checkCancelled = None, hole = False):
+        def checkpoint():
+            if (checkCancelled is not None) and checkCancelled():
+                raise CalculationCancelled()
+
+        settings = completeSettings(settings)
+        #reverse the paths if necessary
+        xyPath = self.xyPath(xyPath, settings["reverseXY"])
+        uvPath = self.uvPath(uvPath, settings["reverseUV"])
+        checkpoint()
         #slice the path
-        (self.xyPoints, self.uvPoints) = slicePathAnchorPoints(self.xyUsedPath, self.data[2], self.uvUsedPath, self.data[5], step)
+        (xyPoints, uvPoints) = self.slice(xyPath, xyAnchorPoints, uvPath, uvAnchorPoints, settings["granularity"])
+        checkpoint()
         #get anchor point indices
-        self.anchorIndices = []
-        for i in range(len(self.data[2])): #go through all anchor points
-            (point,index) = findClosestPoint(self.data[2][i], self.xyPoints)
-            self.anchorIndices.append(index)
+        anchorIndices = self.anchorIndices(xyPoints, xyAnchorPoints)
         #add offsets
-        self.xyPoints[:,0] += float(self.XSpinbox.get())
-        self.xyPoints[:,1] += float(self.YSpinbox.get())
-        self.uvPoints[:,0] += float(self.USpinbox.get())
-        self.uvPoints[:,1] += float(self.VSpinbox.get())
+        (xyPoints, uvPoints) = self.offset(xyPoints, uvPoints, settings["xOffset"], settings["yOffset"], settings["uOffset"], settings["vOffset"])
+        #move the contours out by half the kerf
+        (xyPoints, uvPoints) = self.kerf(xyPoints, uvPoints, settings["gantryLength"], settings["foamWidth"], settings["distanceToXYaxis"], settings["feedrate"], settings["feedMode"], settings["kerfWidth"], settings["slowKerfWidth"], hole)
+        checkpoint()
         #calculate points for the tools
-        
-        (self.xyToolPoints, self.uvToolPoints) = calcToolPointClouds(self.xyPoints, self.uvPoints, float(self.gantryLengthSpinbox.get()) , float(self.foamWidthSpinbox.get()), float(self.distanceToXYSpinbox.get()) )
-        
-    def updateDisplay(self):
-        #recalculate points
-        self.calculate()
-        
-        self.a.clear()
-        
-        #do the plotting here!
-        self.a.scatter(self.uvToolPoints[:,0], self.uvToolPoints[:,1], c = '#00b500', s = 1) #dark green
-        self.a.scatter(self.uvPoints[:,0], self.uvPoints[:,1], c = '#00ff00', s = 1) #bright green
-        self.a.scatter(self.xyPoints[:,0], self.xyPoints[:,1], c = '#ff0000', s = 1) #bright red, size = 1
-        self.a.scatter(self.xyToolPoints[:,0], self.xyToolPoints[:,1], c = '#b50000', s = 1) #dark red
-        self.a.legend(["UV tool", "UV on foam", "XY on foam", "XY tool"])  
-        
-        #draw arrow indicating direction
-        ylim = self.a.get_ylim()
-        xlim = self.a.get_xlim()
-        arrowLength = ((ylim[1]-ylim[0]) + (xlim[1]-xlim[0]))/2
-        arrowLength = arrowLength / 15
-        self.a.arrow(*getArrowAtPoint(self.xyToolPoints, self.xyToolPoints[self.anchorIndices[0]], arrowLength), head_width = arrowLength / 2.5, color = "#750000")
-        self.a.arrow(*getArrowAtPoint(self.uvToolPoints, self.uvToolPoints[self.anchorIndices[0]], arrowLength), head_width = arrowLength / 2.5, color = "#007500")
-        
-        #draw lines between corresponding anchors/points
-        for anchorIndex in self.anchorIndices :
-            xCoordinates = [ self.xyToolPoints[anchorIndex][0], self.uvToolPoints[anchorIndex][0] ]
-            yCoordinates = [ self.xyToolPoints[anchorIndex][1], self.uvToolPoints[anchorIndex][1] ]
-            self.a.plot(xCoordinates, yCoordinates, 'grey')
-        
-        #visual settings
-        self.a.axis("equal")    
-        self.a.grid(color='grey', linestyle='-', linewidth=0.5)
-        self.canvas.draw()
-    
-    def getPoints(self):
-        return (self.xyPoints, self.uvPoints) 
-    
-    def getToolPoints(self):
-        return (self.xyToolPoints, self.uvToolPoints)
-    
-        
-app = gcodeGeneratorApp()
+        (xyToolPoints, uvToolPoints) = self.project(xyPoints, uvPoints, settings["gantryLength"], settings["foamWidth"], settings["distanceToXYaxis"])
+        return (xyPoints, uvPoints, anchorIndices, xyToolPoints, uvToolPoints)
+
+#the whole calculation in one go, see ToolpathCalculation
+def calculateToolpath(xyPath, xyAnchorPoints, uvPath, uvAnchorPoints, settings, hole = False):
+    return ToolpathCalculation().calculate(xyPath, xyAnchorPoints, uvPath, uvAnchorPoints, settings, hole = hole)
+
+#calculateToolpath for a cut of planCuts
+def calculateCut(cut, settings):
+    (xyPath, xyAnchorPoints, uvPath, uvAnchorPoints, hole) = cut
+    return calculateToolpath(xyPath, xyAnchorPoints, uvPath, uvAnchorPoints, settings, hole)
+
+#the same calculation as ToolpathCalculation, but the tool points come out span by span (see iterAnchorSpans) as (xyToolPoints, uvToolPoints)
+#every span is offset and projected as soon as it is sliced
+def iterToolSpans(xyPath, xyAnchorPoints, uvPath, uvAnchorPoints, settings):
+    settings = completeSettings(settings)
+    xyPath = orientPath(xyPath, settings["reverseXY"])
+    uvPath = orientPath(uvPath, settings["reverseUV"])
+    for (slicedXY, slicedUV) in iterAnchorSpans(xyPath, xyAnchorPoints, uvPath, uvAnchorPoints, settings["granularity"]):
+        (xyPoints, uvPoints) = offsetPoints(slicedXY, slicedUV, settings["xOffset"], settings["yOffset"], settings["uOffset"], settings["vOffset"])
+        yield projectToTool(xyPoints, uvPoints, settings["gantryLength"], settings["foamWidth"], settings["distanceToXYaxis"])
+
+#automatic anchor matching: both contours are normalized by their length, every anchor point (the start of an element) gets the turning of the
+#contour around it as signature and the two sequences of anchor points are aligned by dynamic time warping. the corners of the XY contour and
+#the UV anchor points they are aligned with are proposed as anchor pairs
+#fraction of the length of the contour the turning around an anchor point is summed over
+anchorSignatureWindow = 0.02
+#least turning [rad] around an XY anchor point to be proposed, its UV partner needs half of it
+anchorCornerAngle = np.radians(25)
+#weight of the distance of the normalized positions against the difference of the turning (in units of pi) in the alignment
+anchorPositionWeight = 1.0
+#weight of the distance of the anchor points within the bounding boxes of their contours (as fractions of the longer side) in the alignment.
+#it tells the lobes of a symmetric contour apart, which turn the same and whose positions depend on where the contour starts
+anchorPlaneWeight = 1.0
+#number of UV anchor points that are tried as partner of the first XY anchor point, on a coarse alignment of at most anchorCoarseSize anchor points
+anchorStartCandidates = 6
+anchorCoarseSize = 256
+
+#direction of a path element at t as a complex number of length 1
+def elementTangent(e, t):
+    if isinstance(e, Line):
+        direction = e.end - e.start
+    else:
+        try:
+            direction = complex(e.unit_tangent(t))
+        except (AssertionError, ValueError, ZeroDivisionError): #degenerate element
+            direction = e.end - e.start
+    return direction / abs(direction) if (direction != 0) and np.isfinite(direction) else 1 + 0j
+
+#turning [rad] of a path element from its start to its end, 0 for lines
+def elementTurning(e):
+    if isinstance(e, Line):
+        return 0.0
+    tangents = np.array([elementTangent(e, t) for t in np.linspace(0, 1, 9)])
+    return float(np.sum(np.angle(tangents[1:] * np.conj(tangents[:-1]))))
+
+#turning of a path element at its start and along it [rad], for all elements of a path. counterclockwise turning is positive
+def pathTurning(path):
+    startTangents = np.array([elementTangent(e, 0) for e in path])
+    endTangents = np.array([elementTangent(e, 1) for e in path])
+    return (np.angle(startTangents * np.conj(np.roll(endTangents, 1))), np.array([elementTurning(e) for e in path], float))
+
+#the anchor points of a closed path as (anchor indices, normalized positions, turning, corner, plane): for every element starting at one of anchorPoints,
+#the fraction of the length of the path before it, the turning of the path [rad] summed over window around its start (the corners between
+#the elements and the curvature of the elements, counted at their middle), the turning at its start alone and where it is in the bounding box of
+#the path (x and y from its center, as fractions of its longer side)
+def anchorSignature(path, anchorPoints, window = anchorSignatureWindow):
+    lazy = lazyPath(path)
+    if (len(path) == 0) or (lazy.length() <= 0) :
+        raise ValueError("can't match the anchor points of an empty path")
+    anchorIndexOf = {}
+    for (i, point) in enumerate(np.asarray(anchorPoints, float).tolist()):
+        anchorIndexOf.setdefault(tuple(point), i)
+    (cornerTurning, elementTurnings) = pathTurning(path)
+    positions = lazy.cumLengths[:-1] / lazy.length()
+    #turning at the start of every element and along every element, in the order along the path
+    eventPositions = np.column_stack((positions, positions + lazy.lengths / lazy.length() / 2)).ravel()
+    eventTurning = np.column_stack((cornerTurning, elementTurnings)).ravel()
+    #the path is closed, so the window wraps around its start
+    extendedPositions = np.concatenate((eventPositions - 1, eventPositions, eventPositions + 1))
+    cumulativeTurning = np.concatenate(([0.0], np.cumsum(np.tile(eventTurning, 3))))
+    upper = np.searchsorted(extendedPositions, positions + window / 2, side = "right")
+    lower = np.searchsorted(extendedPositions, positions - window / 2, side = "left")
+    summedTurning = cumulativeTurning[upper] - cumulativeTurning[lower]
+    indices = np.array([anchorIndexOf.get((e.start.real, e.start.imag), -1) for e in path], int)
+    (unique, first) = np.unique(indices, return_index = True)
+    first = np.sort(first[unique >= 0])
+    starts = np.array([(e.start.real, e.start.imag) for e in path], float)
+    (low, high) = (starts.min(axis = 0), starts.max(axis = 0))
+    plane = (starts - (low + high) / 2) / max(float(np.max(high - low)), 1e-12)
+    return (indices[first], positions[first], summedTurning[first], cornerTurning[first], plane[first])
+
+#dynamic time warping of two sequences of feature rows a (n x d) and b (m x d), matching two rows costs the L1 distance of their features.
+#the cells are computed one anti-diagonal i + j = k at a time: every cell of a diagonal only depends on the two diagonals before it, and along
+#a diagonal i runs up while j runs down, so with b reversed a whole diagonal is one vectorized step on contiguous slices.
+#band (lowest and highest j of every row i, both never decreasing) limits the warping path to the cells within it, see warpingBand,
+#only the cells of the band are computed and stored. returns the total cost and the warping path from (0, 0) to (n - 1, m - 1) as an array of (i, j)
+def warpingPath(a, b, band = None):
+    (n, m) = (len(a), len(b))
+    rows = np.arange(n)
+    (lowest, highest) = band if (band is not None) else (np.zeros(n, int), np.full(n, m - 1))
+    reversedB = np.ascontiguousarray(b[::-1])
+    #the directions of the cells of row i start at rowStarts[i] (for cell j = lowest[i])
+    rowStarts = np.concatenate(([0], np.cumsum(highest - lowest + 1)))
+    directions = np.empty(rowStarts[-1], np.int8) #0: from (i - 1, j - 1), 1: from (i - 1, j), 2: from (i, j - 1)
+    #the rows of every diagonal within the band
+    diagonals = np.arange(n + m - 1)
+    diagonalLows = np.searchsorted(highest + rows, diagonals, side = "left")
+    diagonalHighs = np.searchsorted(lowest + rows, diagonals, side = "right")
+    #the diagonals are indexed by i + 1, index 0 and the cells outside of the matrix or the band stay infinite
+    beforePrevious = np.full(n + 1, np.inf)
+    previous = np.full(n + 1, np.inf)
+    current = np.full(n + 1, np.inf)
+    written = [(0, 0), (0, 0), (0, 0)] #the rows of current, previous and beforePrevious that hold values
+    for k in range(n + m - 1):
+        (low, high) = (int(diagonalLows[k]), int(diagonalHighs[k]))
+        #row i of a against row k - i of b, which is row m - 1 - k + i of reversedB
+        cost = np.abs(a[low:high] - reversedB[m - 1 - k + low:m - 1 - k + high]).sum(axis = 1)
+        current[written[0][0] + 1:written[0][1] + 1] = np.inf
+        i = rows[low:high]
+        if (k == 0) :
+            current[1] = cost[0]
+            directions[0] = 0
+        else:
+            (diagonal, up, left) = (beforePrevious[low:high], previous[low:high], previous[low + 1:high + 1])
+            best = np.minimum(np.minimum(diagonal, up), left)
+            current[low + 1:high + 1] = cost + best
+            directions[rowStarts[i] + (k - i) - lowest[i]] = np.where(diagonal == best, 0, np.where(up == best, 1, 2))
+        written[0] = (low, high)
+        (beforePrevious, previous, current) = (previous, current, beforePrevious)
+        written = [written[2], written[0], written[1]]
+    path = [(n - 1, m - 1)]
+    (i, j) = (n - 1, m - 1)
+    while (i > 0) or (j > 0) :
+        direction = directions[rowStarts[i] + j - lowest[i]]
+        if (direction != 2) :
+            i -= 1
+        if (direction != 1) :
+            j -= 1
+        path.append((i, j))
+    return (float(previous[n]), np.array(path[::-1], int))
+
+#the band of warpingPath for an n x m alignment around the warping path of a coarse one (of every xyStep-th and uvStep-th row, see coarseSignature):
+#every row may go radius coarse cells beyond the columns the coarse path reaches between the coarse rows around it
+def warpingBand(coarsePath, xyStep, uvStep, n, m, radius = 2):
+    coarseRows = coarsePath[-1, 0] + 1
+    firstColumns = np.full(coarseRows, np.iinfo(int).max)
+    lastColumns = np.zeros(coarseRows, int)
+    np.minimum.at(firstColumns, coarsePath[:, 0], coarsePath[:, 1])
+    np.maximum.at(lastColumns, coarsePath[:, 0], coarsePath[:, 1])
+    coarseRow = np.arange(n) // xyStep
+    lowest = np.clip((firstColumns[coarseRow] - radius) * uvStep, 0, m - 1)
+    highest = np.clip((lastColumns[np.minimum(coarseRow + 1, coarseRows - 1)] + 1 + radius) * uvStep - 1, 0, m - 1)
+    return (lowest, highest)
+
+#the alignment of two signatures (see anchorSignature) by their turning and positions, see warpingPath
+def alignSignatures(xySignature, uvSignature, band = None):
+    def features(signature):
+        return np.column_stack((signature[2] / np.pi, anchorPositionWeight * signature[1], anchorPlaneWeight * signature[4]))
+    return warpingPath(features(xySignature), features(uvSignature), band)
+
+#a signature rotated to start at element start, with the positions counted from there
+def rotateSignature(signature, start):
+    rotated = [np.roll(array, -start, axis = 0) for array in signature]
+    rotated[1] = np.mod(rotated[1] - signature[1][start], 1.0)
+    return tuple(rotated)
+
+#the step that takes a signature down to at most size elements for a coarse alignment
+def coarseStep(signature, size):
+    return max(1, -(-len(signature[0]) // size))
+
+#every step-th element of a signature, for a coarse alignment
+def coarseSignature(signature, size):
+    return tuple(array[::coarseStep(signature, size)] for array in signature)
+
+#propose anchor pairs for two closed contours (oriented the way they are cut), see anchorSignature and warpingPath.
+#returns the XY and UV anchor indices (into xyAnchorPoints and uvAnchorPoints) of the pairs in the order of the XY contour,
+#starting at its most pronounced corner, at least 2 pairs, and whether the pairs are for the UV path reversed (when it runs the other way round
+#than the XY path, the UV anchor indices then follow uvPath.reversed() and it has to be cut reversed). raises a ValueError if nothing matches
+def matchAnchors(xyPath, xyAnchorPoints, uvPath, uvAnchorPoints):
+    with stage("anchor matching") as record:
+        xySignature = anchorSignature(xyPath, xyAnchorPoints)
+        uvSignature = anchorSignature(uvPath, uvAnchorPoints)
+        if (len(xySignature[0]) < 2) or (len(uvSignature[0]) < 2) :
+            raise ValueError("can't match the anchor points, a contour has less than 2 of them")
+        #a UV contour running the other way round is matched as its reversal, its anchor points are the same
+        reverseUV = bool(sum(np.sum(turning) for turning in pathTurning(xyPath)) * sum(np.sum(turning) for turning in pathTurning(uvPath)) < 0)
+        if reverseUV:
+            uvSignature = anchorSignature(uvPath.reversed(), uvAnchorPoints)
+        #how pronounced the anchor points are: the turning around them, the sharpest corner first if that is the same
+        def prominence(signature):
+            return np.abs(signature[2]) + np.abs(signature[3])
+        xyStart = int(np.argmax(prominence(xySignature)))
+        startPosition = xySignature[1][xyStart]
+        xySignature = rotateSignature(xySignature, xyStart)
+        (xyIndices, xyPositions, xyTurning, xyCorners, xyPlane) = xySignature
+
+        #the UV anchor points turning most like the first XY anchor point, the one at the same position and the one at the same place
+        #in the bounding box are tried as its partner
+        (uvIndices, uvPositions, uvTurning, uvCorners, uvPlane) = uvSignature
+        candidates = set(np.argsort(np.abs(uvTurning - xyTurning[0]))[:anchorStartCandidates].tolist())
+        positionDistances = np.abs(uvPositions - startPosition)
+        candidates.add(int(np.argmin(np.minimum(positionDistances, 1 - positionDistances))))
+        candidates.add(int(np.argmin(np.linalg.norm(uvPlane - xyPlane[0], axis = 1))))
+        best = None
+        for uvStart in sorted(candidates):
+            (total, path) = alignSignatures(coarseSignature(xySignature, anchorCoarseSize), coarseSignature(rotateSignature(uvSignature, uvStart), anchorCoarseSize))
+            if (best is None) or (total < best[0]) :
+                best = (total, uvStart, path)
+        uvSignature = rotateSignature(uvSignature, best[1])
+        (uvIndices, uvPositions, uvTurning, uvCorners, uvPlane) = uvSignature
+        #the full alignment stays close to the coarse one, so only a band around it is computed instead of all n x m cells
+        (xyStep, uvStep) = (coarseStep(xySignature, anchorCoarseSize), coarseStep(uvSignature, anchorCoarseSize))
+        band = warpingBand(best[2], xyStep, uvStep, len(xyIndices), len(uvIndices)) if (xyStep > 1) or (uvStep > 1) else None
+        (total, path) = alignSignatures(xySignature, uvSignature, band)
+
+        #the corners of the XY contour, the most pronounced ones first and none within the window of a more pronounced one
+        #(the first one, where the contours start, is kept even if it isn't a corner)
+        order = np.argsort(-prominence(xySignature), kind = "stable")
+        corners = [0]
+        for i in order[np.abs(xyTurning[order]) >= anchorCornerAngle]:
+            distances = np.abs(xyPositions[corners] - xyPositions[i])
+            if np.all(np.minimum(distances, 1 - distances) > anchorSignatureWindow):
+                corners.append(int(i))
+        #the partner of a corner is the UV anchor point the alignment put against it, the most pronounced one if it put several there
+        xySelected = []
+        uvSelected = []
+        for i in sorted(corners):
+            aligned = path[path[:, 0] == i, 1]
+            j = int(aligned[np.argmax(prominence(uvSignature)[aligned])])
+            matches = (i == 0) or ((abs(uvTurning[j]) >= anchorCornerAngle / 2) and (np.sign(uvTurning[j]) == np.sign(xyTurning[i])))
+            if matches and ((not uvSelected) or (j > uvSelected[-1])) :
+                xySelected.append(i)
+                uvSelected.append(j)
+        if (len(xySelected) < 2) :
+            #no corners to go by, pair the starts and the anchor points halfway along the contours (after the starts, so there are always 2 pairs)
+            i = 1 + int(np.argmin(np.abs(xyPositions[1:] - 0.5)))
+            aligned = path[(path[:, 0] == i) & (path[:, 1] > 0), 1]
+            if (len(aligned) == 0) :
+                aligned = np.arange(1, len(uvIndices))
+            j = int(aligned[np.argmin(np.abs(uvPositions[aligned] - 0.5))])
+            (xySelected, uvSelected) = ([0, i], [0, j])
+        record.points = len(xySelected)
+    return ([int(xyIndices[i]) for i in xySelected], [int(uvIndices[j]) for j in uvSelected], reverseUV)
+
+#pick anchor points of an svg. the selection holds indices into its anchor points or [x, y] coordinates, which snap to the closest anchor point
+def selectAnchorPoints(anchorPoints, selection):
+    selected = []
+    anchorIndex = PointIndex(anchorPoints)
+    for entry in selection:
+        if isinstance(entry, (list, tuple)):
+            (point, index) = anchorIndex.closest(np.array(entry, float))
+        else:
+            index = int(entry)
+            if not (0 <= index < len(anchorPoints)):
+                raise ValueError("anchor index %d out of range, there are %d anchor points" % (index, len(anchorPoints)))
+        selected.append(anchorPoints[index])
+    return np.array(selected, float).reshape((-1, 2))
+
+#the anchor selections of both planes from the command line, either as comma separated indices, from a json file {"xy": [...], "uv": [...]}
+#or "auto" for matching them automatically (see matchAnchors). a selection is (xy, uv, reverseUV), see planCuts
+def readAnchorSelection(args):
+    if getattr(args, "autoAnchors", False):
+        return "auto"
+    if args.anchorFile:
+        with open(args.anchorFile) as f:
+            return contourAnchorSelection(json.load(f))
+    if (args.xyAnchors is None) or (args.uvAnchors is None):
+        raise ValueError("select anchor points with --xy-anchors and --uv-anchors, with --anchor-file or with --auto-anchors")
+    return [([int(i) for i in args.xyAnchors.split(",")], [int(i) for i in args.uvAnchors.split(",")], False)]
+
+#the (xy, uv, reverseUV) anchor selection of every contour from the content of an anchor file:
+#{"xy": [...], "uv": [...]} for svgs with a single contour, {"contours": [{"xy": [...], "uv": [...]}, ...]} for one entry per XY contour.
+#"reverseUV": true in an entry cuts its UV contour the other way round (the uv anchor points are in that order, see matchAnchors).
+#"auto" instead of the whole content or of the entry of a contour matches the anchor points automatically
+def contourAnchorSelection(anchors):
+    if (anchors == "auto") :
+        return "auto"
+    if "contours" in anchors:
+        return ["auto" if (contour == "auto") else (contour["xy"], contour["uv"], bool(contour.get("reverseUV", False))) for contour in anchors["contours"]]
+    return [(anchors["xy"], anchors["uv"], bool(anchors.get("reverseUV", False)))]
+
+#the closed contours of an svg file, every one as (pointCloud, anchorPoints, path) like extractSvg gives for the whole file.
+#fails with a ValueError instead of returning a message if there are none
+def loadContours(svgFile, displayStep = 0.5):
+    contours = readContours(svgFile)
+    if not contours:
+        raise ValueError(svgFile + ": NO APPROPRIATE SVG PROVIDED")
+    return [slicePath(contour, displayStep) + (contour,) for contour in contours]
+
+#start the cut of a contour at the anchor point pair closest to position, the anchor points are cyclic so any of them can come first
+def rotateAnchorsTowards(xySelected, uvSelected, position):
+    entryPoints = np.hstack((xySelected, uvSelected))
+    first = int(np.argmin(np.linalg.norm(entryPoints - position, axis = 1)))
+    return (np.roll(xySelected, -first, axis = 0), np.roll(uvSelected, -first, axis = 0))
+
+#the anchor pairs matchAnchors proposes for an XY and a UV contour (pointCloud, anchorPoints, path), in the direction they are cut with the settings,
+#as a selection (xy, uv, reverseUV) for planCuts
+def matchContourAnchors(xyContour, uvContour, settings):
+    return matchAnchors(orientPath(xyContour[2], settings["reverseXY"]), xyContour[1], orientPath(uvContour[2], settings["reverseUV"]), uvContour[1])
+
+#the anchor points matchAnchors proposes for two svg files as the content of an anchor file (see contourAnchorSelection), for editing it
+def proposeAnchors(xySvg, uvSvg, settings):
+    settings = completeSettings(settings)
+    xyContours = loadContours(xySvg)
+    uvContours = loadContours(uvSvg)
+    pairing = pairContours([contour[2] for contour in xyContours], [contour[2] for contour in uvContours])
+    contours = []
+    for (i, xyContour) in enumerate(xyContours):
+        (xyAnchors, uvAnchors, reverseUV) = matchContourAnchors(xyContour, uvContours[pairing[i]], settings)
+        contours.append({"xy": xyAnchors, "uv": uvAnchors, "reverseUV": reverseUV})
+    return contours[0] if (len(contours) == 1) else {"contours": contours}
+
+#what to cut from two svg files: every closed contour is cut on its own, anchors holds the (xy, uv) anchor selection of every XY contour
+#(see selectAnchorPoints), optionally with a third entry reverseUV that cuts the UV contour the other way round, or "auto" (for all of them
+#or one of them, see matchAnchors). the UV contours are paired up with pairContours.
+#returns (xyPath, xyAnchorPoints, uvPath, uvAnchorPoints, hole) for the contours in the order they are cut, hole tells the contours inside
+#an odd number of other XY contours (see contourHoles), the kerf goes into them
+def planCuts(xySvg, uvSvg, anchors, settings):
+    settings = completeSettings(settings)
+    xyContours = loadContours(xySvg)
+    uvContours = loadContours(uvSvg)
+    pairing = pairContours([contour[2] for contour in xyContours], [contour[2] for contour in uvContours])
+    holes = contourHoles([contour[0] for contour in xyContours])
+    if (anchors == "auto") :
+        anchors = ["auto"] * len(xyContours)
+    if len(anchors) != len(xyContours):
+        raise ValueError("anchor points are given for %d contours, the svgs have %d (see --list-anchors)" % (len(anchors), len(xyContours)))
+
+    cuts = []
+    for (i, selection) in enumerate(anchors):
+        (xyPointCloud, xyAnchorPoints, xyPath) = xyContours[i]
+        (uvPointCloud, uvAnchorPoints, uvPath) = uvContours[pairing[i]]
+        if (selection == "auto") :
+            selection = matchContourAnchors(xyContours[i], uvContours[pairing[i]], settings)
+        (xyAnchors, uvAnchors) = selection[:2]
+        xySelected = selectAnchorPoints(xyAnchorPoints, xyAnchors)
+        uvSelected = selectAnchorPoints(uvAnchorPoints, uvAnchors)
+        if (len(xySelected) != len(uvSelected)) or (len(xySelected) < 2):
+            raise ValueError("contour %d: select an equal number of anchor points on both planes, at least 2" % i)
+        #the reversed path has the same anchor points, reverseUV of the settings still applies on top of it
+        if (len(selection) > 2) and selection[2] :
+            uvPath = uvPath.reversed()
+        cuts.append((xyPath, xySelected, uvPath, uvSelected, holes[i]))
+
+    order = list(range(len(cuts)))
+    if settings["optimizeCutOrder"] and (len(cuts) > 1) :
+        order = orderCuts([np.concatenate((xySelected[0], uvSelected[0])) for (xyPath, xySelected, uvPath, uvSelected, hole) in cuts])
+
+    plan = []
+    position = np.zeros(4)
+    for i in order:
+        (xyPath, xySelected, uvPath, uvSelected, hole) = cuts[i]
+        if settings["optimizeCutOrder"] and (len(cuts) > 1) :
+            (xySelected, uvSelected) = rotateAnchorsTowards(xySelected, uvSelected, position)
+        position = np.concatenate((xySelected[0], uvSelected[0]))
+        plan.append((xyPath, xySelected, uvPath, uvSelected, hole))
+    return plan
+
+#length of the wire travel from the start of every contour (XYUV) to the start of the next one
+def travelBetween(starts):
+    if len(starts) < 2:
+        return 0.0
+    return float(np.linalg.norm(np.diff(np.array(starts), axis = 0), axis = 1).sum())
+
+#simplify and fit arcs to the tool points (xyToolPoints, uvToolPoints, anchorIndices) of every contour, see prepareGcodeToolpath
+#returns the contours for writeContoursGcode and the summed up stats, with the number of contours and the wire travel between them
+def prepareGcodeContours(toolpaths, settings):
+    contours = []
+    stats = {"points": 0, "simplifiedPoints": 0, "arcs": 0, "moves": 0}
+    for (xyToolPoints, uvToolPoints, anchorIndices) in toolpaths:
+        (xyToolPoints, uvToolPoints, arcs, contourStats) = prepareGcodeToolpath(xyToolPoints, uvToolPoints, anchorIndices, settings)
+        for key in stats:
+            stats[key] += contourStats[key]
+        contours.append((xyToolPoints, uvToolPoints, arcs))
+    stats["contours"] = len(contours)
+    stats["travel"] = travelBetween([np.concatenate((xyToolPoints[0], uvToolPoints[0])) for (xyToolPoints, uvToolPoints, arcs) in contours])
+    return (contours, stats)
+
+#run the whole generation from two svg files and write the gcode to outputFile (- for stdout), and the binary toolpath to toolpathFile if one is given
+#returns the number of points before and after simplifying, the number of contours, the travel between them and the number of gcode lines
+#with verify the toolpath is checked while it is written, the problems found are in stats["issues"]. with strict as well it is checked
+#before anything is written (see checkToolpaths), which needs the whole toolpath instead of streaming it
+def generateGcodeFromSvgs(xySvg, uvSvg, anchors, settings, outputFile, toolpathFile = None, verify = False, strict = False):
+    settings = completeSettings(settings)
+    cuts = planCuts(xySvg, uvSvg, anchors, settings)
+    if not (needsWholeToolpath(settings) or toolpathFile or (verify and strict)):
+        return streamGcode(cuts, settings, outputFile, verify)
+    toolpaths = [(xyToolPoints, uvToolPoints, anchorIndices) for (xyPoints, uvPoints, anchorIndices, xyToolPoints, uvToolPoints) in (calculateCut(cut, settings) for cut in cuts)]
+    issues = checkToolpaths(toolpaths, settings, strict) if verify else []
+    if toolpathFile:
+        writeContoursToolpath(toolpathFile, toolpaths, settings)
+    (contours, stats) = prepareGcodeContours(toolpaths, settings)
+    with openOutput(outputFile) as f:
+        stats["lines"] = writeContoursGcode(f, contours, settings["feedrate"], **scheduleContourFeeds(contours, settings))
+    stats["issues"] = issues
+    return stats
+
+#the gcode of two svg files as chunks, generated while they are consumed (see streamGcode) unless the whole toolpath is needed (see needsWholeToolpath)
+#with verify the toolpath is checked like in generateGcodeFromSvgs, warn gets the problems found (after the last chunk when it is streamed)
+def iterGcodeFromSvgs(xySvg, uvSvg, anchors, settings, verify = False, strict = False, warn = None):
+    settings = completeSettings(settings)
+    cuts = planCuts(xySvg, uvSvg, anchors, settings)
+    if not (needsWholeToolpath(settings) or (verify and strict)):
+        return iterVerifiedGcode(cuts, settings, verify, warn)
+    toolpaths = [(xyToolPoints, uvToolPoints, anchorIndices) for (xyPoints, uvPoints, anchorIndices, xyToolPoints, uvToolPoints) in (calculateCut(cut, settings) for cut in cuts)]
+    issues = checkToolpaths(toolpaths, settings, strict) if verify else []
+    if issues and (warn is not None):
+        warn(issues, len(toolpaths))
+    (contours, stats) = prepareGcodeContours(toolpaths, settings)
+    return iterContoursGcode(contours, settings["feedrate"], **scheduleContourFeeds(contours, settings))
+
+#the streamed gcode of the cuts, with verify every contour is checked while it passes through and warn gets the problems at the end
+def iterVerifiedGcode(cuts, settings, verify = False, warn = None):
+    issues = []
+    contours = (iterToolSpans(*cut[:4], settings) for cut in cuts)
+    if verify:
+        contours = (verifiedSpans(spans, ToolpathVerifier(settings, contour), issues) for (contour, spans) in enumerate(contours))
+    yield from iterStreamedGcode(contours, settings["feedrate"])
+    if issues and (warn is not None):
+        warn(issues, len(cuts))
+
+#write the gcode of the cuts span by span while they are calculated, for when nothing needs the whole toolpath at once (see needsWholeToolpath,
+#and no binary toolpath). with verify the contours are checked on the way (see ToolpathVerifier). returns the same stats as generateGcodeFromSvgs
+def streamGcode(cuts, settings, outputFile, verify = False):
+    stats = {"points": 0, "arcs": 0, "contours": len(cuts)}
+    starts = []
+    issues = []
+    #count the points and note where the contour starts while the spans pass through
+    def countedSpans(spans):
+        started = False
+        for (xyToolPoints, uvToolPoints) in spans:
+            if (not started) and len(xyToolPoints):
+                starts.append(np.concatenate((xyToolPoints[0], uvToolPoints[0])))
+                started = True
+            stats["points"] += len(xyToolPoints)
+            yield (xyToolPoints, uvToolPoints)
+    with openOutput(outputFile) as f:
+        contours = (countedSpans(iterToolSpans(*cut[:4], settings)) for cut in cuts)
+        if verify:
+            contours = (verifiedSpans(spans, ToolpathVerifier(settings, contour), issues) for (contour, spans) in enumerate(contours))
+        (stats["lines"], characters) = writeChunks(f, iterStreamedGcode(contours, settings["feedrate"]))
+    stats["simplifiedPoints"] = stats["moves"] = stats["points"]
+    stats["issues"] = issues
+    stats["travel"] = travelBetween(starts)
+    return stats
+
+#parametric sweep: the same svg pair cut with many machine geometries and offsets (e.g. the ribs of a tapered wing panel at several foam widths).
+#every contour is sliced once, the projection of all variants is one broadcast array operation and every variant gets its own gcode file
+#the settings a sweep can vary, all others are the same for every variant
+sweepParameters = ("gantryLength", "foamWidth", "distanceToXYaxis", "xOffset", "yOffset", "uOffset", "vOffset")
+#at most this many points (variants x points of the contours) are projected at once, so large sweeps don't need every variant in memory
+sweepChunkPoints = 1 << 22
+
+#every combination of the values of a grid {setting: [values], ...} as a list of variants
+def sweepVariants(grid):
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+#the points on the foam, the anchor indices and whether it is a hole of a cut of planCuts: the part of ToolpathCalculation that doesn't depend
+#on the offsets and the machine geometry
+def sliceCut(cut, settings):
+    (xyPath, xyAnchorPoints, uvPath, uvAnchorPoints, hole) = cut
+    xyPath = orientPath(xyPath, settings["reverseXY"])
+    uvPath = orientPath(uvPath, settings["reverseUV"])
+    (xyPoints, uvPoints) = slicePathAnchorPoints(xyPath, xyAnchorPoints, uvPath, uvAnchorPoints, settings["granularity"])
+    return (xyPoints, uvPoints, findAnchorIndices(xyPoints, xyAnchorPoints), hole)
+
+#the points on the foam offset and projected to the tool points of all variants (complete settings) at once, as (variants, points, 2) arrays.
+#the offsets and the machine geometry of the variants are columns that broadcast against the points. the kerf depends on the speeds
+#and so on the geometry, it is compensated variant by variant before the projection
+def projectVariants(xyPoints, uvPoints, variants, hole = False):
+    parameters = np.array([[variant[name] for name in sweepParameters] for variant in variants], float)
+    (gantryLengths, foamWidths, distancesToXYaxis) = (parameters[:, i, None, None] for i in range(3))
+    with stage("sweep offsets") as record:
+        xyFoam = xyPoints + parameters[:, None, 3:5]
+        uvFoam = uvPoints + parameters[:, None, 5:7]
+        record.output(xyFoam.reshape(-1, 2), uvFoam.reshape(-1, 2))
+    kerfVariants = [i for (i, variant) in enumerate(variants) if max(variant["kerfWidth"], variant["slowKerfWidth"]) > 0]
+    for i in kerfVariants:
+        variant = variants[i]
+        (xyFoam[i], uvFoam[i]) = compensateKerf(xyFoam[i], uvFoam[i], variant["gantryLength"], variant["foamWidth"], variant["distanceToXYaxis"], variant["feedrate"], variant["feedMode"], variant["kerfWidth"], variant["slowKerfWidth"], hole)
+    with stage("sweep projection") as record:
+        (xyToolPoints, uvToolPoints) = calcToolPointClouds(xyFoam, uvFoam, gantryLengths, foamWidths, distancesToXYaxis)
+        record.output(xyToolPoints.reshape(-1, 2), uvToolPoints.reshape(-1, 2))
+    return (xyToolPoints, uvToolPoints)
+
+#the toolpaths of every variant as (index, [(xyToolPoints, uvToolPoints, anchorIndices) of every cut]), projected in chunks of variants
+def iterVariantToolpaths(slicedCuts, variants):
+    noPoints = max(sum(len(xyPoints) for (xyPoints, uvPoints, anchorIndices, hole) in slicedCuts), 1)
+    chunkSize = max(sweepChunkPoints // noPoints, 1)
+    for start in range(0, len(variants), chunkSize):
+        chunk = variants[start:start + chunkSize]
+        projected = [(projectVariants(xyPoints, uvPoints, chunk, hole), anchorIndices) for (xyPoints, uvPoints, anchorIndices, hole) in slicedCuts]
+        for i in range(len(chunk)):
+            yield (start + i, [(xyToolPoints[i], uvToolPoints[i], anchorIndices) for ((xyToolPoints, uvToolPoints), anchorIndices) in projected])
+
+def formatVariant(variant):
+    return ", ".join("%s %g" % (name, value) for (name, value) in variant.items())
+
+#generate the gcode of every variant of the svg pair: a variant is a dict with some of the sweepParameters that override settings.
+#variant i is written to outputPattern.format(index = i, **its settings), e.g. "rib_{foamWidth:g}.gcode". with verify and strict
+#every variant is checked before any file is written. returns the stats of generateGcodeFromSvgs for every variant, with its output file
+def sweepGcodeFromSvgs(xySvg, uvSvg, anchors, settings, variants, outputPattern, verify = False, strict = False):
+    settings = completeSettings(settings)
+    for variant in variants:
+        unknown = set(variant) - set(sweepParameters)
+        if unknown:
+            raise ValueError("only %s can be swept, not %s" % (", ".join(sweepParameters), ", ".join(sorted(unknown))))
+    variantSettings = [dict(settings, **variant) for variant in variants]
+    try:
+        outputs = [outputPattern.format(index = i, **variant) for (i, variant) in enumerate(variantSettings)]
+    except (KeyError, IndexError, ValueError) as error:
+        raise ValueError("bad output pattern %r: %s" % (outputPattern, error))
+    if len(set(outputs)) < len(outputs):
+        raise ValueError("the output pattern %r gives several variants the same file, put {index} or the swept settings into it" % outputPattern)
+
+    slicedCuts = [sliceCut(cut, settings) for cut in planCuts(xySvg, uvSvg, anchors, settings)]
+    if verify and strict:
+        for (i, toolpaths) in iterVariantToolpaths(slicedCuts, variantSettings):
+            try:
+                checkToolpaths(toolpaths, variantSettings[i], strict)
+            except ToolpathError as error:
+                raise ToolpathError("variant %d (%s): %s" % (i, formatVariant(variants[i]), error))
+    results = []
+    for (i, toolpaths) in iterVariantToolpaths(slicedCuts, variantSettings):
+        issues = checkToolpaths(toolpaths, variantSettings[i]) if (verify and not strict) else []
+        (contours, stats) = prepareGcodeContours(toolpaths, variantSettings[i])
+        with openOutput(outputs[i]) as f:
+            stats["lines"] = writeContoursGcode(f, contours, variantSettings[i]["feedrate"], **scheduleContourFeeds(contours, variantSettings[i]))
+        stats.update({"variant": variants[i], "output": outputs[i], "issues": issues})
+        results.append(stats)
+    return results
+
+#how much simplifying and arc fitting reduced the toolpath: the moves of the gcode against the points before, with the points the simplification
+#left and the arcs that took over the moves through the rest
+def formatSimplification(stats):
+    text = "%d moves for %d points (%.1f%% fewer)" % (stats["moves"], stats["points"], 100.0 * (1 - stats["moves"] / max(stats["points"], 1)))
+    if stats.get("arcs"):
+        text += ", %d points kept, %d arcs" % (stats["simplifiedPoints"], stats["arcs"])
+    return text
+
+#command line options for all generation settings, named after the fields of the generation window
+settingsArguments = [
+    ("--gantry-length", "gantryLength", float, "distance between the XY and the UV axes"),
+    ("--foam-width", "foamWidth", float, "width of the foam block"),
+    ("--distance-to-xy", "distanceToXYaxis", float, "distance from the foam to the XY axes"),
+    ("--granularity", "granularity", float, "distance between the generated points [mm]"),
+    ("--x-offset", "xOffset", float, "X offset"),
+    ("--y-offset", "yOffset", float, "Y offset"),
+    ("--u-offset", "uOffset", float, "U offset"),
+    ("--v-offset", "vOffset", float, "V offset"),
+    ("--feedrate", "feedrate", float, "feedrate"),
+    ("--tolerance", "tolerance", float, "simplify the toolpath: drop points closer than this to the XYUV move replacing them, 0 = off"),
+    ("--arc-tolerance", "arcTolerance", float, "cut runs of points within this distance of an arc as G02/G03 moves, 0 = off. needs a controller that runs arcs in the XY and UV plane together"),
+    ("--kerf", "kerfWidth", float, "width of the kerf the wire burns at the feedrate, outlines are moved out and holes in by half of it [mm], 0 = off"),
+    ("--slow-kerf", "slowKerfWidth", float, "width of the kerf when the wire barely moves, the kerf grows linearly towards it as the wire slows down [mm], 0 = same as --kerf"),
+]
+
+def addSettingsArguments(parser):
+    for (flag, name, type, helpText) in settingsArguments:
+        parser.add_argument(flag, dest = name, type = type, help = "%s (default %s)" % (helpText, defaultSettings[name]))
+    parser.add_argument("--reverse-xy", dest = "reverseXY", action = "store_const", const = True, help = "reverse the XY direction")
+    parser.add_argument("--reverse-uv", dest = "reverseUV", action = "store_const", const = True, help = "reverse the UV direction")
+    parser.add_argument("--feed-mode", dest = "feedMode", choices = feedModes, help = "constant: every move at the feedrate along XYUV, inverseTime/adjusted: the wire at the feedrate on the side of the foam where it moves farther, as G93 inverse time feeds or adjusted G94 feeds (default %s)" % defaultSettings["feedMode"])
+    parser.add_argument("--keep-cut-order", dest = "optimizeCutOrder", action = "store_const", const = False, help = "cut several contours in the order of the svg instead of the order with the least travel")
+
+#command line options for the machine limits the toolpath is verified against, see verifyToolpath
+verificationArguments = [
+    ("--x-travel", "xTravel", float, "travel of the X and U axes, the tool points must stay within 0 and it [mm], 0 = not checked"),
+    ("--y-travel", "yTravel", float, "travel of the Y and V axes [mm], 0 = not checked"),
+    ("--max-move-length", "maxMoveLength", float, "longest allowed XYUV move [mm], 0 = not checked"),
+    ("--max-direction-change", "maxDirectionChange", float, "sharpest allowed turn between two moves [degrees], 0 = not checked"),
+    ("--max-acceleration", "maxAcceleration", float, "highest allowed acceleration of an axis at the feedrate [mm/s^2], 0 = not checked"),
+    ("--max-jerk", "maxJerk", float, "highest allowed jerk of an axis at the feedrate [mm/s^3], 0 = not checked"),
+]
+
+#the machine limits (unless limits is False, e.g. for the batch where they are settings of the manifest) and whether to verify at all
+def addVerificationArguments(parser, limits = True):
+    if limits:
+        for (flag, name, type, helpText) in verificationArguments:
+            parser.add_argument(flag, dest = name, type = type, help = "%s (default %s)" % (helpText, defaultSettings[name]))
+    parser.add_argument("--strict", action = "store_true", help = "stop without writing anything if the toolpath fails the verification, instead of warning")
+    parser.add_argument("--no-verify", dest = "verify", action = "store_false", help = "don't verify the toolpath")
+
+def addCacheArgument(parser):
+    parser.add_argument("--cache-dir", dest = "cacheDir", default = None, help = "keep parsed svgs and their display slicing in this directory, so repeated jobs skip them (default: $HOTWIRE_CACHE_DIR, else only in memory)")
+
+#the settings given on the command line, everything else is left to the defaults
+def settingsFromArguments(args):
+    return {name: getattr(args, name) for name in defaultSettings if getattr(args, name, None) is not None}
+
+#open a file for writing, - for stdout. the file is written next to outputFile and only replaces it when the block
+#finishes without an error, a failed generation leaves the output as it was and no half written file
+@contextmanager
+def openOutput(outputFile):
+    if (outputFile == "-") :
+        yield sys.stdout
+        sys.stdout.flush()
+        return
+    tmpName = "%s.%d.tmp" % (outputFile, os.getpid())
+    try:
+        with open(tmpName, "w") as f:
+            yield f
+        os.replace(tmpName, outputFile)
+    finally:
+        if os.path.exists(tmpName):
+            os.remove(tmpName)
+
+def runGenerate(args):
+    if args.listAnchors:
+        for (label, svgFile) in (("XY", args.xySvg), ("UV", args.uvSvg)):
+            contours = loadContours(svgFile)
+            for (contour, (pointCloud, anchorPoints, path)) in enumerate(contours):
+                if len(contours) == 1:
+                    print(label + " anchor points of " + svgFile + ":")
+                else:
+                    print(label + " anchor points of contour %d of %s:" % (contour, svgFile))
+                for (i, point) in enumerate(anchorPoints):
+                    print("%5d: %.4f, %.4f" % (i, point[0], point[1]))
+        return 0
+    settings = completeSettings(settingsFromArguments(args))
+    if args.proposeAnchors:
+        json.dump(proposeAnchors(args.xySvg, args.uvSvg, settings), sys.stdout)
+        print()
+        return 0
+    anchors = readAnchorSelection(args)
+    with recording() as recorder, profiling(args.cprofile):
+        stats = generateGcodeFromSvgs(args.xySvg, args.uvSvg, anchors, settings, args.output, args.toolpath, args.verify, args.strict)
+    if stats.get("issues"):
+        printIssues(stats["issues"], stats["contours"])
+    if (settings["tolerance"] > 0) or (settings["arcTolerance"] > 0) :
+        print(formatSimplification(stats), file = sys.stderr)
+    if stats["contours"] > 1:
+        print("%d contours, %.1f mm of travel between them" % (stats["contours"], stats["travel"]), file = sys.stderr)
+    if args.profile:
+        sys.stderr.write(recorder.format())
+    if args.trace:
+        with open(args.trace, "w") as f:
+            json.dump(recorder.trace(), f, indent = 2)
+    return 0
+
+#the values of --vary: comma separated numbers or start:stop:step with the stop included
+def parseSweepValues(text):
+    if ":" in text:
+        (start, stop, step) = (float(value) for value in text.split(":"))
+        if (step <= 0) :
+            raise ValueError("the step of %r has to be positive" % text)
+        return [float(value) for value in np.arange(start, stop + step / 2, step)]
+    return [float(value) for value in text.split(",") if value.strip()]
+
+#the variants of the sweep command: the grid of the --vary options, or the list of a --variants file
+def readSweepVariants(args):
+    if args.variantFile:
+        if args.vary:
+            raise ValueError("give the variants either with --vary or with --variants")
+        with open(args.variantFile) as f:
+            variants = json.load(f)
+        if not isinstance(variants, list):
+            raise ValueError(args.variantFile + ": a list of variants is expected")
+        return variants
+    grid = {}
+    for entry in args.vary:
+        (name, separator, values) = entry.partition("=")
+        if not separator:
+            raise ValueError("--vary %s: SETTING=VALUES expected" % entry)
+        grid[name.strip()] = parseSweepValues(values)
+    if not grid:
+        raise ValueError("nothing to sweep, give --vary or --variants")
+    return sweepVariants(grid)
+
+def runSweep(args):
+    settings = completeSettings(settingsFromArguments(args))
+    variants = readSweepVariants(args)
+    anchors = readAnchorSelection(args)
+    startTime = time.perf_counter()
+    with recording() as recorder:
+        results = sweepGcodeFromSvgs(args.xySvg, args.uvSvg, anchors, settings, variants, args.output, args.verify, args.strict)
+    for result in results:
+        print("%-40s %8d lines  %s" % (result["output"], result["lines"], formatVariant(result["variant"])), file = sys.stderr)
+        if result["issues"]:
+            printIssues(result["issues"], result["contours"])
+    print("%d variants, %.2f s" % (len(results), time.perf_counter() - startTime), file = sys.stderr)
+    if args.profile:
+        sys.stderr.write(recorder.format())
+    return 0
+
+#run the block under cProfile and dump the statistics to profileFile (for pstats or snakeviz), nothing if no file is given
+@contextmanager
+def profiling(profileFile):
+    if not profileFile:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(profileFile)
+
+#gcode from a binary toolpath file, or with --info only what is in its header
+def runConvert(args):
+    toolpath = Toolpath(args.toolpath)
+    if args.info:
+        header = dict(toolpath.header)
+        header["anchorIndices"] = len(header["anchorIndices"])
+        print(json.dumps(header, indent = 2))
+        return 0
+    if args.verify:
+        issues = toolpath.verify(settingsFromArguments(args), args.strict)
+        if issues:
+            printIssues(issues, len(toolpath.contourStarts))
+    with openOutput(args.output) as f:
+        toolpath.writeGcode(f)
+    return 0
+
+#read a batch manifest: {"defaults": {settings}, "jobs": [{"name", "xy", "uv", "anchors" or "anchorFile", "settings", "output"}, ...]}
+#the anchor points of a job without "anchors" and "anchorFile" are matched automatically
+#file names in the manifest are relative to the manifest itself, outputs default to <outputDir>/<name>.gcode
+def readBatchManifest(manifestFile, outputDir = None):
+    with open(manifestFile) as f:
+        manifest = json.load(f)
+    baseDir = os.path.dirname(os.path.abspath(manifestFile))
+    if outputDir is None:
+        outputDir = baseDir
+
+    def resolve(fileName):
+        return os.path.join(baseDir, fileName)
+
+    jobs = []
+    for (i, entry) in enumerate(manifest["jobs"]):
+        name = entry.get("name", "job%d" % (i + 1))
+        settings = dict(manifest.get("defaults", {}))
+        settings.update(entry.get("settings", {}))
+        if "anchorFile" in entry:
+            with open(resolve(entry["anchorFile"])) as f:
+                anchors = contourAnchorSelection(json.load(f))
+        else:
+            anchors = contourAnchorSelection(entry.get("anchors", "auto"))
+        jobs.append({
+            "name": name,
+            "xy": resolve(entry["xy"]),
+            "uv": resolve(entry["uv"]),
+            "anchors": anchors,
+            "settings": settings,
+            "output": os.path.join(outputDir, entry.get("output", name + ".gcode")),
+        })
+    return jobs
+
+#a batch job that ran too long. not the builtin TimeoutError, that is an OSError and the cache would take it for a failed read or write
+class JobTimeout(Exception):
+    pass
+
+def raiseJobTimeout(signum, frame):
+    raise JobTimeout("job timed out")
+
+#runs one job of a batch in a worker process. never raises: failures are reported in the returned result, so one bad job doesn't take the others down
+#a failed job leaves no half written gcode (see openOutput)
+def runBatchJob(job, timeout = None):
+    result = {"name": job["name"], "output": job["output"], "ok": False, "error": None, "seconds": 0.0, "lines": 0}
+    #the timeout is an alarm signal in the worker itself, so a stuck job frees its worker again (not available on windows)
+    useAlarm = bool(timeout) and hasattr(signal, "setitimer")
+    if useAlarm:
+        signal.signal(signal.SIGALRM, raiseJobTimeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    if "cacheDir" in job:
+        sliceCache.directory = job["cacheDir"]
+    startTime = time.perf_counter()
+    try:
+        with recording() as recorder:
+            result.update(generateGcodeFromSvgs(job["xy"], job["uv"], job["anchors"], job["settings"], job["output"], verify = job.get("verify", False), strict = job.get("strict", False)))
+        result["stages"] = recorder.summary()
+        result["ok"] = True
+    except JobTimeout:
+        result["error"] = "timed out after %g s" % timeout
+    except Exception as error:
+        result["error"] = "%s: %s" % (type(error).__name__, error)
+        result["traceback"] = traceback.format_exc()
+    finally:
+        if useAlarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        result["seconds"] = time.perf_counter() - startTime
+    return result
+
+#run all jobs of a batch spread over a pool of worker processes, returns the results in the order of the jobs
+def runBatch(jobs, workers = None, timeout = None):
+    results = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers = workers) as executor:
+        futures = [executor.submit(runBatchJob, job, timeout) for job in jobs]
+        for (i, future) in enumerate(futures):
+            try:
+                results[i] = future.result()
+            except Exception as error: #the worker process itself died
+                results[i] = {"name": jobs[i]["name"], "output": jobs[i]["output"], "ok": False, "error": "worker failed: %s: %s" % (type(error).__name__, error), "seconds": 0.0, "lines": 0}
+    return results
+
+#summary of a batch run, one line per job and the totals
+def formatBatchReport(results, wallTime):
+    lines = []
+    for result in results:
+        if result["ok"]:
+            lines.append("ok      %-24s %8.2f s %8d lines %8d/%d points  %s" % (result["name"], result["seconds"], result["lines"], result["simplifiedPoints"], result["points"], result["output"]))
+            lines.extend("        warning: " + line for line in formatIssues(result.get("issues", []), result["contours"]).splitlines())
+        else:
+            lines.append("FAILED  %-24s %8.2f s  %s" % (result["name"], result["seconds"], result["error"]))
+    failed = sum(1 for result in results if not result["ok"])
+    jobTime = sum(result["seconds"] for result in results)
+    lines.append("%d jobs, %d failed, %.2f s wall time, %.2f s job time" % (len(results), failed, wallTime, jobTime))
+    return "\n".join(lines) + "\n"
+
+def runBatchCommand(args):
+    jobs = readBatchManifest(args.manifest, args.outputDir)
+    for job in jobs:
+        job["cacheDir"] = sliceCache.directory
+        (job["verify"], job["strict"]) = (args.verify, args.strict)
+    if args.outputDir:
+        os.makedirs(args.outputDir, exist_ok = True)
+    startTime = time.perf_counter()
+    results = runBatch(jobs, args.jobs, args.timeout)
+    wallTime = time.perf_counter() - startTime
+    sys.stdout.write(formatBatchReport(results, wallTime))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"wallTime": wallTime, "jobs": results}, f, indent = 2)
+    return 0 if all(result["ok"] for result in results) else 1
+
+def buildArgumentParser():
+    parser = argparse.ArgumentParser(description = "XYUV profile gcode generator. Without arguments the user interface is opened.")
+    subparsers = parser.add_subparsers(dest = "command")
+
+    generate = subparsers.add_parser("generate", help = "generate gcode from an XY and a UV svg file without the user interface")
+    generate.add_argument("xySvg", help = "svg file of the XY plane")
+    generate.add_argument("uvSvg", help = "svg file of the UV plane")
+    generate.add_argument("-o", "--output", default = "-", help = "gcode output file, - for stdout (default)")
+    generate.add_argument("--xy-anchors", dest = "xyAnchors", help = "comma separated indices of the XY anchor points, see --list-anchors")
+    generate.add_argument("--uv-anchors", dest = "uvAnchors", help = "comma separated indices of the UV anchor points")
+    generate.add_argument("--anchor-file", dest = "anchorFile", help = 'json file {"xy": [...], "uv": [...]} with anchor indices or [x, y] coordinates, {"contours": [{"xy": [...], "uv": [...]}, ...]} for svgs with several contours')
+    generate.add_argument("--list-anchors", dest = "listAnchors", action = "store_true", help = "print the anchor points of both svg files with their indices and exit")
+    generate.add_argument("--auto-anchors", dest = "autoAnchors", action = "store_true", help = "match the anchor points of the two svg files automatically at their corners")
+    generate.add_argument("--propose-anchors", dest = "proposeAnchors", action = "store_true", help = "print the automatically matched anchor points as an anchor file (for editing and --anchor-file) and exit")
+    addSettingsArguments(generate)
+    addVerificationArguments(generate)
+    addCacheArgument(generate)
+    generate.add_argument("--toolpath", default = None, help = "also write the tool points as a binary toolpath file, see convert")
+    generate.add_argument("--profile", action = "store_true", help = "print the time, points and memory of every stage of the generation")
+    generate.add_argument("--trace", default = None, help = "write the timed stages as json to this file")
+    generate.add_argument("--cprofile", default = None, help = "run under cProfile and dump the statistics to this file")
+    generate.set_defaults(handler = runGenerate)
+
+    sweep = subparsers.add_parser("sweep", help = "generate gcode for many machine geometries and offsets from one svg pair, slicing it only once")
+    sweep.add_argument("xySvg", help = "svg file of the XY plane")
+    sweep.add_argument("uvSvg", help = "svg file of the UV plane")
+    sweep.add_argument("--vary", action = "append", default = [], metavar = "SETTING=VALUES", help = "a swept setting (one of %s) with comma separated values or start:stop:step, e.g. foamWidth=300,400,500 or xOffset=0:50:10. every combination of the values is a variant" % ", ".join(sweepParameters))
+    sweep.add_argument("--variants", dest = "variantFile", default = None, help = 'json file with a list of variants [{"foamWidth": 300, "xOffset": 5}, ...] instead of --vary')
+    sweep.add_argument("-o", "--output", default = "sweep_{index:03d}.gcode", help = "pattern of the gcode file names with {index} and the settings, e.g. rib_{foamWidth:g}_{xOffset:g}.gcode (default sweep_{index:03d}.gcode)")
+    sweep.add_argument("--xy-anchors", dest = "xyAnchors", help = "comma separated indices of the XY anchor points, see generate --list-anchors")
+    sweep.add_argument("--uv-anchors", dest = "uvAnchors", help = "comma separated indices of the UV anchor points")
+    sweep.add_argument("--anchor-file", dest = "anchorFile", help = "json file with the anchor points, see generate")
+    sweep.add_argument("--auto-anchors", dest = "autoAnchors", action = "store_true", help = "match the anchor points of the two svg files automatically")
+    addSettingsArguments(sweep)
+    addVerificationArguments(sweep)
+    addCacheArgument(sweep)
+    sweep.add_argument("--profile", action = "store_true", help = "print the time, points and memory of every stage of the sweep")
+    sweep.set_defaults(handler = runSweep)
+
+    batch = subparsers.add_parser("batch", help = "generate all jobs of a manifest file in parallel")
+    batch.add_argument("manifest", help = 'json file {"defaults": {...}, "jobs": [{"name", "xy", "uv", "anchors" or "anchorFile", "settings", "output"}, ...]}')
+    batch.add_argument("-j", "--jobs", type = int, default = None, help = "number of worker processes (default: number of cores)")
+    batch.add_argument("--timeout", type = float, default = None, help = "seconds after which a single job is given up")
+    batch.add_argument("--output-dir", dest = "outputDir", default = None, help = "directory for the gcode files (default: next to the manifest)")
+    batch.add_argument("--report", default = None, help = "write a json report of all jobs to this file")
+    addVerificationArguments(batch, limits = False)
+    addCacheArgument(batch)
+    batch.set_defaults(handler = runBatchCommand)
+
+    convert = subparsers.add_parser("convert", help = "convert a binary toolpath file to gcode")
+    convert.add_argument("toolpath", help = "binary toolpath file, written by generate --toolpath or the user interface")
+    convert.add_argument("-o", "--output", default = "-", help = "gcode output file, - for stdout (default)")
+    convert.add_argument("--info", action = "store_true", help = "only print the header of the toolpath file")
+    addVerificationArguments(convert)
+    convert.set_defaults(handler = runConvert)
+
+    send = subparsers.add_parser("send", help = "stream gcode to the controller over a serial port or tcp while it is generated")
+    send.add_argument("inputs", nargs = "+", help = "a gcode file, a binary toolpath file, or an XY and a UV svg file to generate the gcode from")
+    send.add_argument("--port", default = None, help = "serial port of the controller (e.g. /dev/ttyUSB0) or tcp://host:port")
+    send.add_argument("--baud", type = int, default = 115200, help = "baud rate of the serial port (default 115200)")
+    send.add_argument("--rx-buffer", dest = "rxBuffer", type = int, default = 128, help = "size of the receive buffer of the controller in characters (default 128, GRBL)")
+    send.add_argument("--look-ahead", dest = "lookAhead", type = int, default = 1000, help = "number of lines generated ahead of the sender (default 1000)")
+    send.add_argument("--startup-delay", dest = "startupDelay", type = float, default = 2.0, help = "seconds to wait for the controller to start after opening a serial port (default 2)")
+    send.add_argument("--stand-in", dest = "standIn", action = "store_true", help = "send to a simulated controller on a local pty instead of a machine")
+    send.add_argument("--stand-in-line-time", dest = "standInLineTime", type = float, default = 0.0, help = "seconds the simulated controller takes per line")
+    send.add_argument("-v", "--verbose", action = "store_true", help = "print the progress every second")
+    send.add_argument("--xy-anchors", dest = "xyAnchors", help = "comma separated indices of the XY anchor points, for svg inputs")
+    send.add_argument("--uv-anchors", dest = "uvAnchors", help = "comma separated indices of the UV anchor points, for svg inputs")
+    send.add_argument("--anchor-file", dest = "anchorFile", help = "json file with the anchor points, for svg inputs")
+    send.add_argument("--auto-anchors", dest = "autoAnchors", action = "store_true", help = "match the anchor points of svg inputs automatically")
+    addSettingsArguments(send)
+    addVerificationArguments(send)
+    addCacheArgument(send)
+    send.set_defaults(handler = runSendCommand)
+
+    return parser
+
+#the sender lives in hotwireGcodeSender.py and is only imported for the send command
+def runSendCommand(args):
+    from hotwireGcodeSender import runSend
+    return runSend(args)
+
+def main(argv = None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if not argv:
+        #no arguments: open the user interface, only now tkinter and matplotlib get imported
+        from hotwireGcodeGeneratorGui import runGui
+        runGui()
+        return 0
+    args = buildArgumentParser().parse_args(argv)
+    if not hasattr(args, "handler"):
+        buildArgumentParser().print_help()
+        return 2
+    if getattr(args, "cacheDir", None):
+        sliceCache.directory = args.cacheDir
+    try:
+        return args.handler(args)
+    except (ValueError, OSError) as error:
+        print("error: " + str(error), file = sys.stderr)
+        return 1
 
-app.mainloop()
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,785 @@
+#!/usr/bin/env python3
+# the tkinter user interface of the gcode generator. it is only imported when the window is opened, so the
+# generation itself (see hotwireGcodeGenerator.py) runs without tkinter and matplotlib
+
+#imports for using matplotlib with tkinter
+import matplotlib
+matplotlib.use("TkAgg")
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
+from matplotlib.collections import LineCollection
+
+import tkinter as tk
+from tkinter import filedialog
+from tkinter import messagebox
+from tkinter import ttk
+
+import numpy as np
+import queue
+import threading
+
+from hotwireGcodeGenerator import loadContours, matchAnchors, PointIndex, getArrowAtIndex, writeContoursGcode, scheduleContourFeeds, feedModes, writeToolpath, ToolpathCalculation, CalculationCancelled, prepareGcodeToolpath, formatSimplification, verifyToolpath, formatIssues, sliceCache, defaultCacheDirectory, recording, stage
+
+#drop the points of a polyline that fall onto the same screen pixel as their predecessor, there is no point in
+#handing 50k points to matplotlib when the axes are only a few hundred pixels wide
+def decimateForDisplay(points, pixelSize):
+    if (len(points) < 3) or not (pixelSize > 0):
+        return points
+    pixels = np.floor(points / pixelSize)
+    keep = np.empty(len(points), bool)
+    keep[0] = True
+    keep[1:] = np.any(pixels[1:] != pixels[:-1], axis = 1)
+    keep[-1] = True #keep the end of the path where it is
+    return points[keep]
+
+#set equal axis limits around all point clouds, returns the size of one pixel in data units
+def fitAxesToPoints(axes, pointClouds, margin = 0.05):
+    points = np.concatenate([np.asarray(pointCloud).reshape(-1,2) for pointCloud in pointClouds])
+    if len(points) == 0:
+        return 0.0
+    (minimum, maximum) = (points.min(axis = 0), points.max(axis = 0))
+    center = (minimum + maximum) / 2
+    bbox = axes.get_window_extent()
+    width = max(bbox.width, 1.0)
+    height = max(bbox.height, 1.0)
+    #same scale in x and y, the larger extent decides
+    pixelSize = max((maximum[0]-minimum[0]) / width, (maximum[1]-minimum[1]) / height, 1e-9) * (1 + 2*margin)
+    axes.set_xlim(center[0] - pixelSize*width/2, center[0] + pixelSize*width/2)
+    axes.set_ylim(center[1] - pixelSize*height/2, center[1] + pixelSize*height/2)
+    return pixelSize
+
+class gcodeGeneratorApp(tk.Tk):
+
+    def __init__(self, *args, **kwargs):
+        
+        tk.Tk.__init__(self, *args, **kwargs)
+
+        #iconpath = str(os.path.dirname(os.path.realpath(__file__)))+os.path.sep+'stonetronicsLogo.png'
+        #tk.Tk.iconphoto(True, tk.PhotoImage(file=iconpath))
+        tk.Tk.wm_title(self, "XYUV profile gcode generator")
+
+        container = tk.Frame(self)
+        container.pack(side="top", fill="both", expand = True)
+        container.grid_rowconfigure(0, weight=1)
+        container.grid_columnconfigure(0, weight=1)
+        
+        #svg file chooser
+        svgChooser = tk.Frame(container)
+        svgChooser.pack()
+        fileChooserFrame = tk.Frame(svgChooser)
+        fileChooserFrame.pack(side = tk.LEFT)
+        xyFileChooser = FileChooser(fileChooserFrame, "XY svg File:")
+        xyFileChooser.pack(side = tk.TOP)
+        uvFileChooser = FileChooser(fileChooserFrame, "UV svg File:")
+        uvFileChooser.pack(side = tk.BOTTOM)
+        #the window cuts one closed contour. svgs with several (a part with holes, several parts) would be joined into one path with
+        #anchor spans bridging between them and no kerf into the holes, they are cut from the command line (see planCuts)
+        def loadFiles():
+            try:
+                xyContours = loadContours(xyFileChooser.getFilePath())
+                uvContours = loadContours(uvFileChooser.getFilePath())
+            except (ValueError, OSError) as error:
+                messagebox.showerror("could not load svg!", str(error))
+                return
+            for (label, contours) in (("XY", xyContours), ("UV", uvContours)):
+                if (len(contours) > 1) :
+                    messagebox.showerror("several contours!", "The %s svg has %d closed contours (e.g. a part with a hole). The window cuts a single contour, "
+                        "generate svgs with several contours from the command line:\n\npython3 hotwireGcodeGenerator.py generate xy.svg uv.svg --auto-anchors -o part.gcode" % (label, len(contours)))
+                    return
+            ((xyPc, self.xyAp, self.xyPath), (uvPc, self.uvAp, self.uvPath)) = (xyContours[0], uvContours[0])
+            self.anchorPointWidget.resetSelectedAnchorPoints()
+            #print (xyPc)
+            #print (uvPc)
+            self.anchorPointWidget.updateData(xyPc, self.xyAp, uvPc, self.uvAp, self.xyPath, self.uvPath)
+        loadButton = tk.Button(svgChooser, text = "load", command = loadFiles)
+        loadButton.pack(side = tk.RIGHT)
+        
+        #anchor points definement
+        self.anchorPointWidget = AnchorPointWidget(container)
+        self.anchorPointWidget.pack(side="top",fill='both',expand=True)
+
+        # "go" button
+        def openGeneration():
+            if (not hasattr(self, 'xyPath')) or (not hasattr(self, 'uvPath')) :
+                messagebox.showerror("load files first!", "Please load files and select anchor points before moving on to the generation")
+                return
+            (self.xySelAp, self.uvSelAp) = self.anchorPointWidget.getSelectedAnchorPoints()
+            noXySelAp = len(self.xySelAp)
+            noUvSelAp = len(self.uvSelAp)
+            if (noXySelAp != noUvSelAp) or (noXySelAp < 2) or (noUvSelAp < 2):
+                messagebox.showerror("improper anchor points!", "-Please select an equal number of anchor points on both planes\n-There need to be at least 2 anchor points on each axis")
+                return
+            #the proposed anchor points of a UV contour running the other way round are for its reversal, see matchAnchors
+            uvPath = self.uvPath.reversed() if self.anchorPointWidget.uvReversed else self.uvPath
+            data = (self.xyPath, self.xyAp, self.xySelAp, uvPath, self.uvAp, self.uvSelAp)
+            generationWindow = GenerationWindow(data)
+        goButton = tk.Button(container, text = "generate!", command = openGeneration)
+        goButton.pack()
+
+class FileChooser(tk.Frame):
+           
+    def __init__(self, parent, labeltext = "File:", types = (("svg files","*.svg"), ("all files","*.*")) ):
+        tk.Frame.__init__(self, parent)
+        self.types = types
+        
+        self.filepathLabel = tk.Label(self, text = labeltext)
+        self.filepathLabel.grid(row = 0, column = 0)
+        
+        self.filepathEntry = tk.Entry(self)
+        self.filepathEntry.grid(row = 0, column = 1)
+        
+        self.browseButton = tk.Button(self, text = "browse...", command = self.browseFile)
+        self.browseButton.grid(row = 0, column = 2)
+
+    def browseFile(self):
+        tmp = filedialog.askopenfilename(initialdir = "./", title = "select svg file", filetypes = self.types)
+        self.filepathEntry.delete(0, tk.END) #delete and overwrite the set filename
+        self.filepathEntry.insert(tk.INSERT, tmp)     
+        self.filepathEntry.xview("end") #scroll to the back so the filename can be read better      
+    
+    def getFilePath(self):
+        return self.filepathEntry.get()
+
+        
+        
+class AnchorPointWidget(tk.Frame):
+
+    def __init__(self, parent):
+        tk.Frame.__init__(self, parent)
+        
+        self.clickMode = "none"
+                
+        self.resetSelectedAnchorPoints()
+             
+        self.header = tk.Frame(self)
+        self.header.pack(side = tk.TOP)
+        
+        def setClickMode(mode):
+            self.clickMode = mode
+
+        self.clickModeXYButton = tk.Button(self.header, text = "select XY anchor points", command = lambda: setClickMode("XY"))
+        self.clickModeXYButton.pack(side = tk.LEFT)
+        self.clickModeUVButton = tk.Button(self.header, text = "select UV anchor points", command = lambda: setClickMode("UV"))
+        self.clickModeUVButton.pack(side = tk.RIGHT)
+        #propose the anchor points again, after they were edited
+        def autoSelect():
+            self.autoSelectAnchorPoints()
+            self.updateDisplay()
+        self.autoButton = tk.Button(self.header, text = "auto", command = autoSelect)
+        self.autoButton.pack(side = tk.RIGHT)
+        self.xyPath = None
+        self.uvPath = None
+
+        self.f = Figure(figsize=(8,8), dpi=100)
+        self.a = self.f.add_subplot(111)
+        #the artists are created once and only get new data afterwards. the point clouds change when files are
+        #loaded, the anchor overlays (animated, drawn by blitting) change on every click
+        (self.xyLine,) = self.a.plot([0], [0], 'r') #plot only origin point at first
+        (self.uvLine,) = self.a.plot([0], [0], 'g')
+        self.xySelectedScatter = self.a.scatter([], [], c = 'r', animated = True)
+        self.uvSelectedScatter = self.a.scatter([], [], c = 'g', animated = True)
+        self.correspondenceLines = LineCollection([], colors = 'grey', animated = True)
+        self.a.add_collection(self.correspondenceLines)
+        self.annotations = []
+        self.a.axis("equal")    
+        self.a.grid(color='grey', linestyle='-', linewidth=0.5)
+        self.a.legend([self.xyLine, self.uvLine], ["XY", "UV"])  
+
+        self.background = None
+        self.canvas = FigureCanvasTkAgg(self.f, self)
+        self.canvas.mpl_connect("draw_event", self.onDraw)
+        self.canvas.draw()
+        self.canvas.get_tk_widget().pack(side=tk.BOTTOM, fill=tk.BOTH, expand=True)
+        
+        def mouseClickCallback(event):
+            if (not event.xdata) or (not event.ydata):
+                #click outside of the diagram => reset the click mode 
+                self.clickMode = "none"
+                return
+            clickPoint = np.array([event.xdata, event.ydata])
+            
+            if (self.clickMode == "XY"):
+                (closestPoint,index) = self.xyAnchorIndex.closest(clickPoint)
+                if not any(np.equal(self.selectedXYAnchorPoints,[closestPoint]).all(1)) :
+                    self.selectedXYAnchorPoints = np.append(self.selectedXYAnchorPoints, [closestPoint], axis = 0)
+                else:
+                    index = np.where(np.all(self.selectedXYAnchorPoints == closestPoint, axis = 1))[0][0]
+                    self.selectedXYAnchorPoints = np.delete(self.selectedXYAnchorPoints, index, axis = 0)
+                self.updateDisplay()
+            elif (self.clickMode == "UV") :
+                (closestPoint,index) = self.uvAnchorIndex.closest(clickPoint)
+                if not any(np.equal(self.selectedUVAnchorPoints,[closestPoint]).all(1)) :
+                    self.selectedUVAnchorPoints = np.append(self.selectedUVAnchorPoints, [closestPoint], axis = 0)
+                else:
+                    index = np.where(np.all(self.selectedUVAnchorPoints == closestPoint, axis = 1))[0][0]
+                    self.selectedUVAnchorPoints = np.delete(self.selectedUVAnchorPoints, index, axis = 0)
+                self.uvReversed = self.selectionReversed()
+                self.updateDisplay()
+            #else :
+            
+        self.canvas.mpl_connect ('button_press_event', mouseClickCallback)
+        
+        #toolbar = NavigationToolbar2TkAgg(self.canvas, self)
+        #toolbar.update()
+        self.canvas._tkcanvas.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        
+    #new svgs, the anchor points are proposed by matchAnchors when the paths are given and can be edited from there
+    def updateData(self, xyPointCloud, xyAnchorPoints, uvPointCloud, uvAnchorPoints, xyPath = None, uvPath = None):
+        self.xyPath = xyPath
+        self.uvPath = uvPath
+        self.xyPointCloud = xyPointCloud
+        self.xyAnchorPoints = xyAnchorPoints
+        self.xyAnchorIndex = PointIndex(xyAnchorPoints) #for finding the anchor point closest to a click
+        self.uvPointCloud = uvPointCloud
+        self.uvAnchorPoints = uvAnchorPoints
+        self.uvAnchorIndex = PointIndex(uvAnchorPoints)
+        self.autoSelectAnchorPoints()
+        #new point clouds => full redraw, the overlays are drawn on top in onDraw
+        pixelSize = fitAxesToPoints(self.a, [xyPointCloud, uvPointCloud])
+        xyDisplayed = decimateForDisplay(xyPointCloud, pixelSize)
+        uvDisplayed = decimateForDisplay(uvPointCloud, pixelSize)
+        self.xyLine.set_data(xyDisplayed[:,0], xyDisplayed[:,1])
+        self.uvLine.set_data(uvDisplayed[:,0], uvDisplayed[:,1])
+        self.updateOverlays()
+        self.canvas.draw()
+        
+    #select the anchor points matchAnchors proposes for the loaded paths, nothing if it can't match them
+    def autoSelectAnchorPoints(self):
+        if (self.xyPath is None) or (self.uvPath is None):
+            return
+        try:
+            (xyIndices, uvIndices, self.proposedReversed) = matchAnchors(self.xyPath, self.xyAnchorPoints, self.uvPath, self.uvAnchorPoints)
+        except ValueError:
+            return
+        self.selectedXYAnchorPoints = self.xyAnchorPoints[xyIndices]
+        self.selectedUVAnchorPoints = self.uvAnchorPoints[uvIndices]
+        self.uvReversed = self.proposedReversed
+
+    #whether the selected UV anchor points follow the UV path backwards: 3 or more of them are in order along the path one way round or the
+    #other, fewer leave the direction matchAnchors found for the contours
+    def selectionReversed(self):
+        if len(self.selectedUVAnchorPoints) < 3:
+            return self.proposedReversed
+        indices = np.array(self.uvAnchorIndex.closestIndices(self.selectedUVAnchorPoints))
+        return bool(np.count_nonzero(np.diff(np.append(indices, indices[0])) > 0) == 1)
+
+    def updateDisplay(self):
+        self.updateOverlays()
+        self.blitOverlays()
+        
+    #bring the anchor point overlays up to date with the selection
+    def updateOverlays(self):
+        self.xySelectedScatter.set_offsets(self.selectedXYAnchorPoints)
+        self.uvSelectedScatter.set_offsets(self.selectedUVAnchorPoints)
+        for annotation in self.annotations:
+            annotation.remove()
+        self.annotations = []
+        for selectedAnchorPoints in (self.selectedXYAnchorPoints, self.selectedUVAnchorPoints):
+            for i, point in enumerate(selectedAnchorPoints):
+                self.annotations.append(self.a.annotate(i+1, point, animated = True))
+        #lines between anchorpoints (only if there has been at least one tuple of anchor points selected)
+        minNoSelectedAnchorPoints = min(len(self.selectedXYAnchorPoints), len(self.selectedUVAnchorPoints))
+        self.correspondenceLines.set_segments(np.stack((self.selectedXYAnchorPoints[:minNoSelectedAnchorPoints], self.selectedUVAnchorPoints[:minNoSelectedAnchorPoints]), axis = 1))
+        
+    def overlayArtists(self):
+        return [self.correspondenceLines, self.xySelectedScatter, self.uvSelectedScatter] + self.annotations
+        
+    #a full draw (resize, new data) does not render the animated overlays, keep the background for blitting and put them on top
+    def onDraw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.a.bbox)
+        for artist in self.overlayArtists():
+            self.a.draw_artist(artist)
+        
+    #redraw only the overlays on top of the saved background, independent of the size of the point clouds
+    def blitOverlays(self):
+        if self.background is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self.background)
+        for artist in self.overlayArtists():
+            self.a.draw_artist(artist)
+        self.canvas.blit(self.a.bbox)
+        
+    def getSelectedAnchorPoints(self):
+        return (self.selectedXYAnchorPoints, self.selectedUVAnchorPoints)
+        
+    def resetSelectedAnchorPoints(self):
+        self.selectedXYAnchorPoints = np.empty((0,2), float)
+        self.selectedUVAnchorPoints = np.empty((0,2), float)
+        #whether the selected UV anchor points follow the UV path reversed (proposed by matchAnchors for a contour running the other way round,
+        #taken from the order of the selection after it was edited, see selectionReversed)
+        self.uvReversed = False
+        self.proposedReversed = False
+        
+class MachineGeometryDisplayWindow(tk.Toplevel):
+    def __init__(self):
+        tk.Toplevel.__init__(self)
+        self.image = tk.PhotoImage(file = "machineGeometry.png").subsample(3,3)
+        self.disp = tk.Label(self, image = self.image)
+        self.disp.pack()
+        
+class GenerationWindow(tk.Toplevel):
+    def __init__(self, data):
+        tk.Toplevel.__init__(self)
+        
+        self.generationWidget = GenerationWidget(self, data)
+        self.generationWidget.pack()
+        
+        #where the time of the last calculation went
+        self.statusBar = tk.Label(self, textvariable = self.generationWidget.stageReport, anchor = tk.W, relief = tk.SUNKEN, wraplength = 800, justify = tk.LEFT)
+        self.statusBar.pack(side = tk.BOTTOM, fill = tk.X)
+        
+        self.outputFileFrame = tk.Frame(self)
+        self.outputFileFrame.pack()
+        self.outputfileChooser = FileSaveChooser(self.outputFileFrame, labeltext = "output file:")
+        self.outputfileChooser.pack(side = tk.LEFT)
+        #the settings of the finished toolpath for saving it (see GenerationWidget.finishedResult), None if it can't be saved.
+        #the tool points are verified first, with problems the user decides whether to save anyway
+        def confirmToolpath():
+            settings = self.generationWidget.finishedResult()
+            if settings is None:
+                messagebox.showerror("no toolpath!", "there is no toolpath for these settings", parent = self)
+                return None
+            (xyToolPoints, uvToolPoints) = self.generationWidget.getToolPoints()
+            issues = verifyToolpath(xyToolPoints, uvToolPoints, settings)
+            if issues and not messagebox.askokcancel("toolpath problems!", formatIssues(issues) + "\n\nSave anyway?", parent = self):
+                return None
+            return settings
+        def saveGcode():
+            settings = confirmToolpath()
+            if settings is None:
+                return
+            with open(self.outputfileChooser.getFilePath(), "w") as f, recording() as recorder:
+                contours = [self.generationWidget.getGcodeToolPoints(settings)]
+                writeContoursGcode(f, contours, settings["feedrate"], **scheduleContourFeeds(contours, settings))
+            self.generationWidget.stageReport.set("saved: " + recorder.formatStatus())
+        self.outputfileSaveButton = tk.Button(self.outputFileFrame, text = "save", command = saveGcode)
+        self.outputfileSaveButton.pack(side = tk.RIGHT)
+        #the tool points as a binary file, for previewing or converting to gcode later (see the convert command)
+        def saveToolpath():
+            toolpathFile = filedialog.asksaveasfilename(parent = self, initialdir = "./", title = "select toolpath file", defaultextension = ".hwtp", filetypes = (("toolpath files","*.hwtp"), ("all files","*.*")))
+            if not toolpathFile:
+                return
+            settings = confirmToolpath()
+            if settings is None:
+                return
+            (xyToolPoints, uvToolPoints) = self.generationWidget.getToolPoints()
+            with recording() as recorder:
+                writeToolpath(toolpathFile, xyToolPoints, uvToolPoints, settings, self.generationWidget.anchorIndices)
+            self.generationWidget.stageReport.set("saved: " + recorder.formatStatus())
+        self.toolpathSaveButton = tk.Button(self.outputFileFrame, text = "save toolpath", command = saveToolpath)
+        self.toolpathSaveButton.pack(side = tk.RIGHT)
+        
+        self.closeButton = tk.Button(self, text = "close", command = self.destroy)
+        self.closeButton.pack()
+        #closing the window from the title bar destroys it the same way, so the generation widget stops its worker
+        self.protocol("WM_DELETE_WINDOW", self.destroy)
+        
+class FileSaveChooser(tk.Frame):
+           
+    def __init__(self, parent, labeltext = "File:", types = (("gcode files","*.gcode"), ("all files","*.*")) ):
+        tk.Frame.__init__(self, parent)
+        self.types = types
+        
+        self.filepathLabel = tk.Label(self, text = labeltext)
+        self.filepathLabel.grid(row = 0, column = 0)
+        
+        self.filepathEntry = tk.Entry(self)
+        self.filepathEntry.grid(row = 0, column = 1)
+        
+        self.browseButton = tk.Button(self, text = "browse...", command = self.browseFile)
+        self.browseButton.grid(row = 0, column = 2)
+               
+    def browseFile(self):
+        f = filedialog.asksaveasfile(parent = self.winfo_toplevel(), initialdir = "./", title = "select output file", filetypes = self.types)
+        tmp = f.name 
+        f.close()
+        self.filepathEntry.delete(0, tk.END) #delete and overwrite the set filename
+        self.filepathEntry.insert(tk.INSERT, tmp)     
+        self.filepathEntry.xview("end") #scroll to the back so the filename can be read better      
+    
+    def getFilePath(self):
+        return self.filepathEntry.get()
+        
+        
+#runs the calculation of a GenerationWidget on a background thread, so the window doesn't freeze
+#only the newest request is calculated: requests coming in while one is running replace each other, and the running one is cancelled at its next stage
+#results are only picked up from the results queue by the Tk thread, the worker never touches the window itself
+class RecalculationWorker:
+    def __init__(self, calculation):
+        self.calculation = calculation
+        self.condition = threading.Condition()
+        self.request = None
+        self.generation = 0 #number of the newest request
+        self.results = queue.Queue()
+        self.stopped = False
+        self.thread = threading.Thread(target = self.run, daemon = True)
+        self.thread.start()
+
+    #request a calculation with these arguments for ToolpathCalculation.calculate, returns its number
+    def submit(self, *args):
+        with self.condition:
+            self.generation += 1
+            self.request = (self.generation, args)
+            self.condition.notify()
+            return self.generation
+
+    #cancel the running calculation and end the thread, waits for it
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.generation += 1
+            self.condition.notify()
+        self.thread.join()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while (self.request is None) and not self.stopped:
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                (generation, args) = self.request
+                self.request = None
+            try:
+                with recording() as recorder:
+                    result = self.calculation.calculate(*args, checkCancelled = lambda: generation != self.generation)
+                self.results.put((generation, result, None, recorder))
+            except CalculationCancelled:
+                pass
+            except Exception as error:
+                self.results.put((generation, None, error, None))
+
+class GenerationWidget(tk.Frame):
+    def __init__(self, parent, data):
+        tk.Frame.__init__(self, parent)
+        self.data = data
+        self.calculation = ToolpathCalculation()
+        self.worker = RecalculationWorker(self.calculation)
+        self.pendingRecalculation = None #the debounce timer of the live preview
+        self.polling = None #the timer picking up the results of the worker
+        self.submittedSettings = None #the settings of the newest recalculation
+        self.resultSettings = None #the settings the shown toolpath was calculated with, None without one
+        self.stageReport = tk.StringVar() #time per stage of the last calculation, shown in the status bar of the window
+               
+        #settings box
+        self.settingsFrame = tk.Frame(self)
+        self.settingsFrame.pack(side = tk.RIGHT)
+        
+        #gantry length spinbox
+        self.gantryLengthSpinboxLabel = tk.Label(self.settingsFrame, text = "Gantry length:")
+        self.gantryLengthSpinboxLabel.pack()
+        self.gantryLengthSpinbox = tk.Spinbox(self.settingsFrame, from_ = 0, to = 10000, increment=1) # arbitrarily large from/to values for using spinbox as number input
+        self.gantryLengthSpinbox.delete(0, "end")
+        self.gantryLengthSpinbox.insert(0, '1000') #default val
+        self.gantryLengthSpinbox.pack()
+        
+        #foam width spinbox
+        self.foamWidthSpinboxLabel = tk.Label(self.settingsFrame, text = "Foam width:")
+        self.foamWidthSpinboxLabel.pack()
+        self.foamWidthSpinbox = tk.Spinbox(self.settingsFrame, from_ = 0, to = 10000, increment=1) # arbitrarily large from/to values for using spinbox as number input
+        self.foamWidthSpinbox.delete(0, "end")
+        self.foamWidthSpinbox.insert(0, '500') #default val
+        self.foamWidthSpinbox.pack()
+        
+        #distance from foam to xy axes spinbox
+        self.distanceToXYSpinboxLabel = tk.Label(self.settingsFrame, text = "distance Foam - XY axes:")
+        self.distanceToXYSpinboxLabel.pack()
+        self.distanceToXYSpinbox = tk.Spinbox(self.settingsFrame, from_ = 0, to = 10000, increment=1) # arbitrarily large from/to values for using spinbox as number input
+        self.distanceToXYSpinbox.delete(0, "end")
+        self.distanceToXYSpinbox.insert(0, '25') #default val
+        self.distanceToXYSpinbox.pack()
+        
+        #button for showing the machine geometry
+        self.recalcBtn = tk.Button(self.settingsFrame, text = "machine geometry", command = lambda: MachineGeometryDisplayWindow())
+        self.recalcBtn.pack() 
+        
+        #granularity slider
+        self.granularityLabel = tk.Label(self.settingsFrame, text = "granularity [mm] :")
+        self.granularityLabel.pack()
+        self.granularitySlider = tk.Scale(self.settingsFrame, from_ = 0.1, to=3, orient=tk.HORIZONTAL, resolution = 0.1)
+        self.granularitySlider.set(0.5)
+        self.granularitySlider.pack()
+        
+        #spinboxes for y and v offset
+        self.YSpinboxLabel = tk.Label(self.settingsFrame, text = "Y Offset:")
+        self.YSpinboxLabel.pack()
+        self.YSpinbox = tk.Spinbox(self.settingsFrame, from_ = -10000, to = 10000, increment=1) # arbitrarily large from/to values for using spinbox as number input
+        self.YSpinbox.delete(0, "end")
+        self.YSpinbox.insert(0, '0') #default val
+        self.YSpinbox.pack()
+        self.VSpinboxLabel = tk.Label(self.settingsFrame, text = "V Offset:")
+        self.VSpinboxLabel.pack()
+        self.VSpinbox = tk.Spinbox(self.settingsFrame, from_ = -10000, to = 10000, increment=1)
+        self.VSpinbox.delete(0, "end")
+        self.VSpinbox.insert(0, '0') #default val
+        self.VSpinbox.pack()  
+        
+        #spinboxes for x and u offset
+        self.XSpinboxLabel = tk.Label(self.settingsFrame, text = "X Offset:")
+        self.XSpinboxLabel.pack()
+        self.XSpinbox = tk.Spinbox(self.settingsFrame, from_ = -10000, to = 10000, increment=1) # arbitrarily large from/to values for using spinbox as number input
+        self.XSpinbox.delete(0, "end")
+        self.XSpinbox.insert(0, '0') #default val
+        self.XSpinbox.pack()
+        self.USpinboxLabel = tk.Label(self.settingsFrame, text = "U Offset:")
+        self.USpinboxLabel.pack()
+        self.USpinbox = tk.Spinbox(self.settingsFrame, from_ = -10000, to = 10000, increment=1)
+        self.USpinbox.delete(0, "end")
+        self.USpinbox.insert(0, '0') #default val
+        self.USpinbox.pack()
+        
+        #checkboxes for inverting the direction of the points
+        self.reverseXY = ttk.Checkbutton(self.settingsFrame, text = "reverse XY direction")
+        self.reverseXY.state(['!disabled','!alternate'])
+        self.reverseXY.pack()
+        self.reverseUV = ttk.Checkbutton(self.settingsFrame, text = "reverse UV direction")
+        self.reverseUV.state(['!disabled','!alternate'])
+        self.reverseUV.pack()
+        
+        #spinbox for the feedrate
+        self.FeedrateSpinboxLabel = tk.Label(self.settingsFrame, text = "Feedrate:")
+        self.FeedrateSpinboxLabel.pack()
+        self.FeedrateSpinbox = tk.Spinbox(self.settingsFrame, from_ = 0, to = 200, increment=0.1)
+        self.FeedrateSpinbox.delete(0, "end")
+        self.FeedrateSpinbox.insert(0, '5') #default val
+        self.FeedrateSpinbox.pack()
+        #how the feed is set per move, see feedModes
+        self.feedModeLabel = tk.Label(self.settingsFrame, text = "feed mode:")
+        self.feedModeLabel.pack()
+        self.feedModeCombobox = ttk.Combobox(self.settingsFrame, values = feedModes, state = "readonly")
+        self.feedModeCombobox.set(feedModes[0])
+        self.feedModeCombobox.pack()
+        
+        #spinboxes for the kerf at the feedrate and when the wire barely moves (0 = off)
+        self.kerfSpinboxLabel = tk.Label(self.settingsFrame, text = "kerf [mm]:")
+        self.kerfSpinboxLabel.pack()
+        self.kerfSpinbox = tk.Spinbox(self.settingsFrame, from_ = 0, to = 10, increment=0.01)
+        self.kerfSpinbox.delete(0, "end")
+        self.kerfSpinbox.insert(0, '0') #default val
+        self.kerfSpinbox.pack()
+        self.slowKerfSpinboxLabel = tk.Label(self.settingsFrame, text = "kerf when slow [mm]:")
+        self.slowKerfSpinboxLabel.pack()
+        self.slowKerfSpinbox = tk.Spinbox(self.settingsFrame, from_ = 0, to = 10, increment=0.01)
+        self.slowKerfSpinbox.delete(0, "end")
+        self.slowKerfSpinbox.insert(0, '0') #default val
+        self.slowKerfSpinbox.pack()
+        #travel of the axes the toolpath is verified against before saving (0 = not checked)
+        self.xTravelSpinboxLabel = tk.Label(self.settingsFrame, text = "X/U travel [mm]:")
+        self.xTravelSpinboxLabel.pack()
+        self.xTravelSpinbox = tk.Spinbox(self.settingsFrame, from_ = 0, to = 10000, increment=1)
+        self.xTravelSpinbox.delete(0, "end")
+        self.xTravelSpinbox.insert(0, '0') #default val
+        self.xTravelSpinbox.pack()
+        self.yTravelSpinboxLabel = tk.Label(self.settingsFrame, text = "Y/V travel [mm]:")
+        self.yTravelSpinboxLabel.pack()
+        self.yTravelSpinbox = tk.Spinbox(self.settingsFrame, from_ = 0, to = 10000, increment=1)
+        self.yTravelSpinbox.delete(0, "end")
+        self.yTravelSpinbox.insert(0, '0') #default val
+        self.yTravelSpinbox.pack()
+        
+        #spinbox for the tolerance of simplifying the gcode (0 = off)
+        self.toleranceSpinboxLabel = tk.Label(self.settingsFrame, text = "simplify tolerance [mm]:")
+        self.toleranceSpinboxLabel.pack()
+        self.toleranceSpinbox = tk.Spinbox(self.settingsFrame, from_ = 0, to = 10, increment=0.01)
+        self.toleranceSpinbox.delete(0, "end")
+        self.toleranceSpinbox.insert(0, '0') #default val
+        self.toleranceSpinbox.pack()
+        #spinbox for the tolerance of fitting G02/G03 arcs (0 = off)
+        self.arcToleranceSpinboxLabel = tk.Label(self.settingsFrame, text = "arc tolerance [mm]:")
+        self.arcToleranceSpinboxLabel.pack()
+        self.arcToleranceSpinbox = tk.Spinbox(self.settingsFrame, from_ = 0, to = 10, increment=0.01)
+        self.arcToleranceSpinbox.delete(0, "end")
+        self.arcToleranceSpinbox.insert(0, '0') #default val
+        self.arcToleranceSpinbox.pack()
+        self.simplificationLabel = tk.Label(self.settingsFrame, text = "")
+        self.simplificationLabel.pack()
+        
+        #button for triggering recalculation
+        self.recalcBtn = tk.Button(self.settingsFrame, text = "recalculate!", command = self.recalculate)
+        self.recalcBtn.pack()      
+        
+        #live preview: recalculate in the background shortly after any setting changed
+        self.livePreview = tk.BooleanVar(value = False)
+        self.livePreviewCheckbox = ttk.Checkbutton(self.settingsFrame, text = "live preview", variable = self.livePreview, command = self.settingsChanged)
+        self.livePreviewCheckbox.pack()
+        self.calculationStatusLabel = tk.Label(self.settingsFrame, text = "")
+        self.calculationStatusLabel.pack()
+        for spinbox in (self.gantryLengthSpinbox, self.foamWidthSpinbox, self.distanceToXYSpinbox, self.XSpinbox, self.YSpinbox, self.USpinbox, self.VSpinbox, self.FeedrateSpinbox, self.kerfSpinbox, self.slowKerfSpinbox):
+            spinbox.config(command = self.settingsChanged)
+            spinbox.bind("<KeyRelease>", lambda event: self.settingsChanged())
+        self.granularitySlider.config(command = lambda value: self.settingsChanged())
+        self.reverseXY.config(command = self.settingsChanged)
+        self.reverseUV.config(command = self.settingsChanged)
+        self.feedModeCombobox.bind("<<ComboboxSelected>>", lambda event: self.settingsChanged())
+        
+        #the figure itself
+        self.f = Figure(figsize=(8,8), dpi=100)
+        self.a = self.f.add_subplot(111)
+        #persistent artists, a recalculation only replaces their offsets
+        empty = np.empty((0,2), float)
+        self.uvToolScatter = self.a.scatter(empty[:,0], empty[:,1], c = '#00b500', s = 1) #dark green
+        self.uvFoamScatter = self.a.scatter(empty[:,0], empty[:,1], c = '#00ff00', s = 1) #bright green
+        self.xyFoamScatter = self.a.scatter(empty[:,0], empty[:,1], c = '#ff0000', s = 1) #bright red, size = 1
+        self.xyToolScatter = self.a.scatter(empty[:,0], empty[:,1], c = '#b50000', s = 1) #dark red
+        self.anchorLines = LineCollection([], colors = 'grey')
+        self.a.add_collection(self.anchorLines)
+        self.arrows = []
+        self.a.set_aspect("equal")    
+        self.a.grid(color='grey', linestyle='-', linewidth=0.5)
+        self.a.legend([self.uvToolScatter, self.uvFoamScatter, self.xyFoamScatter, self.xyToolScatter], ["UV tool", "UV on foam", "XY on foam", "XY tool"])  
+
+        self.canvas = FigureCanvasTkAgg(self.f, self)
+        self.canvas.draw()
+        self.canvas.get_tk_widget().pack(side = tk.LEFT, expand=True)
+        
+    #the settings as they are entered in the settings box
+    def getSettings(self):
+        return {
+            "gantryLength": float(self.gantryLengthSpinbox.get()),
+            "foamWidth": float(self.foamWidthSpinbox.get()),
+            "distanceToXYaxis": float(self.distanceToXYSpinbox.get()),
+            "granularity": self.granularitySlider.get(),
+            "xOffset": float(self.XSpinbox.get()),
+            "yOffset": float(self.YSpinbox.get()),
+            "uOffset": float(self.USpinbox.get()),
+            "vOffset": float(self.VSpinbox.get()),
+            "reverseXY": self.reverseXY.instate(['selected']),
+            "reverseUV": self.reverseUV.instate(['selected']),
+            "feedrate": float(self.FeedrateSpinbox.get()),
+            "tolerance": float(self.toleranceSpinbox.get()),
+            "arcTolerance": float(self.arcToleranceSpinbox.get()),
+            "feedMode": self.feedModeCombobox.get(),
+            "kerfWidth": float(self.kerfSpinbox.get()),
+            "slowKerfWidth": float(self.slowKerfSpinbox.get()),
+            "xTravel": float(self.xTravelSpinbox.get()),
+            "yTravel": float(self.yTravelSpinbox.get()),
+        }
+
+    #a setting changed: with live preview on, recalculate once the settings stop changing for a moment
+    def settingsChanged(self):
+        if not self.livePreview.get():
+            return
+        if self.pendingRecalculation is not None:
+            self.after_cancel(self.pendingRecalculation)
+        self.pendingRecalculation = self.after(300, self.recalculate)
+        
+    #recalculate in the background, the display is updated when the result is there. returns whether the settings were valid
+    def recalculate(self):
+        self.pendingRecalculation = None
+        try:
+            settings = self.getSettings()
+        except ValueError: #a spinbox is in the middle of being edited
+            self.calculationStatusLabel.config(text = "invalid setting")
+            return False
+        self.submittedSettings = settings
+        self.worker.submit(self.data[0], self.data[2], self.data[3], self.data[5], settings)
+        self.calculationStatusLabel.config(text = "calculating...")
+        if self.polling is None:
+            self.polling = self.after(50, self.pollResults)
+        return True
+        
+    #show a result of the worker, returns False if it is outdated
+    def takeResult(self, generation, result, error, recorder):
+        if (generation != self.worker.generation) :
+            return False
+        if error is not None:
+            self.calculationStatusLabel.config(text = "error: " + str(error))
+            self.resultSettings = None
+        else:
+            (self.xyPoints, self.uvPoints, self.anchorIndices, self.xyToolPoints, self.uvToolPoints) = result
+            self.resultSettings = self.submittedSettings
+            self.calculationStatusLabel.config(text = "")
+            with recording(recorder):
+                self.drawToolpath()
+            self.stageReport.set(recorder.formatStatus())
+        return True
+
+    #pick up the results of the worker on the Tk thread, only the newest one is shown
+    def pollResults(self):
+        try:
+            while not self.takeResult(*self.worker.results.get_nowait()):
+                pass
+            self.polling = None
+        except queue.Empty:
+            self.polling = self.after(50, self.pollResults)
+
+    #the settings of the toolpath for saving it. the toolpath is recalculated first if the settings changed since, and a recalculation
+    #that is still running is waited for, so the saved points always belong to the settings. None if there is no toolpath for them
+    def finishedResult(self):
+        if self.pendingRecalculation is not None:
+            self.after_cancel(self.pendingRecalculation)
+            self.pendingRecalculation = None
+        try:
+            changed = self.getSettings() != self.submittedSettings
+        except ValueError:
+            changed = True
+        if changed or ((self.resultSettings is None) and (self.polling is None)) :
+            if not self.recalculate():
+                return None
+        while self.polling is not None:
+            if self.takeResult(*self.worker.results.get()):
+                self.after_cancel(self.polling)
+                self.polling = None
+        return self.resultSettings
+
+    #the timers and the worker go with the widget
+    def destroy(self):
+        for timer in (self.pendingRecalculation, self.polling):
+            if timer is not None:
+                self.after_cancel(timer)
+        (self.pendingRecalculation, self.polling) = (None, None)
+        self.worker.stop()
+        tk.Frame.destroy(self)
+        
+    def drawToolpath(self):
+        with stage("render") as record:
+            self.plotToolpath()
+            self.canvas.draw()
+            record.points = len(self.xyToolPoints)
+            
+    def plotToolpath(self):
+        pointClouds = (self.uvToolPoints, self.uvPoints, self.xyPoints, self.xyToolPoints)
+        pixelSize = fitAxesToPoints(self.a, pointClouds)
+        for scatter, pointCloud in zip((self.uvToolScatter, self.uvFoamScatter, self.xyFoamScatter, self.xyToolScatter), pointClouds):
+            scatter.set_offsets(decimateForDisplay(pointCloud, pixelSize))
+        
+        #draw arrow indicating direction
+        for arrow in self.arrows:
+            arrow.remove()
+        ylim = self.a.get_ylim()
+        xlim = self.a.get_xlim()
+        arrowLength = ((ylim[1]-ylim[0]) + (xlim[1]-xlim[0]))/2
+        arrowLength = arrowLength / 15
+        self.arrows = [
+            self.a.arrow(*getArrowAtIndex(self.xyToolPoints, self.anchorIndices[0], arrowLength), head_width = arrowLength / 2.5, color = "#750000"),
+            self.a.arrow(*getArrowAtIndex(self.uvToolPoints, self.anchorIndices[0], arrowLength), head_width = arrowLength / 2.5, color = "#007500")]
+        
+        #draw lines between corresponding anchors/points
+        self.anchorLines.set_segments(np.stack((self.xyToolPoints[self.anchorIndices], self.uvToolPoints[self.anchorIndices]), axis = 1))
+    
+    def getPoints(self):
+        return (self.xyPoints, self.uvPoints) 
+    
+    def getToolPoints(self):
+        return (self.xyToolPoints, self.uvToolPoints)
+    
+    #the tool points as they go into the gcode, simplified and with arcs fitted if the tolerances are set
+    #returns the tool points and the arcs in them
+    def getGcodeToolPoints(self, settings):
+        (xyToolPoints, uvToolPoints, arcs, stats) = prepareGcodeToolpath(self.xyToolPoints, self.uvToolPoints, self.anchorIndices, settings)
+        if (settings["tolerance"] > 0) or (settings["arcTolerance"] > 0) :
+            self.simplificationLabel.config(text = formatSimplification(stats))
+        else:
+            self.simplificationLabel.config(text = "")
+        return (xyToolPoints, uvToolPoints, arcs)
+
+def runGui():
+    #keep parsed svgs and sliced paths between sessions
+    if sliceCache.directory is None:
+        sliceCache.directory = defaultCacheDirectory
+    app = gcodeGeneratorApp()
+    app.mainloop()
+
+if __name__ == "__main__":
+    runGui()
@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+# streams gcode to a GRBL style controller over a serial port or tcp while it is generated
+# the gcode is split into lines by a background thread that fills a bounded queue, the sender keeps the receive buffer of the controller
+# full by counting the characters of the lines it hasn't acknowledged yet. pyserial is used for serial ports if it is installed,
+# without it serial ports (and ptys) are opened as plain posix terminals
+
+import os
+import queue
+import select
+import socket
+import sys
+import threading
+import time
+from collections import deque
+
+try:
+    import serial
+except ImportError: #no pyserial, DeviceLink falls back to termios
+    serial = None
+
+#size of the receive buffer of GRBL
+grblBufferSize = 128
+#number of lines the background thread generates ahead of the sender
+lookAheadLines = 1000
+#sent to the controller when a send is aborted, so it doesn't go on with its buffered moves or sit still with the wire hot:
+#feed hold and, once the wire had time to slow down, soft reset (realtime commands GRBL acts on at once, the reset drops the
+#buffered moves and switches the wire off) and M5 for controllers without them
+abortHold = b"!"
+abortReset = b"\x18"
+abortLine = b"M5\n"
+abortHoldTime = 0.2
+
+class SenderError(Exception):
+    pass
+
+#connection to a controller over tcp, port is "tcp://host:port"
+class SocketLink:
+    def __init__(self, port, timeout = 10.0):
+        (host, portNumber) = port[len("tcp://"):].rsplit(":", 1)
+        self.socket = socket.create_connection((host, int(portNumber)), timeout)
+
+    def write(self, data):
+        self.socket.sendall(data)
+
+    #whatever arrived within timeout seconds, b"" if nothing did
+    def read(self, timeout):
+        (readable, writable, failed) = select.select([self.socket], [], [], timeout)
+        if not readable:
+            return b""
+        data = self.socket.recv(4096)
+        if not data:
+            raise SenderError("the controller closed the connection")
+        return data
+
+    def close(self):
+        self.socket.close()
+
+#connection to a controller over a serial port or a pty
+class DeviceLink:
+    def __init__(self, device, baudrate = 115200):
+        if serial is not None:
+            self.port = serial.Serial(device, baudrate, timeout = 0)
+            self.fd = None
+        else:
+            import termios
+            import tty
+            self.port = None
+            self.fd = os.open(device, os.O_RDWR | os.O_NOCTTY)
+            tty.setraw(self.fd)
+            attributes = termios.tcgetattr(self.fd)
+            speed = getattr(termios, "B%d" % baudrate)
+            (attributes[4], attributes[5]) = (speed, speed)
+            termios.tcsetattr(self.fd, termios.TCSANOW, attributes)
+
+    def write(self, data):
+        if self.port is not None:
+            self.port.write(data)
+            return
+        while data:
+            data = data[os.write(self.fd, data):]
+
+    def read(self, timeout):
+        if self.port is not None:
+            self.port.timeout = timeout
+            return self.port.read(max(1, self.port.in_waiting))
+        (readable, writable, failed) = select.select([self.fd], [], [], timeout)
+        return os.read(self.fd, 4096) if readable else b""
+
+    def close(self):
+        if self.port is not None:
+            self.port.close()
+        else:
+            os.close(self.fd)
+
+def openLink(port, baudrate = 115200):
+    if port.startswith("tcp://"):
+        return SocketLink(port)
+    return DeviceLink(port, baudrate)
+
+#marks the end of the gcode in the queue
+endOfGcode = object()
+
+#sends gcode chunks to a controller with character counting flow control: a line is sent as soon as it fits into what is left
+#of the receive buffer of the controller, every "ok" or "error" frees the characters of the oldest unacknowledged line.
+#the chunks are split into lines by a background thread into a queue of at most queueSize lines, so generating and sending overlap
+class GcodeSender:
+    def __init__(self, link, bufferSize = grblBufferSize, queueSize = lookAheadLines, responseTimeout = 30.0, progress = None, progressInterval = 1.0, stopOnError = True):
+        self.link = link
+        self.bufferSize = bufferSize
+        self.lines = queue.Queue(maxsize = queueSize)
+        self.responseTimeout = responseTimeout
+        self.progress = progress
+        self.progressInterval = progressInterval
+        self.stopOnError = stopOnError
+        self.stopped = threading.Event()
+        self.received = b""
+        self.telemetry = {"sent": 0, "acknowledged": 0, "bytes": 0, "errors": [], "starved": 0, "seconds": 0.0, "linesPerSecond": 0.0, "queued": 0, "inFlight": 0}
+
+    #split the chunks into lines for the queue, on the background thread. errors of the generation are handed on through the queue
+    def fillQueue(self, chunks):
+        try:
+            for chunk in chunks:
+                for line in chunk.splitlines():
+                    line = line.strip()
+                    if line and not self.put(line):
+                        return
+        except Exception as error:
+            self.put(error)
+            return
+        self.put(endOfGcode)
+
+    #put into the bounded queue unless the sender stopped, returns False if it did
+    def put(self, item):
+        while not self.stopped.is_set():
+            try:
+                self.lines.put(item, timeout = 0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    #the complete lines the controller sent within timeout seconds
+    def readResponses(self, timeout):
+        self.received += self.link.read(timeout)
+        *lines, self.received = self.received.split(b"\n")
+        return [line.strip().decode(errors = "replace") for line in lines if line.strip()]
+
+    #stream the gcode chunks to the controller, returns the telemetry once every line is acknowledged. if anything goes wrong
+    #(an alarm or error of the controller, no response, the generation fails, ctrl-c) the controller is stopped, see abort
+    def send(self, chunks):
+        producer = threading.Thread(target = self.fillQueue, args = (chunks,), daemon = True)
+        producer.start()
+        try:
+            return self.sendLines()
+        except BaseException:
+            self.abort()
+            raise
+        finally:
+            self.stopped.set()
+
+    #stop the controller: feed hold, soft reset and M5. the link may be broken already, that mustn't hide why the send was aborted
+    def abort(self):
+        try:
+            self.link.write(abortHold)
+            time.sleep(abortHoldTime)
+            self.link.write(abortReset)
+            self.link.write(abortLine)
+        except (OSError, SenderError) as error:
+            print("could not stop the controller: " + str(error), file = sys.stderr)
+
+    def sendLines(self):
+        telemetry = self.telemetry
+        inFlight = deque()
+        inFlightCharacters = 0
+        pending = None
+        finished = False
+        startTime = time.perf_counter()
+        lastResponse = startTime
+        lastProgress = startTime
+        while True:
+            #fill the receive buffer of the controller as far as it goes
+            while not finished:
+                if pending is None:
+                    try:
+                        item = self.lines.get_nowait() if inFlight else self.lines.get(timeout = 0.05)
+                    except queue.Empty:
+                        if (not inFlight) and telemetry["sent"]:
+                            telemetry["starved"] += 1 #the controller got everything and the generation isn't ready with more
+                        break
+                    if item is endOfGcode:
+                        finished = True
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    pending = (item + "\n").encode()
+                if inFlight and (inFlightCharacters + len(pending) > self.bufferSize):
+                    break
+                self.link.write(pending)
+                if not inFlight:
+                    lastResponse = time.perf_counter() #the response timeout counts from the first unacknowledged line
+                inFlight.append(len(pending))
+                inFlightCharacters += len(pending)
+                telemetry["sent"] += 1
+                telemetry["bytes"] += len(pending)
+                pending = None
+            if finished and not inFlight:
+                break
+
+            for response in self.readResponses(0.01 if not inFlight else 0.05):
+                if response.startswith("ALARM"):
+                    raise SenderError("controller alarm: " + response)
+                if (response != "ok") and not response.startswith("error"):
+                    continue #status reports, welcome message, feedback messages
+                if not inFlight:
+                    raise SenderError("unexpected response from the controller: " + response)
+                inFlightCharacters -= inFlight.popleft()
+                telemetry["acknowledged"] += 1
+                lastResponse = time.perf_counter()
+                if response.startswith("error"):
+                    telemetry["errors"].append((telemetry["acknowledged"], response))
+                    if self.stopOnError:
+                        raise SenderError("line %d: %s" % (telemetry["acknowledged"], response))
+
+            now = time.perf_counter()
+            if inFlight and (now - lastResponse > self.responseTimeout):
+                raise SenderError("no response from the controller for %g s" % self.responseTimeout)
+            self.updateTelemetry(startTime, now, inFlightCharacters)
+            if (self.progress is not None) and (now - lastProgress >= self.progressInterval):
+                self.progress(dict(telemetry))
+                lastProgress = now
+        self.updateTelemetry(startTime, time.perf_counter(), inFlightCharacters)
+        return dict(telemetry)
+
+    def updateTelemetry(self, startTime, now, inFlightCharacters):
+        telemetry = self.telemetry
+        telemetry["seconds"] = now - startTime
+        telemetry["linesPerSecond"] = telemetry["acknowledged"] / telemetry["seconds"] if telemetry["seconds"] > 0 else 0.0
+        telemetry["queued"] = self.lines.qsize()
+        telemetry["inFlight"] = inFlightCharacters
+
+def formatTelemetry(telemetry):
+    return "%d lines sent, %d acknowledged, %.0f lines/s, %d characters in the controller, %d lines queued, starved %d times, %d errors" % (
+        telemetry["sent"], telemetry["acknowledged"], telemetry["linesPerSecond"], telemetry["inFlight"], telemetry["queued"], telemetry["starved"], len(telemetry["errors"]))
+
+#realtime commands of GRBL, single characters that aren't part of a line: feed hold, cycle start, status report and soft reset
+realtimeCommands = b"!~?\x18"
+
+#a stand-in for a GRBL controller on the other end of a file descriptor (e.g. the master of a pty), for trying the sender without a machine.
+#it works through the received lines one after the other, lineTime seconds each, answers every one with answer(number, line)
+#("ok" by default, the lines are counted from 1) and notes an overflow if the sender ever has more than bufferSize characters in
+#its receive buffer. the realtime commands it got are kept in realtime, a soft reset drops the lines it hasn't worked through
+class ControllerStandIn:
+    def __init__(self, fd, bufferSize = grblBufferSize, lineTime = 0.0, answer = None):
+        self.fd = fd
+        self.slave = None
+        self.bufferSize = bufferSize
+        self.lineTime = lineTime
+        self.answer = answer
+        self.lines = 0
+        self.received = []
+        self.overflows = 0
+        self.realtime = b""
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target = self.run, daemon = True)
+        self.thread.start()
+
+    def run(self):
+        received = b""
+        while not self.stopped.is_set():
+            (readable, writable, failed) = select.select([self.fd], [], [], 0.05)
+            if readable:
+                try:
+                    data = os.read(self.fd, 4096)
+                except OSError: #the other end was closed
+                    return
+                for character in data:
+                    if bytes([character]) in realtimeCommands:
+                        self.realtime += bytes([character])
+                        if (bytes([character]) == abortReset) :
+                            received = b""
+                    else:
+                        received += bytes([character])
+            if len(received) > self.bufferSize:
+                self.overflows += 1
+            while b"\n" in received:
+                (line, received) = received.split(b"\n", 1)
+                if self.lineTime:
+                    time.sleep(self.lineTime)
+                self.lines += 1
+                self.received.append(line.strip().decode())
+                response = self.answer(self.lines, self.received[-1]) if (self.answer is not None) else "ok"
+                os.write(self.fd, response.encode() + b"\r\n")
+
+    #end the stand-in and close its side of the pty
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        for fd in (self.fd, self.slave):
+            if fd is not None:
+                os.close(fd)
+        (self.fd, self.slave) = (None, None)
+
+#a pty with a ControllerStandIn on its master side, returns the stand-in and the device name the sender opens
+def openStandIn(bufferSize = grblBufferSize, lineTime = 0.0, answer = None):
+    import tty
+    (master, slave) = os.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+    standIn = ControllerStandIn(master, bufferSize, lineTime, answer)
+    standIn.slave = slave #kept open, so the pty stays alive while the sender opens it by name
+    return (standIn, os.ttyname(slave))
+
+#gcode chunks from the inputs of the send command: a gcode file, a binary toolpath or an XY and a UV svg file that are generated while sending
+def gcodeChunksFor(args):
+    from hotwireGcodeGenerator import Toolpath, toolpathMagic, iterGcodeFromSvgs, readAnchorSelection, completeSettings, settingsFromArguments, printIssues
+    if len(args.inputs) == 2:
+        (args.xySvg, args.uvSvg) = args.inputs
+        return iterGcodeFromSvgs(args.xySvg, args.uvSvg, readAnchorSelection(args), completeSettings(settingsFromArguments(args)), args.verify, args.strict, printIssues)
+    if len(args.inputs) != 1:
+        raise ValueError("send a gcode file, a toolpath file or an XY and a UV svg file")
+    inputFile = args.inputs[0]
+    with open(inputFile, "rb") as f:
+        isToolpath = (f.read(len(toolpathMagic)) == toolpathMagic)
+    if isToolpath:
+        toolpath = Toolpath(inputFile)
+        if args.verify:
+            issues = toolpath.verify(settingsFromArguments(args), args.strict)
+            if issues:
+                printIssues(issues, len(toolpath.contourStarts))
+        return toolpath.iterGcode()
+    return iterFileLines(inputFile)
+
+def iterFileLines(gcodeFile):
+    with open(gcodeFile) as f:
+        yield from f
+
+#the send command, see buildArgumentParser in hotwireGcodeGenerator.py
+def runSend(args):
+    standIn = None
+    port = args.port
+    if args.standIn:
+        (standIn, port) = openStandIn(args.rxBuffer, args.standInLineTime)
+    elif port is None:
+        raise ValueError("give the port of the controller with --port, or try it with --stand-in")
+    link = openLink(port, args.baud)
+    result = 0
+    try:
+        if args.startupDelay and not (args.standIn or port.startswith("tcp://")):
+            #GRBL resets when the port is opened, skip its welcome message
+            time.sleep(args.startupDelay)
+            link.read(0.1)
+        def progress(telemetry):
+            print(formatTelemetry(telemetry), file = sys.stderr)
+        sender = GcodeSender(link, args.rxBuffer, args.lookAhead, progress = progress if args.verbose else None)
+        telemetry = sender.send(gcodeChunksFor(args))
+        print(formatTelemetry(telemetry) + ", %.1f s" % telemetry["seconds"], file = sys.stderr)
+    except SenderError as error:
+        print("error: " + str(error) + " (the controller was stopped)", file = sys.stderr)
+        result = 1
+    except KeyboardInterrupt:
+        print("error: interrupted (the controller was stopped)", file = sys.stderr)
+        result = 1
+    finally:
+        link.close()
+        if standIn is not None:
+            standIn.stop()
+    if (standIn is not None) and standIn.overflows:
+        print("stand-in: the receive buffer overflowed %d times" % standIn.overflows, file = sys.stderr)
+        result = 1
+    return result
@@ -0,0 +1,437 @@
+#tests of the generation, run with python -m pytest
+#the svgs are written to a temporary directory, every test builds the shapes it needs
+
+import numpy as np
+import pytest
+
+from hotwireGcodeGenerator import completeSettings, planCuts, proposeAnchors, calculateCut, sliceCache
+
+def writeSvg(directory, name, polygons):
+    paths = "".join('  <path d="M %s Z" fill="none" stroke="black"/>\n' % " L ".join("%r,%r" % (float(x), float(y)) for (x, y) in polygon) for polygon in polygons)
+    svgFile = directory / name
+    svgFile.write_text('<svg xmlns="http://www.w3.org/2000/svg">\n' + paths + '</svg>\n')
+    return str(svgFile)
+
+#an L shape, counterclockwise in svg coordinates, every corner of it looks different
+lShape = np.array([(0, 0), (100, 0), (100, 30), (40, 30), (40, 80), (0, 80)], float)
+
+def scaled(polygon, factor, center = (50, 40)):
+    return np.asarray(center) + factor * (np.asarray(polygon, float) - center)
+
+@pytest.fixture(autouse = True)
+def memoryCacheOnly():
+    directory = sliceCache.directory
+    sliceCache.directory = None
+    sliceCache.clear()
+    yield
+    sliceCache.directory = directory
+
+#the UV contour is the XY contour scaled down and drawn the other way round: every XY point has to meet the scaled UV point
+def testReversedContourIsMatchedTheRightWayRound(tmp_path):
+    xySvg = writeSvg(tmp_path, "xy.svg", [lShape])
+    uvSvg = writeSvg(tmp_path, "uv.svg", [scaled(lShape, 0.8)[::-1]])
+    settings = completeSettings({"granularity": 1.0})
+    proposed = proposeAnchors(xySvg, uvSvg, settings)
+    assert proposed["reverseUV"]
+    [cut] = planCuts(xySvg, uvSvg, "auto", settings)
+    (xyPoints, uvPoints, anchorIndices, xyToolPoints, uvToolPoints) = calculateCut(cut, settings)
+    assert len(anchorIndices) >= 2
+    np.testing.assert_allclose(uvPoints, scaled(xyPoints, 0.8), atol = 1e-6)
+
+#the same with the proposal written to an anchor file and read back
+def testReversedContourFromAnchorFile(tmp_path):
+    from hotwireGcodeGenerator import contourAnchorSelection
+    xySvg = writeSvg(tmp_path, "xy.svg", [lShape])
+    uvSvg = writeSvg(tmp_path, "uv.svg", [scaled(lShape, 0.8)[::-1]])
+    settings = completeSettings({"granularity": 1.0})
+    [cut] = planCuts(xySvg, uvSvg, contourAnchorSelection(proposeAnchors(xySvg, uvSvg, settings)), settings)
+    (xyPoints, uvPoints, anchorIndices, xyToolPoints, uvToolPoints) = calculateCut(cut, settings)
+    np.testing.assert_allclose(uvPoints, scaled(xyPoints, 0.8), atol = 1e-6)
+
+#contours without corners still get 2 pairs
+def testMatchWithoutCornersGivesTwoPairs(tmp_path):
+    angles = np.linspace(0, 2*np.pi, 90, endpoint = False)
+    circle = np.column_stack((50 + 40*np.cos(angles), 40 + 40*np.sin(angles)))
+    xySvg = writeSvg(tmp_path, "xy.svg", [circle])
+    uvSvg = writeSvg(tmp_path, "uv.svg", [scaled(circle, 0.5)])
+    proposed = proposeAnchors(xySvg, uvSvg, completeSettings({}))
+    assert len(proposed["xy"]) == len(proposed["uv"]) >= 2
+
+#a smooth contour with 5 lobes, the UV one scaled down and starting half a lobe further on: every anchor point of the XY contour
+#has to meet the scaled XY point on the UV contour, not one of its neighbours or the same place on another lobe
+def testSmoothContourAnchorsMeetTheirPartners(tmp_path):
+    from hotwireGcodeGenerator import loadContours, matchAnchors
+    def lobes(noPoints, start):
+        angles = 2*np.pi*(np.arange(noPoints) + start)/noPoints
+        radii = 40*(1 + 0.3*np.cos(5*angles))
+        return np.column_stack((50 + radii*np.cos(angles), 40 + radii*np.sin(angles)))
+    for (noPoints, start) in ((1000, 0), (3000, 300.5)):
+        [(xyPath, xyAnchorPoints, xyContour)] = loadContours(writeSvg(tmp_path, "xy.svg", [lobes(noPoints, 0)]))
+        [(uvPath, uvAnchorPoints, uvContour)] = loadContours(writeSvg(tmp_path, "uv.svg", [scaled(lobes(noPoints, start), 0.8)]))
+        (xyIndices, uvIndices, reverseUV) = matchAnchors(xyContour, xyAnchorPoints, uvContour, uvAnchorPoints)
+        assert (not reverseUV) and (len(xyIndices) >= 10)
+        errors = np.linalg.norm(scaled(xyAnchorPoints[xyIndices], 0.8) - uvAnchorPoints[uvIndices], axis = 1)
+        assert np.max(errors) < 0.5
+
+#a square part with a square hole: the kerf goes to the outside of the part and into the hole, on both sides of the foam
+def testKerfGoesOutOfPartsAndIntoHoles(tmp_path):
+    outline = np.array([(0, 0), (60, 0), (60, 60), (0, 60)], float)
+    hole = np.array([(20, 20), (20, 40), (40, 40), (40, 20)], float)
+    xySvg = writeSvg(tmp_path, "xy.svg", [outline, hole])
+    uvSvg = writeSvg(tmp_path, "uv.svg", [outline, hole])
+    settings = completeSettings({"granularity": 1.0, "kerfWidth": 1.0})
+    cuts = planCuts(xySvg, uvSvg, "auto", settings)
+    assert sorted(cut[4] for cut in cuts) == [False, True]
+    for cut in cuts:
+        (xyPoints, uvPoints, anchorIndices, xyToolPoints, uvToolPoints) = calculateCut(cut, settings)
+        #the wire keeps half the kerf away from the edges right into the corners
+        (low, high) = ((20.5, 39.5) if cut[4] else (-0.5, 60.5))
+        for points in (xyPoints, uvPoints):
+            np.testing.assert_allclose(points.min(axis = 0), (low, low), atol = 1e-6)
+            np.testing.assert_allclose(points.max(axis = 0), (high, high), atol = 1e-6)
+
+#the verification of a streamed toolpath, run by run, finds the same problems as the one of the whole toolpath and doesn't change the gcode
+def testStreamedVerificationFindsWhatTheWholeToolpathHas(tmp_path):
+    from hotwireGcodeGenerator import generateGcodeFromSvgs, verifyToolpath, ToolpathVerifier
+    xySvg = writeSvg(tmp_path, "xy.svg", [lShape])
+    uvSvg = writeSvg(tmp_path, "uv.svg", [scaled(lShape, 0.8)])
+    settings = completeSettings({"granularity": 0.5, "xTravel": 90, "maxMoveLength": 0.4, "maxDirectionChange": 60, "maxAcceleration": 0.005})
+    [cut] = planCuts(xySvg, uvSvg, "auto", settings)
+    (xyPoints, uvPoints, anchorIndices, xyToolPoints, uvToolPoints) = calculateCut(cut, settings)
+    issues = verifyToolpath(xyToolPoints, uvToolPoints, settings)
+    assert {issue["check"] for issue in issues} == {"soft limits", "move length", "direction change", "acceleration"}
+    verifier = ToolpathVerifier(settings)
+    for start in range(0, len(xyToolPoints), 7):
+        verifier.add(xyToolPoints[start:start + 7], uvToolPoints[start:start + 7])
+    streamed = verifier.finish()
+    assert [(issue["check"], issue["count"], issue["worst"]) for issue in streamed] == [(issue["check"], issue["count"], issue["worst"]) for issue in issues]
+
+    stats = generateGcodeFromSvgs(xySvg, uvSvg, "auto", settings, str(tmp_path / "verified.gcode"), verify = True)
+    generateGcodeFromSvgs(xySvg, uvSvg, "auto", settings, str(tmp_path / "plain.gcode"))
+    assert [issue["count"] for issue in stats["issues"]] == [issue["count"] for issue in issues]
+    assert (tmp_path / "verified.gcode").read_text() == (tmp_path / "plain.gcode").read_text()
+
+#a batch job that fails leaves neither its output nor a temporary file, one that works replaces the output
+def testFailedBatchJobLeavesNoOutput(tmp_path):
+    from hotwireGcodeGenerator import runBatchJob
+    xySvg = writeSvg(tmp_path, "xy.svg", [lShape])
+    uvSvg = writeSvg(tmp_path, "uv.svg", [scaled(lShape, 0.8)])
+    job = {"name": "part", "xy": xySvg, "uv": str(tmp_path / "missing.svg"), "anchors": "auto", "settings": {}, "output": str(tmp_path / "part.gcode")}
+    assert not runBatchJob(job)["ok"]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["uv.svg", "xy.svg"]
+    job["uv"] = uvSvg
+    assert runBatchJob(job)["ok"]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["part.gcode", "uv.svg", "xy.svg"]
+
+#the timeout of a batch job isn't taken for a failed read of the cache
+def testJobTimeoutGetsThroughTheCache(tmp_path, monkeypatch):
+    from hotwireGcodeGenerator import JobTimeout
+    sliceCache.directory = str(tmp_path)
+    sliceCache.lookup("key", lambda: np.zeros(3), lambda value: {"value": value}, lambda arrays: arrays["value"])
+    sliceCache.clear()
+    def timeout(*args, **kwargs):
+        raise JobTimeout("job timed out")
+    monkeypatch.setattr(np, "load", timeout)
+    with pytest.raises(JobTimeout):
+        sliceCache.lookup("key", lambda: np.zeros(3), lambda value: {"value": value}, lambda arrays: arrays["value"])
+
+#entries stored by another format of the cache are not read
+def testCacheFilesDependOnTheFormat(tmp_path, monkeypatch):
+    import hotwireGcodeGenerator
+    sliceCache.directory = str(tmp_path)
+    fileName = sliceCache.fileName(("slice", "0" * 64, 0.5, False))
+    monkeypatch.setattr(hotwireGcodeGenerator, "sliceCacheFormat", hotwireGcodeGenerator.sliceCacheFormat + 1)
+    assert sliceCache.fileName(("slice", "0" * 64, 0.5, False)) != fileName
+
+#the profile of a streamed generation has the fine slicing and the gcode, and no kerf when it is off
+def testProfileListsTheStagesThatRan(tmp_path):
+    from hotwireGcodeGenerator import generateGcodeFromSvgs, recording
+    xySvg = writeSvg(tmp_path, "xy.svg", [lShape])
+    uvSvg = writeSvg(tmp_path, "uv.svg", [scaled(lShape, 0.8)])
+    for (kerfWidth, kerf) in ((0.0, False), (0.5, True)):
+        with recording() as recorder:
+            generateGcodeFromSvgs(xySvg, uvSvg, "auto", {"kerfWidth": kerfWidth}, str(tmp_path / "part.gcode"))
+        stages = [entry["stage"] for entry in recorder.summary()]
+        assert {"fine slice", "anchor interpolation", "projection", "gcode"} <= set(stages)
+        assert ("kerf" in stages) == kerf
+
+#slicePath as it was before it was vectorized, point by point with svgpathtools
+def baselineSlicePath(path, step):
+    anchorPoints = np.empty((0, 2), float)
+    pointCloud = np.empty((0, 2), float)
+    for e in path:
+        length = e.length()
+        noPoints = length / step
+        for point in ([e.start.real, e.start.imag], [e.end.real, e.end.imag]):
+            if not any(np.equal(anchorPoints, point).all(1)):
+                anchorPoints = np.append(anchorPoints, [point], axis = 0)
+        for i in range(int(noPoints)):
+            pointCloud = np.append(pointCloud, [[e.point(i * step / length).real, e.point(i * step / length).imag]], axis = 0)
+        i = int(noPoints)
+        if (i * step < length):
+            pointCloud = np.append(pointCloud, [[e.point(i * step / length).real, e.point(i * step / length).imag]], axis = 0)
+    return (pointCloud, anchorPoints)
+
+#the vectorized slicing gives exactly the points of the baseline on every kind of element
+def testSlicingMatchesTheBaseline():
+    from svgpathtools import Path, Line, Arc, QuadraticBezier, CubicBezier
+    from hotwireGcodeGenerator import computePathSlices, slicePath
+    path = Path(Line(0j, 40 + 0j),
+                Arc(40 + 0j, 10 + 10j, 0, False, True, 40 + 20j),
+                CubicBezier(40 + 20j, 30 + 35j, 10 + 5j, 0 + 30j),
+                QuadraticBezier(0 + 30j, -15 + 15j, 0j))
+    for step in (0.5, 0.37, 3.0):
+        (pointCloud, anchorPoints) = baselineSlicePath(path, step)
+        for (newPoints, newAnchorPoints) in (slicePath(path, step), computePathSlices(path, step)[:2]):
+            np.testing.assert_array_equal(newPoints, pointCloud)
+            np.testing.assert_array_equal(newAnchorPoints, anchorPoints)
+
+#nothing can be sliced or cut without a step and a feedrate
+def testGranularityAndFeedrateHaveToBePositive():
+    for settings in ({"granularity": 0}, {"granularity": -1}, {"feedrate": 0}):
+        with pytest.raises(ValueError):
+            completeSettings(settings)
+
+#a generation that fails while the gcode is written leaves the output as it was
+def testFailedGenerationKeepsTheOutput(tmp_path, monkeypatch):
+    import hotwireGcodeGenerator
+    xySvg = writeSvg(tmp_path, "xy.svg", [lShape])
+    uvSvg = writeSvg(tmp_path, "uv.svg", [scaled(lShape, 0.8)])
+    output = tmp_path / "part.gcode"
+    output.write_text("old gcode\n")
+    iterToolSpans = hotwireGcodeGenerator.iterToolSpans
+    def failingSpans(*args):
+        spans = iterToolSpans(*args)
+        yield next(spans)
+        raise ValueError("failed on the way")
+    monkeypatch.setattr(hotwireGcodeGenerator, "iterToolSpans", failingSpans)
+    with pytest.raises(ValueError):
+        hotwireGcodeGenerator.generateGcodeFromSvgs(xySvg, uvSvg, "auto", {}, str(output))
+    assert output.read_text() == "old gcode\n"
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["part.gcode", "uv.svg", "xy.svg"]
+
+#a half circle and a straight back, the UV contour shifted so arcs fit: the moves the arcs take over are counted like the simplified points,
+#the reported moves go down by as many lines as the gcode loses
+def testSimplificationCountsTheMovesOfTheArcs(tmp_path):
+    from hotwireGcodeGenerator import generateGcodeFromSvgs, formatSimplification
+    angles = np.linspace(0, np.pi, 720)
+    halfCircle = np.concatenate((np.column_stack((50 + 40*np.cos(angles), 40 + 40*np.sin(angles))), [(10, 0), (90, 0)]))
+    xySvg = writeSvg(tmp_path, "xy.svg", [halfCircle])
+    uvSvg = writeSvg(tmp_path, "uv.svg", [halfCircle + (5, 3)])
+    straight = generateGcodeFromSvgs(xySvg, uvSvg, "auto", {"granularity": 2.0}, str(tmp_path / "straight.gcode"))
+    arcs = generateGcodeFromSvgs(xySvg, uvSvg, "auto", {"granularity": 2.0, "arcTolerance": 0.05}, str(tmp_path / "arcs.gcode"))
+    assert arcs["arcs"] > 0
+    assert arcs["simplifiedPoints"] == arcs["points"]
+    assert straight["moves"] - arcs["moves"] == straight["lines"] - arcs["lines"] > 0
+    assert formatSimplification(arcs).startswith("%d moves for %d points" % (arcs["moves"], arcs["points"]))
+
+#the lines of a square given as (x, y) corners, every other one drawn backwards
+def squareLines(corners):
+    from svgpathtools import Line
+    points = [complex(x, y) for (x, y) in corners]
+    lines = [Line(points[i], points[(i + 1) % len(points)]) for i in range(len(points))]
+    return [line if (i % 2 == 0) else line.reversed() for (i, line) in enumerate(lines)]
+
+#an outline with a cutout, its elements shuffled between two paths, comes back as two closed loops, the outline and the cutout
+def testMergePathsSeparatesTheCutout():
+    from hotwireGcodeGenerator import mergePaths
+    from svgpathtools import Path
+    outline = squareLines([(0, 0), (100, 0), (100, 80), (0, 80)])
+    cutout = squareLines([(30, 20), (70, 20), (70, 60), (30, 60)])
+    elements = [outline[2], cutout[1], outline[0], cutout[3], outline[3], cutout[0], outline[1], cutout[2]]
+    loops = mergePaths([Path(*elements[:3]), Path(*elements[3:])])
+    assert sorted(len(loop) for loop in loops) == [4, 4]
+    assert all(loop.isclosed() for loop in loops)
+    assert sorted(abs(loop.area()) for loop in loops) == pytest.approx([1600, 8000])
+
+#end points less than the tolerance apart are snapped together, further apart they leave the figure open
+def testMergePathsSnapsCloseEndPoints():
+    from hotwireGcodeGenerator import mergePaths, mergeTolerance
+    from svgpathtools import Line, Path
+    gap = mergeTolerance / 4
+    lines = squareLines([(0, 0), (100, 0), (100, 80), (0, 80)])
+    lines[0] = Line(lines[0].start, lines[0].end + gap * 1j)
+    [loop] = mergePaths([Path(*lines)])
+    assert len(loop) == 4 and loop.isclosed()
+    for (element, following) in zip(loop, list(loop)[1:] + [loop[0]]):
+        assert element.end == following.start
+    lines[0] = Line(lines[0].start, lines[0].end + 1e3 * gap * 1j)
+    with pytest.raises(ValueError, match = "not a closed figure"):
+        mergePaths([Path(*lines)])
+
+#an open chain has no way back to its start
+def testMergePathsRefusesAnOpenChain():
+    from hotwireGcodeGenerator import mergePaths
+    from svgpathtools import Path
+    with pytest.raises(ValueError, match = "open end at"):
+        mergePaths([Path(*squareLines([(0, 0), (100, 0), (100, 80), (0, 80)])[:3])])
+
+#a part with a hole written as binary toolpath: the header has the settings and the contours, the mapped points are the tool points
+#and converting it gives the gcode the generation wrote
+def testToolpathFileRoundTrip(tmp_path):
+    from hotwireGcodeGenerator import generateGcodeFromSvgs, Toolpath, main
+    outline = np.array([(0, 0), (60, 0), (60, 60), (0, 60)], float)
+    hole = np.array([(20, 20), (40, 20), (40, 40), (20, 40)], float)
+    xySvg = writeSvg(tmp_path, "xy.svg", [outline, hole])
+    uvSvg = writeSvg(tmp_path, "uv.svg", [scaled(outline, 0.8, (30, 30)), scaled(hole, 0.8, (30, 30))])
+    settings = completeSettings({"granularity": 1.0, "tolerance": 0.01, "kerfWidth": 0.3})
+    toolpaths = [calculateCut(cut, settings) for cut in planCuts(xySvg, uvSvg, "auto", settings)]
+    generateGcodeFromSvgs(xySvg, uvSvg, "auto", settings, str(tmp_path / "part.gcode"), str(tmp_path / "part.hwtp"))
+
+    toolpath = Toolpath(str(tmp_path / "part.hwtp"))
+    lengths = [len(xyToolPoints) for (xyPoints, uvPoints, anchorIndices, xyToolPoints, uvToolPoints) in toolpaths]
+    assert toolpath.header["points"] == len(toolpath) == sum(lengths)
+    assert toolpath.header["contours"] == [0, lengths[0]]
+    assert toolpath.settings == settings
+    assert isinstance(toolpath.points, np.memmap)
+    np.testing.assert_array_equal(toolpath.points, np.concatenate([np.column_stack((xyToolPoints, uvToolPoints)) for (xyPoints, uvPoints, anchorIndices, xyToolPoints, uvToolPoints) in toolpaths]))
+    for ((xyToolPoints, uvToolPoints, anchorIndices), cut) in zip(toolpath.contours(), toolpaths):
+        np.testing.assert_array_equal(anchorIndices, cut[2])
+
+    assert main(["convert", str(tmp_path / "part.hwtp"), "-o", str(tmp_path / "converted.gcode")]) == 0
+    assert (tmp_path / "converted.gcode").read_text() == (tmp_path / "part.gcode").read_text()
+
+#an outline of lines and beziers with a hole: the gcode streamed span by span is the gcode of the whole toolpath (which writing a binary
+#toolpath forces)
+def testStreamedGcodeIsTheWholeToolpathGcode(tmp_path):
+    from hotwireGcodeGenerator import generateGcodeFromSvgs
+    (tmp_path / "xy.svg").write_text('<svg xmlns="http://www.w3.org/2000/svg">\n'
+        '  <path d="M 0,0 L 80,0 C 100,10 100,50 80,60 Q 40,90 0,60 Z M 20,20 L 40,20 L 40,40 L 20,40 Z" fill="none" stroke="black"/>\n</svg>\n')
+    (tmp_path / "uv.svg").write_text('<svg xmlns="http://www.w3.org/2000/svg">\n'
+        '  <path d="M 10,5 L 70,5 C 85,15 85,45 70,55 Q 40,80 10,55 Z M 25,22 L 40,22 L 40,38 L 25,38 Z" fill="none" stroke="black"/>\n</svg>\n')
+    (xySvg, uvSvg) = (str(tmp_path / "xy.svg"), str(tmp_path / "uv.svg"))
+    settings = {"granularity": 0.5}
+    streamed = generateGcodeFromSvgs(xySvg, uvSvg, "auto", settings, str(tmp_path / "streamed.gcode"))
+    whole = generateGcodeFromSvgs(xySvg, uvSvg, "auto", settings, str(tmp_path / "whole.gcode"), str(tmp_path / "whole.hwtp"))
+    assert streamed["contours"] == whole["contours"] == 2
+    assert streamed["points"] == whole["points"]
+    assert (tmp_path / "streamed.gcode").read_text() == (tmp_path / "whole.gcode").read_text()
+
+#every variant of a sweep, projected together with the others and in chunks of variants, is the gcode a generation with its settings writes
+def testSweepVariantsAreTheirGenerations(tmp_path, monkeypatch):
+    import hotwireGcodeGenerator
+    from hotwireGcodeGenerator import generateGcodeFromSvgs, sweepGcodeFromSvgs
+    outline = np.array([(0, 0), (60, 0), (60, 60), (0, 60)], float)
+    hole = np.array([(20, 20), (40, 20), (40, 40), (20, 40)], float)
+    xySvg = writeSvg(tmp_path, "xy.svg", [outline, hole])
+    uvSvg = writeSvg(tmp_path, "uv.svg", [scaled(outline, 0.8, (30, 30)), scaled(hole, 0.8, (30, 30))])
+    settings = {"granularity": 1.0, "tolerance": 0.01, "kerfWidth": 0.3}
+    variants = [{"foamWidth": 300.0}, {"foamWidth": 450.0, "xOffset": 12.5}, {"gantryLength": 800.0, "vOffset": -4.0}]
+    for chunkPoints in (hotwireGcodeGenerator.sweepChunkPoints, 1):
+        monkeypatch.setattr(hotwireGcodeGenerator, "sweepChunkPoints", chunkPoints)
+        results = sweepGcodeFromSvgs(xySvg, uvSvg, "auto", settings, variants, str(tmp_path / "rib_{index}.gcode"))
+        for (i, variant) in enumerate(variants):
+            stats = generateGcodeFromSvgs(xySvg, uvSvg, "auto", dict(settings, **variant), str(tmp_path / "single.gcode"))
+            assert (tmp_path / ("rib_%d.gcode" % i)).read_bytes() == (tmp_path / "single.gcode").read_bytes()
+            assert results[i]["lines"] == stats["lines"]
+
+#calcToolPointClouds as it was before MachineGeometry, point by point
+def baselineToolPoints(xyPointCloud, uvPointCloud, gantryLength, foamWidth, distanceToXYaxis):
+    xyToolPointCloud = np.empty((0, 2), float)
+    uvToolPointCloud = np.empty((0, 2), float)
+    for i in range(len(xyPointCloud)):
+        (x, y) = xyPointCloud[i]
+        (u, v) = uvPointCloud[i]
+        xt = x - (u - x) * distanceToXYaxis / foamWidth
+        ut = xt + (u - x) * gantryLength / foamWidth
+        yt = y - (v - y) * distanceToXYaxis / foamWidth
+        vt = yt + (v - y) * gantryLength / foamWidth
+        xyToolPointCloud = np.append(xyToolPointCloud, [[xt, yt]], axis = 0)
+        uvToolPointCloud = np.append(uvToolPointCloud, [[ut, vt]], axis = 0)
+    return (xyToolPointCloud, uvToolPointCloud)
+
+#the projection onto the tools is the one of the baseline, and mapping the tool points back gives the contours on the foam
+def testMachineGeometryMapsBothWays():
+    from hotwireGcodeGenerator import MachineGeometry, calcToolPointClouds
+    random = np.random.default_rng(7)
+    xyPoints = random.uniform(-50, 150, (200, 2))
+    uvPoints = xyPoints + random.uniform(-30, 30, (200, 2))
+    for (gantryLength, foamWidth, distanceToXYaxis) in ((1000.0, 500.0, 250.0), (700.0, 120.0, 0.0), (450.0, 450.0, -20.0)):
+        (xyToolPoints, uvToolPoints) = calcToolPointClouds(xyPoints, uvPoints, gantryLength, foamWidth, distanceToXYaxis)
+        (xyBaseline, uvBaseline) = baselineToolPoints(xyPoints, uvPoints, gantryLength, foamWidth, distanceToXYaxis)
+        np.testing.assert_allclose(xyToolPoints, xyBaseline, rtol = 0, atol = 1e-9)
+        np.testing.assert_allclose(uvToolPoints, uvBaseline, rtol = 0, atol = 1e-9)
+        (xyFoam, uvFoam) = MachineGeometry(gantryLength, foamWidth, distanceToXYaxis).toFoam(xyToolPoints, uvToolPoints)
+        np.testing.assert_allclose(xyFoam, xyPoints, rtol = 0, atol = 1e-9)
+        np.testing.assert_allclose(uvFoam, uvPoints, rtol = 0, atol = 1e-9)
+    with pytest.raises(ValueError):
+        MachineGeometry(0.0, 500.0, 250.0).toFoam(xyPoints, uvPoints)
+
+#a kept ToolpathCalculation only reruns the stages after the setting that changed: an offset reruns the offsets and the projection,
+#the machine geometry only the projection, the granularity the slicing and everything after it
+def testCalculationRerunsOnlyTheStagesAfterTheChange(tmp_path):
+    from hotwireGcodeGenerator import ToolpathCalculation, recording
+    xySvg = writeSvg(tmp_path, "xy.svg", [lShape])
+    uvSvg = writeSvg(tmp_path, "uv.svg", [scaled(lShape, 0.8)])
+    settings = completeSettings({"granularity": 1.0})
+    [(xyPath, xyAnchorPoints, uvPath, uvAnchorPoints, hole)] = planCuts(xySvg, uvSvg, "auto", settings)
+    calculation = ToolpathCalculation()
+    def stagesFor(changes):
+        with recording() as recorder:
+            result = calculation.calculate(xyPath, xyAnchorPoints, uvPath, uvAnchorPoints, dict(settings, **changes))
+        return ([record.name for record in recorder.stages], result)
+    (stages, first) = stagesFor({})
+    assert stages[0] == "fine slice"
+    assert {"anchor interpolation", "anchor indices", "offsets", "projection"} <= set(stages)
+    (stages, moved) = stagesFor({"xOffset": 10.0})
+    assert stages == ["offsets", "projection"]
+    np.testing.assert_allclose(moved[0], first[0] + (10.0, 0.0))
+    assert stagesFor({"xOffset": 10.0, "gantryLength": 900.0})[0] == ["projection"]
+    assert stagesFor({"xOffset": 10.0, "gantryLength": 900.0})[0] == []
+    (stages, resliced) = stagesFor({"xOffset": 10.0, "gantryLength": 900.0, "granularity": 0.5})
+    assert ("fine slice" in stages) and (stages[-1] == "projection")
+    assert len(resliced[0]) > len(first[0])
+
+#a toolpath along the L shape with the UV side scaled, sampled densely and with some noise: the simplification keeps every anchor point,
+#even on a straight edge, drops the points on the straight moves and no dropped point is further than the tolerance from the moves left
+def testSimplificationKeepsTheAnchorPoints():
+    from hotwireGcodeGenerator import simplifyToolpath, cumulativeLength, pointsAlongPolyline
+    closed = np.vstack((lShape, lShape[:1]))
+    cumLength = cumulativeLength(closed)
+    positions = np.arange(0, cumLength[-1], 0.25)
+    xyToolPoints = pointsAlongPolyline(closed, cumLength, positions) + np.random.default_rng(3).normal(0, 0.002, (len(positions), 2))
+    uvToolPoints = scaled(xyToolPoints, 0.8)
+    anchorIndices = [int(np.argmin(np.abs(positions - position))) for position in cumLength[:-1]] + [len(positions) // 7]
+    tolerance = 0.02
+    (xySimplified, uvSimplified, simplifiedAnchorIndices, kept) = simplifyToolpath(xyToolPoints, uvToolPoints, anchorIndices, tolerance)
+    assert len(kept) < len(positions) // 10
+    np.testing.assert_array_equal(xySimplified[simplifiedAnchorIndices], xyToolPoints[anchorIndices])
+    np.testing.assert_array_equal(uvSimplified[simplifiedAnchorIndices], uvToolPoints[anchorIndices])
+    points = np.column_stack((xyToolPoints, uvToolPoints))
+    ends = np.append(kept, len(points))
+    for (first, last) in zip(ends[:-1], ends[1:]):
+        move = points[last % len(points)] - points[first]
+        offsets = points[first + 1:last] - points[first]
+        t = np.clip(offsets @ move / np.dot(move, move), 0, 1)
+        assert np.all(np.linalg.norm(offsets - t[:, np.newaxis] * move, axis = 1) <= tolerance)
+
+#tool points along a half circle and back along a zigzag, the UV side shifted: the half circle is cut as G02/G03 moves around its center
+#that stay within the tolerance of the circle, the zigzag fits no arc and stays G01 moves
+def testArcFittingTakesCirclesAndLeavesTheRest():
+    import re
+    from hotwireGcodeGenerator import fitToolpathArcs, iterGcode
+    (center, radius, tolerance) = (np.array([50.0, 40.0]), 30.0, 0.01)
+    angles = np.arange(0, np.pi, 1.0 / radius)
+    halfCircle = center + radius * np.column_stack((np.cos(angles), np.sin(angles)))
+    zigzagX = np.arange(20, 80, 1.0)
+    zigzag = np.column_stack((zigzagX, 40 + 0.5 * (-1) ** np.arange(len(zigzagX))))
+    xyToolPoints = np.vstack((halfCircle, zigzag))
+    uvToolPoints = xyToolPoints + (5, 3)
+    arcs = fitToolpathArcs(xyToolPoints, uvToolPoints, [0], tolerance)
+    assert arcs
+    assert all(last < len(halfCircle) for (first, last, clockwise, centerX, centerY) in arcs)
+    assert sum(last - first for (first, last, clockwise, centerX, centerY) in arcs) >= len(halfCircle) - 5
+
+    gcode = "".join(iterGcode(xyToolPoints, uvToolPoints, 300.0, arcs = arcs))
+    arcMoves = re.findall(r"^G0([23]) X(\S+) Y(\S+) U(\S+) V(\S+) I(\S+) J(\S+)", gcode, re.M)
+    assert len(arcMoves) == len(arcs)
+    for (move, (first, last, clockwise, centerX, centerY)) in zip(arcMoves, arcs):
+        #counterclockwise in the plane is G03, I and J point from the start of the arc to the center of the circle
+        assert move[0] == "3"
+        (x, y, u, v, i, j) = (float(value) for value in move[1:])
+        np.testing.assert_allclose(xyToolPoints[first] + (i, j), center, atol = tolerance)
+        assert abs(np.hypot(x - center[0], y - center[1]) - radius) <= tolerance
+        np.testing.assert_allclose((u, v), (x + 5, y + 3), atol = 1e-4)
+    straightMoves = re.findall(r"^G01 X(\S+) Y(\S+)", gcode, re.M)
+    for point in zigzag:
+        assert ("%.4f" % point[0], "%.4f" % point[1]) in straightMoves
@@ -0,0 +1,78 @@
+#tests of the sender against the controller stand-in on a local pty, run with python -m pytest
+
+import time
+
+import pytest
+
+from hotwireGcodeSender import GcodeSender, SenderError, openLink, openStandIn, abortHold, abortReset
+
+#gcode lines of different lengths, in chunks of a few lines like the generator gives them
+def gcodeChunks(noLines, chunkLines = 7):
+    lines = ["G01 X%.4f Y%.4f U%.4f V%.4f" % (i * 0.1, i * 0.02, i * 0.09, i * 0.5 % 7) for i in range(noLines)]
+    return ["".join(line + "\n" for line in lines[start:start + chunkLines]) for start in range(0, noLines, chunkLines)]
+
+#a stand-in with bufferSize characters of receive buffer, the link of the sender to it and the sender
+@pytest.fixture
+def controller():
+    opened = []
+    def open(bufferSize = 128, answer = None):
+        (standIn, device) = openStandIn(bufferSize, answer = answer)
+        link = openLink(device)
+        opened.append((standIn, link))
+        return (standIn, GcodeSender(link, bufferSize, queueSize = 20, responseTimeout = 5.0))
+    yield open
+    for (standIn, link) in opened:
+        link.close()
+        standIn.stop()
+
+#wait until the stand-in got the whole abort of a send: the soft reset and the M5 after it, returns the realtime commands it got
+def waitForReset(standIn):
+    deadline = time.perf_counter() + 5.0
+    while ((abortReset not in standIn.realtime) or (standIn.received[-1:] != ["M5"])) and (time.perf_counter() < deadline):
+        time.sleep(0.01)
+    assert standIn.received[-1] == "M5"
+    return standIn.realtime
+
+#every line arrives in order and is acknowledged, and the small receive buffer never overflows
+def testSendFillsASmallBufferWithoutOverflow(controller):
+    (standIn, sender) = controller(bufferSize = 48)
+    chunks = gcodeChunks(300)
+    telemetry = sender.send(iter(chunks))
+    assert telemetry["sent"] == telemetry["acknowledged"] == 300
+    assert standIn.received == "".join(chunks).splitlines()
+    assert standIn.overflows == 0
+    assert standIn.realtime == b""
+
+#an error of the controller stops the send and the controller
+def testControllerErrorAbortsTheSend(controller):
+    (standIn, sender) = controller(answer = lambda number, line: "error:20" if (number == 50) else "ok")
+    with pytest.raises(SenderError, match = "error:20"):
+        sender.send(iter(gcodeChunks(300)))
+    assert waitForReset(standIn) == abortHold + abortReset
+    assert standIn.lines < 300
+
+#an alarm stops the send and the controller
+def testAlarmAbortsTheSend(controller):
+    (standIn, sender) = controller(answer = lambda number, line: "ALARM:1" if (number == 10) else "ok")
+    with pytest.raises(SenderError, match = "ALARM:1"):
+        sender.send(iter(gcodeChunks(300)))
+    assert waitForReset(standIn) == abortHold + abortReset
+
+#a generation that fails in the middle of the gcode stops the controller and the error comes through
+def testGenerationErrorAbortsTheSend(controller):
+    (standIn, sender) = controller()
+    def failingChunks():
+        yield from gcodeChunks(40)
+        raise ValueError("the generation failed")
+    with pytest.raises(ValueError, match = "the generation failed"):
+        sender.send(failingChunks())
+    assert waitForReset(standIn) == abortHold + abortReset
+
+#a stopped stand-in leaves no file descriptors of its pty open
+def testStandInClosesItsPty():
+    import os
+    before = len(os.listdir("/proc/self/fd"))
+    for i in range(5):
+        (standIn, device) = openStandIn()
+        standIn.stop()
+    assert len(os.listdir("/proc/self/fd")) == before